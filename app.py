@@ -1,11 +1,17 @@
 import streamlit as st
-import pandas as pd
 import json
 import time
 from datetime import datetime, timedelta, timezone
 import calendar
 import urllib.parse
-from supabase import create_client
+from conexion import obtener_cliente, TIMEOUT_SEGUNDOS, REINTENTOS
+from sincronizacion import SnapshotTabla, falta_migracion
+from lecturas import (
+    COLS_COBRANZA, COLS_DASHBOARD, COLS_PAGOS_SOCIOS, COLS_PAGOS_CORRECCION, COLS_PROYECCION, COLS_HISTORIAL,
+    COLS_AUDITORIA, TAMANO_PAGINA_AUDITORIA, consultar_tabla, recorrer_paginas, leer_pagina_auditoria,
+    leer_pagina_pagos, leer_ganancias_socios, leer_resumen_cartera,
+)
+from escritor_auditoria import EscritorAuditoria
 
 # --- 1. CONFIGURACIÓN INICIAL ---
 st.set_page_config(
@@ -16,541 +22,296 @@ st.set_page_config(
 )
 
 # --- CONEXIÓN SUPABASE ---
+# Un solo cliente por proceso (conexiones keep-alive, timeout y reintentos: ver conexion.py).
+# Ajustable con supabase_timeout (segundos) y supabase_reintentos en [config].
 @st.cache_resource
 def get_supabase():
-    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+    config = st.secrets.get("config", {})
+    return obtener_cliente(
+        st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"],
+        timeout=config.get("supabase_timeout", TIMEOUT_SEGUNDOS),
+        reintentos=config.get("supabase_reintentos", REINTENTOS),
+    )
+
+def error_conexion(e):
+    """Corta la página: una lectura fallida no debe mostrarse como una cartera vacía."""
+    st.error(f"Error de conexión con Supabase: {e}")
+    st.caption("Los reintentos automáticos no bastaron. Vuelve a cargar la página en unos segundos.")
+    st.stop()
+
+# --- CACHÉ DE LECTURAS (TTL POR TABLA) ---
+# Segundos que una lectura se reutiliza entre reruns antes de volver a Supabase.
+# Cada escritura llama a invalidar_cache(), así que el TTL solo acota cuánto
+# tardan en verse cambios hechos desde otra sesión o desde fuera de la app.
+TTL_TABLAS = {"prestamos": 60, "auditoria": 30, "pagos": 60, "fotos_cartera": 3600}  # las fotos se escriben una vez al día
+
+def _nombre_tabla(tabla_o_archivo):
+    # Mapeo automático: si tu código pide "audit.json" o "auditoria", va a la tabla auditoria
+    if "audit" in str(tabla_o_archivo).lower():
+        return "auditoria"
+    if "pago" in str(tabla_o_archivo).lower():
+        return "pagos"
+    return "prestamos"
+
+# --- RÉPLICA LOCAL POR DIFERENCIAS (sincronizacion.py) ---
+# Con la réplica activa, cada lectura solo trae de Supabase lo que cambió desde la
+# anterior y filtra en memoria. Requiere sql/001_sincronizacion_delta.sql: sin ella (o con
+# snapshot_local = false en [config]) se vuelve a consultar la tabla en cada lectura.
+USAR_SNAPSHOT = st.secrets.get("config", {}).get("snapshot_local", True)
 
-def cargar_datos(tabla_o_archivo="prestamos"):
-    """
-    Esta función reemplaza a la antigua de GitHub. 
-    Mantiene el nombre para no romper tus 1590 líneas.
-    """
+@st.cache_resource
+def get_snapshots():
+    return {t: SnapshotTabla(t) for t in ("prestamos", "auditoria", "pagos")}
+
+def _consultar_tabla(nombre_tabla, estado=None, columnas=None, orden=None):
+    """Aplica filtro, proyección y orden sobre la réplica local o, sin ella, en la consulta a Supabase."""
+    snapshot = get_snapshots().get(nombre_tabla) if USAR_SNAPSHOT else None
+    if snapshot is not None:
+        try:
+            snapshot.refrescar(get_supabase())
+            return snapshot.consultar(estado, columnas, orden)
+        except Exception as e:
+            if not falta_migracion(e):
+                raise
+            # Falta sql/001 (updated_at / eliminados): la tabla se consulta entera como antes y
+            # no se reintenta la réplica hasta reiniciar la app (get_snapshots es compartido)
+            print(f"Réplica local de {nombre_tabla} no disponible: {e}")
+            get_snapshots()[nombre_tabla] = None
+    return consultar_tabla(get_supabase(), nombre_tabla, estado, columnas, orden)
+
+@st.cache_data(ttl=TTL_TABLAS["prestamos"], show_spinner=False)
+def _leer_prestamos(estado=None, columnas=None, orden=None):
+    return _consultar_tabla("prestamos", estado, columnas, orden)
+
+@st.cache_data(ttl=TTL_TABLAS["auditoria"], show_spinner=False)
+def _leer_auditoria(estado=None, columnas=None, orden=None):
+    return _consultar_tabla("auditoria", estado, columnas, orden)
+
+@st.cache_data(ttl=TTL_TABLAS["pagos"], show_spinner=False)
+def _leer_pagos(estado=None, columnas=None, orden=None):
+    return _consultar_tabla("pagos", estado, columnas, orden)
+
+# --- ÍNDICE DE PRÉSTAMOS (POR ID Y POR CLIENTE) ---
+# Se construye una vez por carga de 'prestamos' y lo comparten todas las sesiones:
+# cache_resource no copia el resultado, así que quien lo use no debe modificarlo.
+@st.cache_resource(ttl=TTL_TABLAS["prestamos"], show_spinner=False)
+def _indice_prestamos():
+    return indexar_prestamos(_leer_prestamos())
+
+def cargar_indice_prestamos():
+    """Índices {id: préstamo} y {cliente: préstamo} de toda la cartera (activos y pagados)."""
     try:
-        supabase = get_supabase()
-        
-        # Mapeo automático: si tu código pide "audit.json" o "auditoria", va a la tabla auditoria
-        nombre_tabla = "prestamos"
-        if "audit" in str(tabla_o_archivo).lower():
-            nombre_tabla = "auditoria"
-            
-        response = supabase.table(nombre_tabla).select("*").execute()
-        
-        # Devolvemos (datos, None) para que el código 'datos, sha = cargar_datos()'
-        # no falle al intentar desempaquetar dos valores.
-        return response.data, None
+        return _indice_prestamos()
     except Exception as e:
-        st.error(f"Error de conexión con Supabase: {e}")
-        return [], None
-
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Dancing+Script:wght@700&family=Playfair+Display:wght@900&display=swap');
-
-/* --- 1. ENCABEZADOS SIEMPRE CENTRADOS --- */
-h1, h2, h3, h4, h5, h6, .stMarkdown {
-    text-align: center !important;
-    color: #D4AF37 !important;
-    font-weight: 800 !important;
-}
-
-/* --- 2. CENTRADO DE ETIQUETAS (LABELS) SIN DEFORMAR CUADROS --- */
-/* Cambiamos 'flex' por 'block' para que el texto se mueva pero el cuadro no */
-[data-testid="stWidgetLabel"] {
-    display: block !important;
-    text-align: center !important;
-    width: 100% !important;
-}
-
-[data-testid="stWidgetLabel"] p {
-    text-align: center !important;
-    color: #D4AF37 !important;
-    font-weight: 800 !important;
-    text-transform: uppercase !important;
-    margin-bottom: 8px !important;
-}
-
-/* --- 3. CORRECCIÓN PARA EL CHECKBOX (RENOVAR VENCIMIENTO) --- */
-/* Esto centra el cuadrito y el texto de renovación perfectamente */
-[data-testid="stCheckbox"] {
-    display: flex !important;
-    justify-content: center !important;
-    align-items: center !important;
-    width: 100% !important;
-    margin: 10px 0 !important;
-}
-
-[data-testid="stCheckbox"] label p {
-    font-size: 16px !important; /* Tamaño moderado para que no se vea gigante */
-    color: #D4AF37 !important;
-    font-weight: 700 !important;
-}
-
-/* --- 4. ASEGURAR QUE LOS CUADROS OCUPEN TODO EL ANCHO --- */
-div[data-baseweb="input"] {
-    width: 100% !important;
-}
-
-div[data-baseweb="input"] input {
-    text-align: left !important; /* Texto del número a la izquierda */
-}
-
-/* --- SUBMÓDULOS (TABS) CENTRADOS Y GRANDES --- */
-div[data-baseweb="tab-list"] {
-    display: flex !important;
-    justify-content: center !important;
-    gap: 50px !important;
-}
-
-button[data-baseweb="tab"] {
-    font-size: 22px !important; 
-    font-weight: 900 !important; 
-    color: #D4AF37 !important;
-    transition: 0.3s !important;
-}
-
-button[data-baseweb="tab"]:hover {
-    color: #B8860B !important;
-    transform: translateY(-2px);
-}
-
-/* --- MÉTRICAS DORADAS CENTRADAS --- */
-[data-testid="stMetric"] {
-    background: linear-gradient(135deg, #D4AF37 0%, #B8860B 100%) !important;
-    border: 2px solid #996515 !important;
-    border-radius: 15px !important;
-    padding: 15px !important;
-    display: flex !important;
-    flex-direction: column !important;
-    align-items: center !important;
-    justify-content: center !important;
-    text-align: center !important;
-}
-
-/* Centrar Título */
-[data-testid="stMetricLabel"] {
-    display: flex !important;
-    justify-content: center !important;
-    width: 100% !important;
-}
-
-[data-testid="stMetricLabel"] div p {
-    color: #1C1C1C !important;
-    font-weight: 800 !important;
-    text-transform: uppercase !important;
-    text-align: center !important;
-}
-
-/* Centrar Valor */
-[data-testid="stMetricValue"] {
-    display: flex !important;
-    justify-content: center !important;
-    width: 100% !important;
-}
-
-[data-testid="stMetricValue"] div {
-    color: #1C1C1C !important;
-    font-weight: 700 !important;
-    text-align: center !important;
-}
-
-/* Centrar Flecha y Delta */
-[data-testid="stMetricDelta"] {
-    display: flex !important;
-    justify-content: center !important;
-    width: 100% !important;
-}
-
-[data-testid="stMetricDelta"] div {
-    font-weight: 700 !important;
-}
-
-/* --- 6. BOTONES CON INVERSIÓN --- */
-div.stButton > button, div[data-testid="stFormSubmitButton"] > button {
-    background: linear-gradient(90deg, #D4AF37 0%, #B8860B 100%) !important;
-    color: #FFFFFF !important; 
-    border: 1px solid #996515 !important;
-    border-radius: 12px !important;
-    font-weight: 900 !important;
-    text-transform: uppercase !important;
-    transition: all 0.4s ease-in-out !important;
-    width: 100% !important;
-}
-
-div.stButton > button:hover, div[data-testid="stFormSubmitButton"] > button:hover {
-    background: #FFFFFF !important; 
-    color: #B8860B !important;    
-    border: 2px solid #D4AF37 !important;
-}
-
-//* --- DISEÑO DE LOGIN EXCLUSIVO: MIDNIGHT GOLD (RENOVADO) --- */
-
-/* 1. Fondo General de la página (Más oscuro para que la tarjeta resalte) */
-[data-testid="stAppViewRoot"] {
-    background: radial-gradient(circle, #2c2c2c 0%, #000000 100%) !important;
-}
-
-/* 2. La Tarjeta de Login (Midnight Card) */
-.login-container {
-    /* Fondo negro profundo con brillo sutil */
-    background: linear-gradient(145deg, #0a0a0a, #1a1a1a) !important;
-    backdrop-filter: blur(15px);
-    padding: 60px;
-    
-    /* BORDES DORADOS TIPO TARJETA VIP */
-    border: 3px solid #D4AF37 !important; 
-    border-radius: 35px !important;
-    
-    /* SOMBRA TRIPLE PARA PROFUNDIDAD */
-    box-shadow: 
-        0 30px 60px rgba(0,0,0,0.8), 
-        0 0 20px rgba(212, 175, 55, 0.25),
-        inset 0 0 10px rgba(212, 175, 55, 0.1) !important;
-    
-    text-align: center;
-    max-width: 480px;
-    margin: auto;
-    margin-bottom: 50px !important;
-    border-top: 5px solid #D4AF37 !important; /* Borde superior un poco más grueso para estilo */
-}
-
-/* 3. Imagen del Logo */
-.login-icon {
-    width: 200px; 
-    margin-bottom: 10px;
-    filter: drop-shadow(0px 8px 12px rgba(0,0,0,0.5));
-}
-
-/* 4. Título Elegante (Brisa el Milagro Style) */
-.login-title {
-    font-family: 'Dancing Script', cursive !important; 
-    color: #D4AF37 !important;
-    font-size: 65px !important;
-    font-weight: 700 !important;
-    text-transform: none !important; 
-    margin-bottom: 5px !important;
-    text-shadow: 2px 2px 10px rgba(0,0,0,0.9) !important;
-}
-
-.login-subtitle {
-    color: #FFFFFF !important; /* Blanco para que se lea sobre negro */
-    font-size: 13px !important;
-    font-weight: 600 !important;
-    margin-bottom: 30px;
-    letter-spacing: 3px !important;
-    text-transform: uppercase;
-    opacity: 0.8;
-}
-
-/* 5. Etiquetas de Usuario y Contraseña (Grandes y Doradas) */
-label p {
-    color: #D4AF37 !important;
-    font-weight: 800 !important;
-    font-size: 22px !important;
-    text-transform: uppercase;
-    margin-bottom: 15px !important;
-    margin-top: 25px !important;
-    letter-spacing: 2px;
-}
-
-/* 6. Inputs (Personalizados para fondo negro) */
-div[data-baseweb="input"] {
-    background-color: rgba(255, 255, 255, 0.07) !important;
-    border: 1px solid rgba(212, 175, 55, 0.4) !important;
-    border-radius: 15px !important;
-    color: white !important;
-}
-
-/* 7. CENTRADO Y ESTILO DEL BOTÓN (ACABADO ORO) - ACTUALIZADO */
-div[data-testid="stFormSubmitButton"] {
-    display: flex !important;
-    justify-content: center !important; /* Centra el contenido horizontalmente */
-    align-items: center !important;
-    width: 100% !important;
-    margin-top: 30px !important;
-    text-align: center !important;
-}
-
-div[data-testid="stFormSubmitButton"] > button {
-    background: linear-gradient(90deg, #D4AF37 0%, #B8860B 100%) !important;
-    color: #000000 !important; 
-    border: 1px solid #C5A059 !important;
-    padding: 12px 0px !important;
-    border-radius: 15px !important;
-    font-size: 20px !important; 
-    font-weight: 900 !important;
-    width: 250px !important; /* Ancho fijo para que se vea estético y centrado */
-    text-transform: uppercase;
-    box-shadow: 0 10px 25px rgba(212, 175, 55, 0.3) !important;
-    transition: all 0.4s ease-in-out !important;
-    margin: 0 auto !important; /* Margen automático para reforzar centrado */
-    display: block !important;
-}
-
-div[data-testid="stFormSubmitButton"] > button:hover {
-    transform: translateY(-4px) scale(1.02) !important;
-    background: #FFFFFF !important; 
-    color: #B8860B !important;    
-    border: 2px solid #D4AF37 !important;
-    box-shadow: 0 15px 35px rgba(212, 175, 55, 0.5) !important;
-}
-
-/* 8. Estilo para el Pie de Página (Azul Brillante) */
-.footer-login {
-    color: #1A3ACD !important;
-    font-size: 18px !important;
-    font-weight: 900 !important;
-    text-align: center !important;
-    margin-top: 40px !important;
-    text-shadow: 0px 0px 10px rgba(26, 58, 205, 0.2);
-}
-
-/* --- TARJETAS DE MÉTRICAS (KPIs) --- */
-.metric-card {
-    background: #111111; /* FONDO OSCURO */
-    border-radius: 12px;
-    padding: 20px;
-    border: 1px solid rgba(212, 175, 55, 0.3); /* BORDE DORADO */
-    border-left: 6px solid #D4AF37; /* CAMBIO A DORADO */
-    box-shadow: 0 4px 6px rgba(0,0,0,0.5);
-    transition: transform 0.2s;
-    text-align: center; /* Centrar texto interno */
-}
-.metric-card:hover {
-    transform: translateY(-3px);
-    box-shadow: 0 8px 15px rgba(212, 175, 55, 0.2);
-}
-.metric-title {
-    color: #D4AF37; /* DORADO */
-    font-size: 0.85rem;
-    text-transform: uppercase;
-    letter-spacing: 1px;
-    font-weight: 600;
-    margin-bottom: 8px;
-    text-align: center;
-}
-.metric-value {
-    color: #FFFFFF; /* BLANCO PARA RESALTAR */
-    font-size: 1.8rem;
-    font-weight: 700;
-    text-align: center;
-}
-
-/* --- ESTILO PARA TODOS LOS BOTONES DEL SISTEMA (NORMAL, FORMULARIO Y CAMBIOS) --- */
-div.stButton > button, 
-div[data-testid="stFormSubmitButton"] > button,
-button[kind="secondaryFormSubmit"],
-button[kind="primaryFormSubmit"] {
-    background: linear-gradient(90deg, #D4AF37 0%, #B8860B 100%) !important;
-    color: #FFFFFF !important; 
-    border: 1px solid #996515 !important;
-    border-radius: 12px !important; 
-    font-weight: 900 !important; 
-    text-transform: uppercase !important;
-    letter-spacing: 1px !important;
-    padding: 12px 24px !important;
-    transition: all 0.4s ease-in-out !important;
-    box-shadow: 0 4px 15px rgba(0,0,0,0.1) !important;
-    width: 100% !important; 
-    display: block !important;
-}
-
-/* --- EFECTO HOVER PARA TODOS LOS BOTONES --- */
-div.stButton > button:hover, 
-div[data-testid="stFormSubmitButton"] > button:hover,
-button[kind="secondaryFormSubmit"]:hover,
-button[kind="primaryFormSubmit"]:hover {
-    background: #FFFFFF !important; 
-    color: #B8860B !important;    
-    border: 2px solid #D4AF37 !important; 
-    transform: scale(1.02) !important;
-    box-shadow: 0 8px 25px rgba(212, 175, 55, 0.4) !important;
-}
-
-/* --- CORRECCIÓN ADICIONAL PARA EL ICONO DEL DISKETTE --- */
-div.stButton > button p, 
-div[data-testid="stFormSubmitButton"] > button p {
-    color: inherit !important; 
-}
-
-/* --- BOTÓN WHATSAPP PREMIUM --- */
-.wa-button {
-    background-color: #25D366;
-    color: white !important;
-    padding: 10px 20px;
-    border-radius: 10px;
-    text-decoration: none;
-    font-weight: bold;
-    display: inline-flex;
-    align-items: center;
-    justify-content: center;
-    gap: 10px;
-    box-shadow: 0 4px 10px rgba(37, 211, 102, 0.3);
-    transition: 0.3s;
-    width: 100%;
-    margin-top: 5px;
-}
-.wa-button:hover {
-    background-color: #128C7E;
-    transform: scale(1.02);
-}
-
-/* --- TABLAS DE DATOS ESTILO MINIMALISTA --- */
-[data-testid="stDataFrame"] {
-    background-color: transparent !important; 
-    border: 1px solid rgba(212, 175, 55, 0.3) !important; /* Borde muy sutil */
-    box-shadow: none !important;
-    padding: 0px !important;
-}
-
-/* Encabezados de tabla */
-div[data-testid="stDataFrame"] div[role="columnheader"] {
-    background-color: #1a1a1a !important;
-    color: #D4AF37 !important;
-    font-weight: 700 !important;
-    border-bottom: 1px solid #D4AF37 !important;
-}
-
-/* Celdas normales */
-div[data-testid="stDataFrame"] div[role="gridcell"] {
-    color: #E0E0E0 !important;
-    background-color: transparent !important;
-    font-size: 14px !important;
-}
-
-/* --- ALERTAS --- */
-.alert-box {
-    padding: 15px;
-    border-radius: 8px;
-    margin-bottom: 10px;
-    font-weight: 500;
-    display: flex;
-    align-items: center;
-    justify-content: center; 
-}
-.alert-danger { background-color: #2E1513; color: #E74C3C; border: 1px solid #E74C3C; }
-.alert-warning { background-color: #2E2813; color: #F1C40F; border: 1px solid #F1C40F; }
-.alert-success { background-color: #132E1B; color: #2ECC71; border: 1px solid #2ECC71; }
-
-/* Eliminar borde feo del formulario de Streamlit */
-[data-testid="stForm"] { border: none; padding: 0; }
-
-/* --- CAMBIO A DORADO EJECUTIVO --- */
-:root { --gold: #D4AF37; --dark: #1C1C1C; }
-h1, h2, h3, .stMarkdown h1, .stMarkdown h2 { color: #D4AF37 !important; font-family: 'Playfair Display', serif; }
-div.stButton > button {
-    background: linear-gradient(90deg, #D4AF37 0%, #996515 100%) !important;
-    border: 1px solid #C5A059 !important;
-}
-[data-testid="stMetric"] { border: 1px solid #D4AF37; border-radius: 10px; background: #1C1C1C; }
-
-/* --- ACTUALIZACIÓN SPLASH SCREEN --- */
-@keyframes fade-out {
-    0% { opacity: 1; }
-    90% { opacity: 1; }
-    100% { opacity: 0; }
-}
-
-/* --- CSS PARA ELIMINAR FANTASMAS --- */
-.splash-overlay {
-    position: fixed;
-    top: 0;
-    left: 0;
-    width: 100vw; 
-    height: 100vh; 
-    background-color: #FFFFFF !important;
-    display: flex;
-    flex-direction: column;
-    justify-content: center;
-    align-items: center;
-    z-index: 9999999 !important; 
-}
+        error_conexion(e)
+
+# --- PROYECCIÓN DE COBROS (cartera.proyectar_cobros) ---
+# Las cuotas de toda la cartera activa se generan en una pasada vectorizada por versión de
+# los datos (mismo TTL e invalidación que 'prestamos') y por día; cambiar la agrupación o
+# el detalle por socio en la pestaña solo reagrupa este resultado.
+@st.cache_resource(ttl=TTL_TABLAS["prestamos"], show_spinner=False)
+def _proyeccion_cobros(meses, hoy):
+    activos = pd.DataFrame(_leer_prestamos("Activo", tuple(COLS_PROYECCION)))
+    return proyectar_cobros(activos, meses, hoy), fracciones_socios(activos)
+
+def cargar_proyeccion(meses):
+    """(cuotas esperadas, fracciones por socio) de la cartera activa para el mes en curso y `meses` más."""
+    try:
+        return _proyeccion_cobros(meses, datetime.now().date().isoformat())
+    except Exception as e:
+        error_conexion(e)
 
-.gif-container {
-    width: 300px;
-    height: 300px;
-}
+# --- GANANCIAS POR SOCIO (sql/006_ganancias_socios.sql) ---
+# Un trigger suma el reparto de cada cobro por socio y mes: las tarjetas leen unas pocas
+# filas en lugar de recorrer todo el libro de pagos. Se invalida junto con 'pagos'.
+@st.cache_data(ttl=TTL_TABLAS["pagos"], show_spinner=False)
+def _leer_ganancias_socios():
+    return leer_ganancias_socios(get_supabase())
 
-/* --- ENCABEZADOS DE ALTA GAMA --- */
-.header-box {
-    background: linear-gradient(145deg, #0A0A0A, #1C1C1C); 
-    border: 1px solid rgba(212, 175, 55, 0.4);
-    padding: 40px 20px;
-    border-radius: 20px;
-    margin-bottom: 40px;
-    box-shadow: 0 15px 35px rgba(0,0,0,0.8);
-    text-align: center;
-    position: relative;
-    overflow: hidden;
-}
+def cargar_ganancias_socios():
+    """Filas {socio, mes, monto, pagos} de ganancias_socios, del mes más antiguo al más reciente."""
+    try:
+        return _leer_ganancias_socios()
+    except Exception as e:
+        error_conexion(e)
 
-.header-box::after {
-    content: '';
-    position: absolute;
-    top: -50%; left: -50%; width: 200%; height: 200%;
-    background: radial-gradient(circle, rgba(212,175,55,0.05) 0%, transparent 70%);
-}
+# --- RESUMEN DE LA CARTERA POR ESTADO (sql/008_resumen_cartera.sql) ---
+# Una fila por Estado con capital, interés y cantidad: los KPI de cabecera se dibujan antes
+# (o sin) descargar la tabla completa. Se invalida junto con 'prestamos'.
+@st.cache_data(ttl=TTL_TABLAS["prestamos"], show_spinner=False)
+def _leer_resumen_cartera():
+    try:
+        return leer_resumen_cartera(get_supabase())
+    except Exception as e:
+        # Sin la vista (sql/008 sin ejecutar) los KPI se suman en pandas como antes; el
+        # None queda en caché para no repetir la consulta fallida en cada rerun
+        print(f"Resumen de cartera no disponible: {e}")
+        return None
+
+def cargar_resumen_cartera():
+    """{Estado: {capital, interes, prestamos}} de toda la cartera, o None si la vista no está disponible."""
+    return _leer_resumen_cartera()
+
+# --- FOTOS DIARIAS DE LA CARTERA (sql/009_fotos_cartera.sql) ---
+# notifier.py guarda una fila por día: la pestaña EVOLUCIÓN lee unos cientos de filas
+# en lugar de reconstruir estados pasados desde la auditoría.
+COLS_FOTOS = ["fecha", "capital_activo", "flujo_mensual", "prestamos_activos", "mora_prestamos", "mora_capital", "mora_interes", "exposicion_socios"]
+
+@st.cache_data(ttl=TTL_TABLAS["fotos_cartera"], show_spinner=False)
+def _leer_fotos_cartera(desde=None):
+    fotos, cursor = [], desde
+    while True:
+        consulta = get_supabase().table("fotos_cartera").select(",".join(COLS_FOTOS))
+        if cursor:
+            consulta = consulta.gt("fecha", cursor) if fotos else consulta.gte("fecha", cursor)
+        lote = consulta.order("fecha").limit(1000).execute().data
+        fotos += lote
+        if len(lote) < 1000:
+            return fotos
+        cursor = lote[-1]["fecha"]
+
+def cargar_fotos_cartera(desde=None):
+    """Serie diaria de la cartera desde `desde` ('AAAA-MM-DD'); None si la tabla no está disponible."""
+    try:
+        return evolucion_cartera(_leer_fotos_cartera(desde))
+    except Exception as e:
+        # Sin sql/009 solo esta pestaña queda vacía: no se corta el resto del Dashboard
+        print(f"Fotos de la cartera no disponibles: {e}")
+        return None
+
+# --- LECTURA PAGINADA DE AUDITORÍA (KEYSET, ver lecturas.py) ---
+# Cada página se guarda en caché por separado: "Cargar más" solo pide la siguiente.
+@st.cache_data(ttl=TTL_TABLAS["auditoria"], show_spinner=False)
+def _leer_pagina_auditoria(antes_de_id, tamano, operacion=None, columnas=None, texto=None, desde=None, hasta=None):
+    return leer_pagina_auditoria(get_supabase(), antes_de_id, tamano, operacion, columnas, texto, desde, hasta)
+
+def _leer_auditoria_reciente(paginas=1, operacion=None, columnas=None, tamano=TAMANO_PAGINA_AUDITORIA, texto=None, desde=None, hasta=None):
+    if columnas and "id" not in columnas:
+        columnas = ["id"] + list(columnas)
+    columnas = tuple(columnas) if columnas else None
+    return recorrer_paginas(
+        lambda cursor: _leer_pagina_auditoria(cursor, tamano, operacion, columnas, texto, desde, hasta), paginas, tamano
+    )
+
+def cargar_auditoria_reciente(paginas=1, operacion=None, columnas=None, tamano=TAMANO_PAGINA_AUDITORIA):
+    """
+    Devuelve (registros, hay_mas) con las primeras `paginas` páginas de auditoría,
+    del más reciente al más antiguo. paginas=None recorre la tabla completa.
+    """
+    try:
+        return _leer_auditoria_reciente(paginas, operacion, columnas, tamano)
+    except Exception as e:
+        error_conexion(e)
 
-.luxury-title {
-    font-family: 'Playfair Display', serif !important;
-    font-weight: 900 !important;
-    text-transform: uppercase !important;
-    letter-spacing: 5px !important;
-    font-size: 38px !important;
-    background: linear-gradient(to right, #BF953F, #FCF6BA, #B38728, #FBF5B7, #AA771C);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    margin-bottom: 10px !important;
-    filter: drop-shadow(0 2px 2px rgba(0,0,0,0.3));
-}
+def buscar_auditoria(texto="", desde=None, hasta=None, operacion=None, paginas=1):
+    """
+    Búsqueda en el servidor sobre toda la auditoría: (registros, hay_mas) con las primeras
+    `paginas` páginas de coincidencias, de la más reciente a la más antigua.
+    Sin tildes ni mayúsculas, como busqueda.py (requiere sql/003_busqueda_auditoria.sql).
+    """
+    try:
+        return _leer_auditoria_reciente(
+            paginas, operacion, COLS_AUDITORIA, texto=normalizar(texto).strip() or None,
+            desde=desde, hasta=hasta,
+        )
+    except Exception as e:
+        error_conexion(e)
 
-.luxury-subtitle {
-    font-family: 'Roboto', sans-serif !important;
-    color: #FFFFFF !important; 
-    font-size: 16px !important;
-    font-weight: 800 !important; 
-    letter-spacing: 3px !important;
-    text-transform: uppercase !important;
-    margin-top: 5px !important;
-}
+# --- LIBRO DE PAGOS POR PÁGINAS (pestaña Corregir / Anular) ---
+# Mismo keyset que la auditoría: cada página es "id < último id visto" con límite, así
+# "Cargar más" no vuelve a descargar ni a ordenar el libro completo.
+@st.cache_data(ttl=TTL_TABLAS["pagos"], show_spinner=False)
+def _leer_pagina_pagos(antes_de_id, tamano, columnas=None):
+    return leer_pagina_pagos(get_supabase(), antes_de_id, tamano, columnas)
 
-/* Sidebar */
-[data-testid="stSidebar"] {
-    background-color: #05080d !important; 
-    border-right: 2px solid #D4AF37 !important;
-}
+def cargar_pagos_recientes(paginas=1, columnas=None, tamano=TAMANO_PAGINA_AUDITORIA):
+    """(registros, hay_mas) con las primeras `paginas` páginas del libro 'pagos', del más reciente al más antiguo."""
+    try:
+        columnas = tuple(columnas) if columnas else None
+        return recorrer_paginas(lambda cursor: _leer_pagina_pagos(cursor, tamano, columnas), paginas, tamano)
+    except Exception as e:
+        error_conexion(e)
+
+def boton_cargar_mas(clave, hay_mas):
+    """Amplía en una página la lectura paginada cuyo número de páginas vive en session_state[clave]."""
+    if hay_mas and st.button("⬇️ Cargar registros anteriores", key=f"btn_{clave}", use_container_width=True):
+        st.session_state[clave] = st.session_state.get(clave, 1) + 1
+        st.rerun()
+
+def mostrar_metricas(huecos, metricas):
+    """Pinta [(etiqueta, valor)] en huecos de st.empty(); se pueden repintar más abajo en la misma ejecución."""
+    for hueco, (etiqueta, valor) in zip(huecos, metricas):
+        hueco.metric(etiqueta, valor)
+
+# --- ÍNDICES DE BÚSQUEDA (busqueda.py) ---
+# El texto normalizado de cada fila se arma una vez por versión de los datos (mismo TTL e
+# invalidación que la lectura) y cada pulsación en el buscador solo filtra sobre él.
+# Como con _indice_prestamos, el resultado es compartido: no se debe modificar.
+@st.cache_resource(ttl=TTL_TABLAS["prestamos"], show_spinner=False)
+def _buscador_prestamos(estado=None, columnas=None):
+    return TablaBuscable(_leer_prestamos(estado, columnas))
+
+@st.cache_resource(ttl=TTL_TABLAS["auditoria"], show_spinner=False)
+def _buscador_auditoria(paginas):
+    registros, hay_mas = _leer_auditoria_reciente(paginas, columnas=COLS_AUDITORIA)
+    return TablaBuscable(registros), hay_mas
+
+def cargar_tabla_buscable(estado=None, columnas=None):
+    """TablaBuscable con los préstamos filtrados por estado (ver cargar_datos)."""
+    try:
+        return _buscador_prestamos(estado, tuple(columnas) if columnas else None)
+    except Exception as e:
+        error_conexion(e)
 
-/* Título 'NAVEGACIÓN' */
-div[data-testid="stSidebar"] [data-testid="stWidgetLabel"] p {
-    font-size: 28px !important; 
-    font-weight: 900 !important; 
-    color: #D4AF37 !important;
-    letter-spacing: 2px !important;
-    text-transform: uppercase !important;
-    margin-bottom: 20px !important;
+def cargar_auditoria_buscable(paginas=1):
+    """(TablaBuscable, hay_mas) con las primeras `paginas` páginas de auditoría."""
+    try:
+        return _buscador_auditoria(paginas)
+    except Exception as e:
+        error_conexion(e)
+
+_LECTORES = {"prestamos": _leer_prestamos, "auditoria": _leer_auditoria, "pagos": _leer_pagos}
+# Todas las lecturas cacheadas que dependen de cada tabla
+_CACHES = {
+    "prestamos": [_leer_prestamos, _indice_prestamos, _buscador_prestamos, _proyeccion_cobros, _leer_resumen_cartera],
+    "auditoria": [_leer_auditoria, _leer_pagina_auditoria, _buscador_auditoria],
+    "pagos": [_leer_pagos, _leer_pagina_pagos, _leer_ganancias_socios],
+    "fotos_cartera": [_leer_fotos_cartera],
 }
 
-/* Opciones del menú */
-div[data-testid="stSidebar"] div[role="radiogroup"] label div p {
-    font-size: 35px !important; 
-    font-weight: 1000 !important; 
-    color: #FFFFFF !important; 
-    padding: 10px 0px !important;
-    line-height: 1.2 !important;
-}
+def invalidar_cache(*tablas):
+    """Descarta las lecturas cacheadas de las tablas indicadas (sin argumentos: todas)."""
+    for tabla in (tablas or tuple(_CACHES)):
+        for lector in _CACHES[tabla]:
+            lector.clear()
 
-/* Color del círculo de selección */
-div[data-testid="stSidebar"] div[role="radiogroup"] [data-baseweb="radio"] div {
-    border-color: #D4AF37 !important;
-    background-color: transparent !important;
-}
+def cargar_datos(tabla_o_archivo="prestamos", estado=None, columnas=None, orden=None):
+    """
+    Esta función reemplaza a la antigua de GitHub. 
+    Mantiene el nombre para no romper tus 1590 líneas.
+    Las lecturas pasan por una caché compartida por todas las sesiones (ver TTL_TABLAS).
+    estado, columnas y orden se envían a Supabase (.eq / .select / .order) para no
+    descargar filas ni columnas que la página no va a mostrar.
+    """
+    try:
+        columnas = tuple(columnas) if columnas else None
+        # Devolvemos (datos, None) para que el código 'datos, sha = cargar_datos()'
+        # no falle al intentar desempaquetar dos valores.
+        return _LECTORES[_nombre_tabla(tabla_o_archivo)](estado, columnas, orden), None
+    except Exception as e:
+        error_conexion(e)
 
-/* El punto interno cuando está seleccionado */
-div[data-testid="stSidebar"] div[role="radiogroup"] [aria-checked="true"] div::after {
-    background-color: #D4AF37 !important;
-}
+# --- HOJA DE ESTILOS ---
+# El tema vive en static/tema.css (servido por enableStaticServing en .streamlit/config.toml).
+# En cada ejecución solo viaja este <link>, que el navegador resuelve una vez y guarda en caché;
+# los estilos por página y los colores dinámicos se aplican con clases definidas en el mismo archivo.
+st.markdown('<link rel="stylesheet" href="app/static/tema.css">', unsafe_allow_html=True)
 
-</style>
-""", unsafe_allow_html=True)
+# --- AUDITORÍA: OPERACIONES QUE REGISTRA LA APP (las columnas COLS_* están en lecturas.py) ---
+OPERACIONES_AUDITORIA = [
+    "COBRO", "CORRECCIÓN COBRO", "ANULACIÓN COBRO", "CREACIÓN CRÉDITO", "EDICIÓN MANUAL",
+    "REPARTICIÓN SOCIOS", "ELIMINACIÓN DEFINITIVA", "INICIO DE SESIÓN", "CIERRE DE SESIÓN",
+]
 
 # --- 3. FUNCIONES DE LÓGICA DE CALENDARIO ---
 def sumar_un_mes(fecha_str):
@@ -589,12 +350,47 @@ def generar_link_whatsapp(telefono, cliente, monto, fecha, tipo):
     msg_encoded = urllib.parse.quote(mensaje)
     return f"https://wa.me/{tel_limpio}?text={msg_encoded}"
 
+def ahora_peru():
+    # Hora Perú UTC-5
+    return datetime.now(timezone(timedelta(hours=-5)))
+
+def registrar_cobro(prestamo, interes, capital, renovar, nota=None):
+    """
+    Aplica el cobro con la RPC registrar_cobro (sql/007): saldo, renovación, libro 'pagos' y
+    auditoría en una sola transacción del servidor, o nada si falla. Si el préstamo cambió desde
+    que se mostró (vencimiento o capital: otro cobro entró antes) la función lo rechaza.
+    Devuelve el préstamo resultante.
+    """
+    resultado = get_supabase().rpc("registrar_cobro", {
+        "p_prestamo_id": prestamo['id'],
+        "p_interes": interes,
+        "p_capital": capital,
+        "p_renovar": renovar,
+        "p_nota": nota or None,
+        "p_usuario": st.session_state.get('usuario', 'Sistema').upper(),
+        "p_perfil": st.session_state.get('rol', '-'),
+        "p_vencimiento": str(prestamo['Fecha_Proximo_Pago']),
+        "p_capital_anterior": float(prestamo['Monto_Capital']),
+    }).execute().data
+    invalidar_cache("prestamos", "pagos", "auditoria")
+    return resultado
+
+# --- ESCRITOR DE AUDITORÍA EN SEGUNDO PLANO (escritor_auditoria.py) ---
+# Los eventos se envían por lotes desde un hilo propio; lo que no se pueda enviar
+# queda en el spool y se reintenta, así que ninguna acción del usuario espera a la auditoría.
+@st.cache_resource
+def get_escritor_auditoria():
+    return EscritorAuditoria(
+        get_supabase(),
+        ruta_spool=st.secrets.get("config", {}).get("spool_auditoria", ".spool/auditoria.jsonl"),
+        al_escribir=lambda: invalidar_cache("auditoria")
+    )
+
 def registrar_auditoria(accion, detalle, cliente="-"):
     try:
-        supabase = get_supabase()
-        # Hora Perú UTC-5
-        hora_peru = datetime.now(timezone(timedelta(hours=-5))).strftime("%Y-%m-%d %H:%M:%S")
+        hora_peru = ahora_peru().strftime("%Y-%m-%d %H:%M:%S")
         
+        # Se arma en el hilo de la sesión (usa session_state) y solo se encola
         nuevo_log = {
             "Fecha/Hora": hora_peru,
             "Usuario": st.session_state.get('usuario', 'Sistema').upper(),
@@ -603,17 +399,66 @@ def registrar_auditoria(accion, detalle, cliente="-"):
             "Cliente Afectado": cliente,
             "Detalle del Movimiento": detalle
         }
-        supabase.table("auditoria").insert(nuevo_log).execute()
+        get_escritor_auditoria().registrar(nuevo_log)
     except Exception as e:
         print(f"Error Auditoría: {e}")
+
+# --- COBROS EN LOTE (cartera.aplicar_pagos) ---
+def registrar_pagos_lote(cobros):
+    """
+    Guarda de una vez los cobros sin error de aplicar_pagos() con la RPC registrar_cobros
+    (sql/010): saldos, libro 'pagos' y auditoría en una sola transacción del servidor, o nada
+    si falla. Los préstamos que cambiaron desde la vista previa (otro cobro, una edición) no
+    se tocan. Devuelve (aplicados, omitidos) con los nombres de los clientes.
+    """
+    cobros = cobros[cobros["Error"] == ""].to_dict("records")
+    resultado = get_supabase().rpc("registrar_cobros", {
+        "p_cobros": [
+            {
+                "prestamo_id": int(c["id"]),
+                "interes": float(c["Interes"]),
+                "capital": float(c["Capital"]),
+                "renovar": bool(c["Renovar"]),
+                "nota": c["Nota"] or None,
+                "vencimiento": str(c["Vencimiento_Anterior"]),
+                "capital_anterior": float(c["Capital_Anterior"]),
+            }
+            for c in cobros
+        ],
+        "p_usuario": st.session_state.get('usuario', 'Sistema').upper(),
+        "p_perfil": st.session_state.get('rol', '-'),
+    }).execute().data
+    invalidar_cache("prestamos", "pagos", "auditoria")
+    omitidos = set(resultado["omitidos"])
+    return (
+        [c["Cliente"] for c in cobros if int(c["id"]) not in omitidos],
+        [c["Cliente"] for c in cobros if int(c["id"]) in omitidos],
+    )
         
+# --- SPLASH DE BIENVENIDA Y DESPEDIDA ---
+# La página se dibuja en la misma ejecución, debajo del splash, y es el navegador el
+# que lo retira al cumplirse la duración. Con mostrar_splash = false en [config] no se muestra.
+MOSTRAR_SPLASH = st.secrets.get("config", {}).get("mostrar_splash", True)
+DURACION_SPLASH_ENTRADA = 3.8
+DURACION_SPLASH_SALIDA = 3.0
+
+def mostrar_splash(contenido, segundos):
+    if MOSTRAR_SPLASH:
+        st.markdown(f"""
+            <div class="splash-overlay splash-temporal" style="animation-duration: {segundos}s;">
+                {contenido.strip()}
+            </div>
+        """, unsafe_allow_html=True)
+
 def mostrar_splash_salida():
-    placeholder = st.empty()
     nombre = st.session_state.get('usuario', '').upper()
     
-    with placeholder.container():
-        st.markdown(f"""
-            <div class="splash-overlay">
+    # LIMPIEZA ANTES DE SALIR: el login se dibuja a continuación, ya sin sidebar
+    st.query_params.clear()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    
+    mostrar_splash(f"""
                 <div style="width: 300px; height: 300px;">
                     <iframe src="https://tenor.com/embed/1281825661231862493" 
                             width="100%" height="100%" frameborder="0" allowfullscreen>
@@ -623,24 +468,13 @@ def mostrar_splash_salida():
                     HASTA LUEGO ESTIMAD@ {nombre}...
                 </h2>
                 <p style="color:white; text-align:center;">Cerrando sesión de forma segura</p>
-            </div>
-        """, unsafe_allow_html=True)
-        time.sleep(3.0)
-    
-    # LIMPIEZA ANTES DE SALIR
-    st.query_params.clear()
-    for key in list(st.session_state.keys()):
-        del st.session_state[key]
-    
-    placeholder.empty()
-    st.rerun() # Al volver, ya no habrá sidebar porque no hay sesión
+    """, DURACION_SPLASH_SALIDA)
     
 # --- 4. GESTIÓN DE SESIÓN Y GITHUB ---
 def check_login():
     # 1. DETECTAR SI ESTAMOS SALIENDO
     if st.session_state.get('saliendo'):
         mostrar_splash_salida()
-        return False
 
     # 2. INICIALIZACIÓN DE ESTADO (YA NO LEEMOS LA URL POR SEGURIDAD)
     if 'logged_in' not in st.session_state:
@@ -657,39 +491,27 @@ def check_login():
         if (time.time() - st.session_state['last_active']) > (5 * 60): 
             st.session_state.clear()
             st.query_params.clear() # Limpiamos URL por seguridad
-            placeholder = st.empty()
-            with placeholder.container():
-                st.warning("⚠️ SESIÓN EXPIRADA: Por seguridad, ingrese nuevamente.")
-                time.sleep(3)
-            placeholder.empty()
-            st.rerun()
-            return False
+            st.session_state.update({'logged_in': False, 'usuario': '', 'rol': ''})
+            # El aviso queda sobre la pantalla de login que se dibuja a continuación
+            st.warning("⚠️ SESIÓN EXPIRADA: Por seguridad, ingrese nuevamente.")
         else:
             st.session_state['last_active'] = time.time() 
-        # ----------------------------------------------------------
-
-        if not st.session_state.get('splash_visto'):
-            nombre = st.session_state.get('usuario', '').upper()
-            placeholder = st.empty()
-            with placeholder.container():
-                st.markdown(f"""
-                    <div class="splash-overlay">
-                        <div style="width: 300px; height: 300px;">
-                            <iframe src="https://tenor.com/embed/1281825661231862493" 
-                                    width="100%" height="100%" frameborder="0" allowfullscreen>
-                            </iframe>
-                        </div>
-                        <h2 style="color:#D4AF37; margin-top:30px; font-family:'Playfair Display', serif; letter-spacing:4px; text-transform:uppercase; font-size:22px;">
-                            BIENVENID@ {nombre} AL SISTEMA DE PRÉSTAMOS...
-                        </h2>
+
+            if not st.session_state.get('splash_visto'):
+                nombre = st.session_state.get('usuario', '').upper()
+                mostrar_splash(f"""
+                    <div style="width: 300px; height: 300px;">
+                        <iframe src="https://tenor.com/embed/1281825661231862493" 
+                                width="100%" height="100%" frameborder="0" allowfullscreen>
+                        </iframe>
                     </div>
-                """, unsafe_allow_html=True)
-                time.sleep(3.8)
-            st.session_state['splash_visto'] = True
-            placeholder.empty()
-            st.rerun()
-        
-        return True # Entra al portal
+                    <h2 style="color:#D4AF37; margin-top:30px; font-family:'Playfair Display', serif; letter-spacing:4px; text-transform:uppercase; font-size:22px;">
+                        BIENVENID@ {nombre} AL SISTEMA DE PRÉSTAMOS...
+                    </h2>
+                """, DURACION_SPLASH_ENTRADA)
+                st.session_state['splash_visto'] = True
+            
+            return True # Entra al portal
 
     # --- 4. PANTALLA DE LOGIN (REDiseño Exclusivo) ---
     st.write("") 
@@ -738,6 +560,17 @@ def logout():
         
 # --- 5. INTERFAZ PRINCIPAL ---
 if check_login():
+    # Dependencias pesadas: se importan recién con la sesión iniciada, para que la pantalla
+    # de login no espere a pandas (el cliente de Supabase también se carga al primer uso, ver conexion.py).
+    # Quedan como nombres globales del módulo, así las funciones de arriba las encuentran.
+    import pandas as pd
+    from cartera import (
+        panorama_cartera, indexar_prestamos, proyectar_cobros, fracciones_socios, agrupar_proyeccion,
+        normalizar_pagos_lote, aplicar_pagos, evolucion_cartera, opciones_cobro, a_hora_peru, historial_reparto,
+        ganancias_por_mes,
+    )
+    from busqueda import TablaBuscable, normalizar
+
     # --- SIDEBAR (Menú Lateral) ---
     with st.sidebar:
         st.markdown(f"<h2 style='text-align: center;'>👤 {st.session_state['usuario'].upper()}</h2>", unsafe_allow_html=True)
@@ -758,6 +591,16 @@ if check_login():
         if st.button("🚪 Cerrar Sesión", use_container_width=True):
             logout()
 
+        if st.session_state['rol'] == 'Admin':
+            with st.expander("📡 Estado de conexión"):
+                metricas = get_supabase().metricas.resumen()
+                st.caption(
+                    f"Consultas: {metricas['consultas']} · Reintentos: {metricas['reintentos']} · Fallos: {metricas['fallos']}  \n"
+                    f"Latencia media: {metricas['latencia_media_ms']} ms · Máx: {metricas['latencia_max_ms']} ms · Lentas: {metricas['lentas']}"
+                )
+                if metricas['ultimo_error']:
+                    st.caption(f"Último error: {metricas['ultimo_error']}")
+
     # --- LÓGICA DE PÁGINAS ---
 
     # 1. REGISTRAR NUEVO PRÉSTAMO
@@ -819,6 +662,7 @@ if check_login():
                     # GUARDADO DIRECTO EN SUPABASE
                     try:
                         get_supabase().table("prestamos").insert(nuevo).execute()
+                        invalidar_cache("prestamos")
                         registrar_auditoria("CREACIÓN CRÉDITO", f"Préstamo de S/ {monto}", cliente=cliente)
                         status.update(label="✅ ¡Operación Guardada en Nube!", state="complete", expanded=False)
                         st.balloons()
@@ -833,21 +677,21 @@ if check_login():
 
     # 2. CAJA Y PAGOS
     elif menu == "💸 Registrar Pago":
-        st.markdown("""<div class="header-box">
+        st.markdown("""<div class="header-box pagina-cobranza">
                     <div class="luxury-title">💸 Gestión de Cobranza</div>
                     <div class="luxury-subtitle">Registre los ingresos de capital e intereses de la cartera activa.</div>
                    </div>""", unsafe_allow_html=True)
 
         # --- NUEVA ESTRUCTURA DE PESTAÑAS PARA NO MEZCLAR LÓGICAS ---
-        tab_registrar, tab_corregir = st.tabs(["💵 Registrar Nuevo Pago", "🔄 Corregir / Anular Pago"])
+        tab_registrar, tab_lote, tab_corregir = st.tabs(["💵 Registrar Nuevo Pago", "📥 Carga Masiva", "🔄 Corregir / Anular Pago"])
 
         with tab_registrar:
             # --- AQUÍ INICIA TU CÓDIGO ORIGINAL (RESPETADO 100%) ---
-            datos, sha = cargar_datos()
-            activos = [d for d in datos if d.get('Estado') == 'Activo']
+            # Solo préstamos activos, ordenados por vencimiento (los más urgentes primero)
+            datos, sha = cargar_datos(estado="Activo", columnas=COLS_COBRANZA, orden="Fecha_Proximo_Pago")
             
-            if activos:
-                mapa = {f"{d['Cliente']} | Vence: {d.get('Fecha_Proximo_Pago', 'N/A')}": i for i, d in enumerate(datos) if d.get('Estado') == 'Activo'}
+            if datos:
+                mapa = opciones_cobro(datos)
                 col_sel1, col_sel2, col_sel3 = st.columns([1, 2, 1]) 
             
                 with col_sel2:
@@ -860,32 +704,20 @@ if check_login():
                     dias_restantes = (fecha_venc_dt - hoy).days
 
                     if dias_restantes <= 0:
-                        color_texto = "#943126" 
+                        estado_venc = "vencido"
                         txt_venc = "Vence HOY" if dias_restantes == 0 else f"Vencido hace {abs(dias_restantes)} días"
                         flecha_dir = "inverse"
                     elif dias_restantes <= 5:
-                        color_texto = "#5D4037" 
+                        estado_venc = "proximo"
                         txt_venc = f"En {dias_restantes} días"
                         flecha_dir = "off"       
                     else:
-                        color_texto = "#145A32" 
+                        estado_venc = "al_dia"
                         txt_venc = f"En {dias_restantes} días"
                         flecha_dir = "normal"
 
-                    st.markdown(f"""
-                        <style>
-                        [data-testid="stMetric"] {{ display: flex !important; flex-direction: column !important; align-items: center !important; justify-content: center !important; text-align: center !important; }}
-                        [data-testid="stMetricLabel"], [data-testid="stMetricValue"], [data-testid="stMetricDelta"] {{ display: flex !important; justify-content: center !important; width: 100% !important; }}
-                        [data-testid="stCheckbox"] {{ display: flex !important; justify-content: center !important; align-items: center !important; gap: 8px !important; width: 100% !important; margin: 20px 0 !important; }}
-                        [data-testid="stCheckbox"] label p {{ font-size: 15px !important; color: #D4AF37 !important; font-weight: 700 !important; margin: 0 !important; text-transform: uppercase; }}
-                        [data-testid="stNumberInput"] label {{ display: block !important; text-align: center !important; width: 100% !important; }}
-                        [data-testid="stHorizontalBlock"] > div:nth-child(3) [data-testid="stMetricValue"] div {{ color: {color_texto} !important; }}
-                        [data-testid="stHorizontalBlock"] > div:nth-child(3) [data-testid="stMetricDelta"] div {{ color: {color_texto} !important; }}
-                        [data-testid="stHorizontalBlock"] > div:nth-child(3) [data-testid="stMetricDelta"] svg {{ fill: {color_texto} !important; }}
-                        </style>
-                    """, unsafe_allow_html=True)
-
-                    with st.container(border=True):
+                    # La clase st-key-ficha_<estado> colorea el vencimiento (ver static/tema.css)
+                    with st.container(border=True, key=f"ficha_{estado_venc}"):
                         st.markdown(f"### 👤 {data['Cliente']}")
                         c_info1, c_info2, c_info3 = st.columns(3)
                         c_info1.metric("Deuda Capital", f"S/ {data['Monto_Capital']:,.2f}")
@@ -905,7 +737,6 @@ if check_login():
                         renovar = st.checkbox("📅 **¿Renovar vencimiento al próximo mes?**", value=sugerir_renovar)
                         interes_pendiente = data['Pago_Mensual_Interes'] - pago_interes
                         nuevo_capital = data['Monto_Capital'] - pago_capital + interes_pendiente
-                        nueva_cuota = nuevo_capital * (data['Tasa_Interes'] / 100)
                         nueva_fecha_pago = data['Fecha_Proximo_Pago']
                         txt_fecha_nueva = "Se mantiene igual"
                         if renovar:
@@ -931,15 +762,9 @@ if check_login():
                             st.markdown(f"""<div style="background-color:#EBF5FB; padding:20px; border-radius:10px; border:2px solid #AED6F1; text-align: center;"><p style="color:#1B4F72;">Nueva Deuda Capital</p><h2 style="color:#2874A6;">S/ {nuevo_capital:,.2f}</h2><hr><p>Próx. Vencimiento:</p><p style="font-size:18px;">{txt_fecha_nueva}</p></div>""", unsafe_allow_html=True)
                     
                     if boton_guardar:
-                        upd_data = {}
-                        if nuevo_capital <= 0:
-                            upd_data = {"Estado": "Pagado", "Fecha_Finalizacion": datetime.now().strftime("%Y-%m-%d"), "Observaciones": nota_cierre if nota_cierre else data['Observaciones']}
-                        else:
-                            upd_data = {"Monto_Capital": nuevo_capital, "Pago_Mensual_Interes": nueva_cuota, "Fecha_Proximo_Pago": nueva_fecha_pago}
-                        
+                        # El servidor vuelve a hacer esta misma cuenta sobre el saldo actual (sql/007)
                         try:
-                            get_supabase().table("prestamos").update(upd_data).eq("id", data['id']).execute()
-                            registrar_auditoria("COBRO", f"Pago Recibido: Interés S/ {pago_interes}, Capital S/ {pago_capital}", cliente=data['Cliente'])
+                            registrar_cobro(data, pago_interes, pago_capital, renovar, nota_cierre)
                             st.success("✅ Cartera actualizada correctamente.")
                             time.sleep(2)
                             st.rerun()
@@ -948,89 +773,197 @@ if check_login():
             else:
                 st.info("💡 No hay préstamos activos.")
 
+        # --- PESTAÑA DE CARGA MASIVA: VARIOS COBROS CON UNA SOLA ESCRITURA ---
+        with tab_lote:
+            st.markdown("### 📥 Registrar Varios Cobros")
+            st.caption("Suba un CSV con las columnas Prestamo_Id (o Cliente), Interes, Capital, Renovar (si/no) y Nota, "
+                       "o escriba los cobros en la tabla. Se aplican las mismas reglas que en el registro individual: "
+                       "sin interés se toma la cuota completa y sin Renovar se renueva si el interés la cubre.")
+            if 'resultado_lote' in st.session_state:
+                aplicados, omitidos = st.session_state.pop('resultado_lote')
+                st.success(f"✅ {len(aplicados)} cobros registrados.")
+                if omitidos:
+                    st.warning(f"⚠️ No se aplicaron {len(omitidos)} cobros porque el préstamo cambió mientras tanto: {', '.join(omitidos)}")
+
+            version_lote = st.session_state.get('version_lote', 0)
+            archivo = st.file_uploader("Archivo CSV", type=["csv"], key=f"csv_cobros_{version_lote}")
+            base_lote = pd.DataFrame()
+            if archivo is not None:
+                try:
+                    # sep=None detecta coma o punto y coma (Excel en español)
+                    base_lote = pd.read_csv(archivo, sep=None, engine="python", encoding="utf-8-sig", dtype=str)
+                except Exception as e:
+                    st.error(f"No se pudo leer el archivo: {e}")
+            try:
+                base_lote = normalizar_pagos_lote(base_lote)
+            except ValueError as e:
+                # El mensaje nombra la fila del CSV con el monto ilegible
+                st.error(f"No se pudo leer el archivo: {e}")
+                base_lote = normalizar_pagos_lote(pd.DataFrame())
+            base_lote["Renovar"] = base_lote["Renovar"].map({True: "si", False: "no"})
+
+            lote = st.data_editor(
+                base_lote, num_rows="dynamic", hide_index=True, use_container_width=True,
+                key=f"editor_cobros_{version_lote}_{archivo.file_id if archivo else ''}",
+                column_config={
+                    "Prestamo_Id": st.column_config.NumberColumn("ID Préstamo", format="%d"),
+                    "Cliente": st.column_config.TextColumn("👤 Cliente"),
+                    "Interes": st.column_config.NumberColumn("Interés Pagado", min_value=0.0, format="S/ %.2f"),
+                    "Capital": st.column_config.NumberColumn("Capital Pagado", min_value=0.0, format="S/ %.2f"),
+                    "Renovar": st.column_config.SelectboxColumn("📅 Renovar", options=["si", "no"]),
+                    "Nota": st.column_config.TextColumn("📝 Nota de Cierre"),
+                },
+            )
+            try:
+                lote = normalizar_pagos_lote(lote)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                lote = normalizar_pagos_lote(pd.DataFrame())
+            lote = lote[lote["Prestamo_Id"].notna() | (lote["Cliente"] != "")]
+
+            if not lote.empty:
+                activos, _ = cargar_datos(estado="Activo", columnas=COLS_COBRANZA, orden="Fecha_Proximo_Pago")
+                cobros = aplicar_pagos(activos, lote, datetime.now().date())
+                validos = cobros[cobros["Error"] == ""]
+
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Cobros Válidos", f"{len(validos)} de {len(cobros)}")
+                m2.metric("Interés", f"S/ {validos['Interes'].sum():,.2f}")
+                m3.metric("Capital", f"S/ {validos['Capital'].sum():,.2f}")
+                m4.metric("Deudas Canceladas", int(validos["Cancelado"].sum()))
+                if len(validos) < len(cobros):
+                    st.warning(f"⚠️ {len(cobros) - len(validos)} filas tienen errores y no se registrarán (ver columna Error).")
+
+                st.dataframe(
+                    cobros[["Fila", "id", "Cliente", "Interes", "Capital", "Capital_Anterior", "Nuevo_Capital",
+                            "Nueva_Cuota", "Vencimiento_Anterior", "Nuevo_Vencimiento", "Cancelado", "Error"]],
+                    hide_index=True, use_container_width=True,
+                    column_config={
+                        "id": st.column_config.NumberColumn("ID", format="%d"),
+                        "Interes": st.column_config.NumberColumn("Interés", format="S/ %.2f"),
+                        "Capital": st.column_config.NumberColumn("Capital", format="S/ %.2f"),
+                        "Capital_Anterior": st.column_config.NumberColumn("Deuda Actual", format="S/ %.2f"),
+                        "Nuevo_Capital": st.column_config.NumberColumn("Nueva Deuda", format="S/ %.2f"),
+                        "Nueva_Cuota": st.column_config.NumberColumn("Nueva Cuota", format="S/ %.2f"),
+                        "Vencimiento_Anterior": st.column_config.TextColumn("Vence"),
+                        "Nuevo_Vencimiento": st.column_config.TextColumn("Próx. Vencimiento"),
+                        "Cancelado": st.column_config.CheckboxColumn("¿Cancela?"),
+                    },
+                )
+
+                if st.button(f"💾 PROCESAR {len(validos)} COBROS", use_container_width=True, disabled=validos.empty):
+                    try:
+                        with st.spinner("Registrando cobros..."):
+                            st.session_state['resultado_lote'] = registrar_pagos_lote(validos)
+                        # Tabla y archivo nuevos: el mismo lote no se puede enviar dos veces
+                        st.session_state['version_lote'] = version_lote + 1
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error al registrar los cobros: {e}")
+
         # --- SEGUNDA PESTAÑA: LÓGICA DE CORRECCIÓN ---
         with tab_corregir:
             st.markdown("### 🔄 Corregir o Anular un Cobro")
             st.caption("Esta sección permite modificar el historial de pagos para ajustar la tabla de Socios y Auditoría.")
             
-            logs_audit, _ = cargar_datos("auditoria")
-            if logs_audit:
-                df_logs = pd.DataFrame(logs_audit)
-                # Filtrar solo registros de COBRO (Pagos de interés/capital)
-                cobros = df_logs[df_logs['Operación'] == 'COBRO'].copy()
+            # Cobros del libro 'pagos', del más reciente al más antiguo, de a una página
+            visibles, hay_mas_cobros = cargar_pagos_recientes(st.session_state.get('paginas_cobros', 1), COLS_PAGOS_CORRECCION)
+            if visibles:
+                cobros = pd.DataFrame(visibles)
+                cobros['Fecha'] = a_hora_peru(cobros['Fecha_Pago'])
+                dict_cobros = {
+                    f"{r['Fecha']} | {r['Cliente']} | Interés S/ {r['Interes_Pagado']:,.2f}, Capital S/ {r['Capital_Pagado']:,.2f}": r['id'] 
+                    for _, r in cobros.iterrows()
+                }
                 
-                if not cobros.empty:
-                    cobros = cobros.iloc[::-1] # Ver últimos primero
-                    dict_cobros = {
-                        f"{r['Fecha/Hora']} | {r['Cliente Afectado']} | {r['Detalle del Movimiento']}": r['id'] 
-                        for _, r in cobros.iterrows()
-                    }
-                    
-                    seleccion_cobro = st.selectbox("Seleccione el registro de pago mal ingresado:", list(dict_cobros.keys()))
-                    id_log = dict_cobros[seleccion_cobro]
-                    data_log = cobros[cobros['id'] == id_log].iloc[0]
-                    
-                    c_corr1, c_corr2 = st.columns(2)
+                seleccion_cobro = st.selectbox("Seleccione el registro de pago mal ingresado:", list(dict_cobros.keys()))
+                st.caption(f"Mostrando los {len(cobros)} cobros más recientes.")
+                boton_cargar_mas('paginas_cobros', hay_mas_cobros)
+                id_pago = dict_cobros[seleccion_cobro]
+                data_pago = cobros[cobros['id'] == id_pago].iloc[0]
+                cli_pago = data_pago['Cliente']
+                prestamo_pago = cargar_indice_prestamos()['por_id'].get(data_pago['Prestamo_Id'])
+                if prestamo_pago:
+                    st.caption(f"Préstamo asociado: {prestamo_pago['Estado']} | Deuda capital actual S/ {prestamo_pago['Monto_Capital']:,.2f}")
+                montos_previos = f"Interés S/ {data_pago['Interes_Pagado']}, Capital S/ {data_pago['Capital_Pagado']}"
+                
+                c_corr1, c_corr2 = st.columns(2)
+                
+                with c_corr1:
+                    st.info("✏️ **Editar Montos**")
+                    nuevo_interes_pago = st.number_input("Interés cobrado (S/)", min_value=0.0, value=float(data_pago['Interes_Pagado']), step=10.0, key=f"corr_int_{id_pago}")
+                    nuevo_capital_pago = st.number_input("Capital cobrado (S/)", min_value=0.0, value=float(data_pago['Capital_Pagado']), step=50.0, key=f"corr_cap_{id_pago}")
+                    st.caption("Nota: La tabla de Socios se recalcula con los montos corregidos.")
                     
-                    with c_corr1:
-                        st.info("✏️ **Editar Información**")
-                        nuevo_detalle_audit = st.text_area("Corregir Detalle (Ej: Cambiar el monto del interés):", value=data_log['Detalle del Movimiento'])
-                        st.caption("Nota: Si cambias el monto del 'Interés S/', se actualizará automáticamente la tabla de Socios.")
-                        
-                        if st.button("💾 Aplicar Corrección en Historial"):
-                            try:
-                                get_supabase().table("auditoria").update({"Detalle del Movimiento": nuevo_detalle_audit}).eq("id", id_log).execute()
-                                registrar_auditoria("CORRECCIÓN COBRO", f"Se editó un cobro antiguo de {data_log['Cliente Afectado']}", cliente=data_log['Cliente Afectado'])
-                                st.success("✅ Detalle actualizado en auditoría y socios.")
-                                time.sleep(1.5)
-                                st.rerun()
-                            except Exception as e: st.error(f"Error: {e}")
+                    if st.button("💾 Aplicar Corrección en Historial"):
+                        try:
+                            get_supabase().table("pagos").update({"Interes_Pagado": nuevo_interes_pago, "Capital_Pagado": nuevo_capital_pago}).eq("id", id_pago).execute()
+                            invalidar_cache("pagos")
+                            registrar_auditoria("CORRECCIÓN COBRO", f"Se editó un cobro antiguo de {cli_pago}: {montos_previos} -> Interés S/ {nuevo_interes_pago}, Capital S/ {nuevo_capital_pago}", cliente=cli_pago)
+                            st.success("✅ Cobro actualizado en historial y socios.")
+                            time.sleep(1.5)
+                            st.rerun()
+                        except Exception as e: st.error(f"Error: {e}")
 
-                    with c_corr2:
-                        st.warning("🗑️ **Anular Cobro**")
-                        st.write("Si anulas este cobro, desaparecerá de la tabla de Socios y del historial.")
-                        
-                        if st.button("❌ ANULAR Y ELIMINAR REGISTRO"):
-                            try:
-                                get_supabase().table("auditoria").delete().eq("id", id_log).execute()
-                                registrar_auditoria("ANULACIÓN COBRO", f"Se eliminó registro de cobro: {data_log['Detalle del Movimiento']}", cliente=data_log['Cliente Afectado'])
-                                st.success("🗑️ Registro eliminado correctamente.")
-                                time.sleep(1.5)
-                                st.rerun()
-                            except Exception as e: st.error(f"Error: {e}")
-                else:
-                    st.info("No se encontraron registros de cobros para corregir.")
+                with c_corr2:
+                    st.warning("🗑️ **Anular Cobro**")
+                    st.write("Si anulas este cobro, desaparecerá de la tabla de Socios y del historial. La auditoría conserva el registro original.")
+                    
+                    if st.button("❌ ANULAR Y ELIMINAR REGISTRO"):
+                        try:
+                            get_supabase().table("pagos").delete().eq("id", id_pago).execute()
+                            invalidar_cache("pagos")
+                            registrar_auditoria("ANULACIÓN COBRO", f"Se eliminó registro de cobro: {montos_previos}", cliente=cli_pago)
+                            st.success("🗑️ Registro eliminado correctamente.")
+                            time.sleep(1.5)
+                            st.rerun()
+                        except Exception as e: st.error(f"Error: {e}")
+            else:
+                st.info("No se encontraron registros de cobros para corregir.")
     # 3. DASHBOARD GERENCIAL
     elif menu == "📊 Dashboard General":
         st.markdown("""<div class="header-box">
                 <div class="luxury-title">📊 Resumen Estratégico</div>
                 <div class="luxury-subtitle">Inteligencia de Datos, Control de Activos y Gestión de Cobranza.</div>
                </div>""", unsafe_allow_html=True)
+
+        # --- KPIs SUPERIORES ---
+        # Salen de la vista resumen_cartera, así se ven mientras se descarga la cartera completa
+        huecos_kpi = [col.empty() for col in st.columns(3)]
+        activos = (cargar_resumen_cartera() or {}).get("Activo")
+        if activos:
+            mostrar_metricas(huecos_kpi, [
+                ("CAPITAL ACTIVO", f"S/ {activos['capital']:,.2f}"),
+                ("FLUJO MENSUAL", f"S/ {activos['interes']:,.2f}"),
+                ("CLIENTES ACTIVOS", f"{activos['prestamos']}"),
+            ])
         
-        datos, sha = cargar_datos()
-        logs_audit, _ = cargar_datos("auditoria")
+        datos, sha = cargar_datos(estado="Activo", columnas=COLS_DASHBOARD)
         
         if datos:
             df = pd.DataFrame(datos)
-            df = df[df['Estado'] == 'Activo']
             hoy = datetime.now().date()
-            
-            # --- KPIs SUPERIORES ---
-            k1, k2, k3 = st.columns(3)
-            total = df['Monto_Capital'].sum()
-            ganancia = df['Pago_Mensual_Interes'].sum()
-            k1.metric("CAPITAL ACTIVO", f"S/ {total:,.2f}")
-            k2.metric("FLUJO MENSUAL", f"S/ {ganancia:,.2f}")
-            k3.metric("CLIENTES ACTIVOS", f"{len(df)}")
+            # Días al vencimiento de toda la cartera en una sola pasada (compartido por las pestañas 1 a 3)
+            panorama = panorama_cartera(df, hoy)
+
+            if not activos:
+                # Sin la vista (sql/008) se suman en pandas, como antes
+                mostrar_metricas(huecos_kpi, [
+                    ("CAPITAL ACTIVO", f"S/ {df['Monto_Capital'].sum():,.2f}"),
+                    ("FLUJO MENSUAL", f"S/ {df['Pago_Mensual_Interes'].sum():,.2f}"),
+                    ("CLIENTES ACTIVOS", f"{len(df)}"),
+                ])
 
             st.write("")
 
-            # --- SUBMÓDULOS DEL DASHBOARD (4 TABS) ---
-            tab1, tab2, tab3, tab4 = st.tabs([
+            # --- SUBMÓDULOS DEL DASHBOARD (6 TABS) ---
+            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
                 "🔔 ACCIONES DE COBRO PRIORITARIAS", 
                 "📲 CENTRO DE NOTIFICACIONES", 
                 "📋 CARTERA DE CLIENTES",
-                "🤝 INTERÉS MULTI-SOCIO"
+                "🤝 INTERÉS MULTI-SOCIO",
+                "📈 PROYECCIÓN DE COBROS",
+                "📉 EVOLUCIÓN DE LA CARTERA"
             ])
 
             # --- TAB 1 (INTACTO) ---
@@ -1038,20 +971,12 @@ if check_login():
                 st.markdown("### 🔔 ALERTAS DE COBRANZA")
                 col_alert1, col_alert2 = st.columns([1, 1])
                 
-                avisos_hoy = []
-                avisos_mora = []
-                alertas_proximas = []
-                
-                for _, r in df.iterrows():
-                    venc_dt = datetime.strptime(r['Fecha_Proximo_Pago'], "%Y-%m-%d").date()
-                    dias = (venc_dt - hoy).days
-                    
-                    if dias < 0:
-                        avisos_mora.append(f"<div class='alert-box alert-danger'>🚨 MORA: {r['Cliente']} (Hace {abs(dias)} días)</div>")
-                    elif dias == 0:
-                        avisos_hoy.append(f"<div class='alert-box alert-warning'>⚠️ COBRAR HOY: {r['Cliente']} - S/ {r['Pago_Mensual_Interes']:,.2f}</div>")
-                    elif dias <= 5:
-                        alertas_proximas.append(f"<div class='alert-box' style='background-color:#EFEBE9; color:#5D4037; border:1px solid #5D4037;'>🕒 PRÓXIMO: {r['Cliente']} (En {dias} días)</div>")
+                avisos_mora = [f"<div class='alert-box alert-danger'>🚨 MORA: {cli} (Hace {abs(dias)} días)</div>"
+                               for cli, dias in zip(panorama['mora']['Cliente'], panorama['mora']['dias'])]
+                avisos_hoy = [f"<div class='alert-box alert-warning'>⚠️ COBRAR HOY: {cli} - S/ {cuota:,.2f}</div>"
+                              for cli, cuota in zip(panorama['hoy']['Cliente'], panorama['hoy']['Pago_Mensual_Interes'])]
+                alertas_proximas = [f"<div class='alert-box' style='background-color:#EFEBE9; color:#5D4037; border:1px solid #5D4037;'>🕒 PRÓXIMO: {cli} (En {dias} días)</div>"
+                                    for cli, dias in zip(panorama['proximos']['Cliente'], panorama['proximos']['dias'])]
 
                 with col_alert1:
                     if avisos_mora or avisos_hoy:
@@ -1068,16 +993,14 @@ if check_login():
             with tab2:
                 st.markdown("### 📲 CENTRO DE NOTIFICACIONES PREMIUM")
                 n1, n2, n3 = st.columns(3)
-                vencidos_list, hoy_list, proximos_list = [], [], []
-                
-                for _, r in df.iterrows():
-                    venc_f = datetime.strptime(r['Fecha_Proximo_Pago'], "%Y-%m-%d").date()
-                    d_diff = (venc_f - hoy).days
-                    info = {"nombre": r['Cliente'], "tel": r['Telefono'], "monto": r['Pago_Mensual_Interes'], "fecha": venc_f.strftime("%d/%m/%Y")}
-                    
-                    if d_diff < 0: vencidos_list.append(info)
-                    elif d_diff == 0: hoy_list.append(info)
-                    elif 0 < d_diff <= 3: proximos_list.append(info)
+                def _avisos(grupo):
+                    return [{"nombre": cli, "tel": tel, "monto": monto, "fecha": fecha}
+                            for cli, tel, monto, fecha in zip(grupo['Cliente'], grupo['Telefono'], grupo['Pago_Mensual_Interes'], grupo['Vencimiento'].dt.strftime("%d/%m/%Y"))]
+
+                vencidos_list = _avisos(panorama['mora'])
+                hoy_list = _avisos(panorama['hoy'])
+                # Recordatorios por WhatsApp solo para los que vencen en 3 días o menos
+                proximos_list = _avisos(panorama['proximos'][panorama['proximos']['dias'] <= 3])
                 
                 with n1:
                     st.markdown("##### ⚠️ En Mora")
@@ -1098,9 +1021,74 @@ if check_login():
             # --- TAB 3 (INTACTO) ---
             with tab3:
                 st.markdown("### 📋 CARTERA DE CLIENTES ACTIVA")
-                df['Vence'] = pd.to_datetime(df['Fecha_Proximo_Pago']).dt.strftime('%d/%m/%Y')
-                df['% Interés'] = df['Tasa_Interes'].apply(lambda x: f"{x:.1f}%")
-                st.dataframe(df[["Cliente", "Telefono", "Monto_Capital", "% Interés", "Pago_Mensual_Interes", "Vence", "Observaciones"]], use_container_width=True, hide_index=True)
+                df_cartera = panorama['cartera']
+                df_cartera = df_cartera.assign(
+                    Vence=df_cartera['Vencimiento'].dt.strftime('%d/%m/%Y'),
+                    **{'% Interés': df_cartera['Tasa_Interes'].map("{:.1f}%".format)}
+                )
+                st.dataframe(df_cartera[["Cliente", "Telefono", "Monto_Capital", "% Interés", "Pago_Mensual_Interes", "Vence", "Observaciones"]], use_container_width=True, hide_index=True)
+
+            # --- TAB 5: PROYECCIÓN DE COBROS ---
+            # Se escribe antes que la pestaña 4 porque esa corta la ejecución (st.stop) si no hay socios elegidos
+            with tab5:
+                st.markdown("### 📈 PROYECCIÓN DE COBROS")
+                st.caption("Intereses esperados si cada préstamo activo renueva cada mes en su fecha (sin abonos a capital).")
+                c_proy1, c_proy2, c_proy3 = st.columns(3)
+                meses_proyeccion = c_proy1.slider("Meses a proyectar", 1, 12, 6, key="meses_proyeccion")
+                frecuencia = c_proy2.radio("Agrupar por", ["mes", "semana"], format_func=str.capitalize, horizontal=True, key="frecuencia_proyeccion")
+                por_socio = c_proy3.toggle("Detalle por socio", key="proyeccion_por_socio")
+
+                proyeccion, fracciones = cargar_proyeccion(meses_proyeccion)
+                if proyeccion.empty:
+                    st.info("No hay cuotas por proyectar.")
+                else:
+                    vencidas = proyeccion['vencida']
+                    m_proy1, m_proy2 = st.columns(2)
+                    m_proy1.metric("INTERÉS ESPERADO", f"S/ {proyeccion.loc[~vencidas, 'Interes'].sum():,.2f}")
+                    m_proy2.metric("CUOTAS VENCIDAS SIN PAGAR", f"S/ {proyeccion.loc[vencidas, 'Interes'].sum():,.2f}")
+
+                    tabla_proyeccion = agrupar_proyeccion(proyeccion, frecuencia, fracciones if por_socio else None)
+                    st.bar_chart(tabla_proyeccion.drop(index="Vencido", errors="ignore"))
+                    st.dataframe(
+                        tabla_proyeccion,
+                        use_container_width=True,
+                        column_config={c: st.column_config.NumberColumn(c, format="S/ %.2f") for c in tabla_proyeccion.columns}
+                    )
+
+            # --- TAB 6: EVOLUCIÓN DE LA CARTERA (FOTOS DIARIAS) ---
+            # También antes de la pestaña 4, por su st.stop
+            with tab6:
+                st.markdown("### 📉 EVOLUCIÓN DE LA CARTERA")
+                st.caption("Una foto por día de la cartera activa, guardada por el aviso diario (notifier.py).")
+                periodos = {"30 días": 30, "90 días": 90, "1 año": 365, "Todo": None}
+                periodo = st.radio("Período", list(periodos), index=1, horizontal=True, key="periodo_evolucion")
+                dias_periodo = periodos[periodo]
+                desde = (hoy - timedelta(days=dias_periodo)).isoformat() if dias_periodo else None
+                evolucion = cargar_fotos_cartera(desde)
+
+                if evolucion is None:
+                    st.info("💡 Las fotos diarias no están disponibles: ejecute sql/009_fotos_cartera.sql en Supabase.")
+                elif evolucion.empty:
+                    st.info("Aún no hay fotos de la cartera en este período: se guardan una vez al día.")
+                else:
+                    ultima = evolucion.iloc[-1]
+                    # Variación respecto de la primera foto del período; el signo va delante para que st.metric elija la flecha
+                    cambio = {c: f"{'-' if d < 0 else '+'}S/ {abs(d):,.2f}" for c, d in (ultima - evolucion.iloc[0]).items()}
+                    st.caption(f"Del {evolucion.index[0]:%d/%m/%Y} al {evolucion.index[-1]:%d/%m/%Y} ({len(evolucion)} fotos).")
+                    e1, e2, e3, e4 = st.columns(4)
+                    e1.metric("CAPITAL ACTIVO", f"S/ {ultima['capital_activo']:,.2f}", cambio["capital_activo"])
+                    e2.metric("FLUJO MENSUAL", f"S/ {ultima['flujo_mensual']:,.2f}", cambio["flujo_mensual"])
+                    e3.metric("PRÉSTAMOS EN MORA", f"{ultima['mora_prestamos']:.0f}", f"{ultima['mora_prestamos'] - evolucion['mora_prestamos'].iloc[0]:+.0f}", delta_color="inverse")
+                    e4.metric("CAPITAL EN MORA", f"S/ {ultima['mora_capital']:,.2f}", cambio["mora_capital"], delta_color="inverse")
+
+                    st.markdown("#### 💰 Capital y Flujo Mensual")
+                    st.line_chart(evolucion[["capital_activo", "flujo_mensual"]].rename(columns={"capital_activo": "Capital activo", "flujo_mensual": "Flujo mensual"}))
+                    st.markdown("#### 🚨 Mora")
+                    st.line_chart(evolucion[["mora_capital", "mora_interes"]].rename(columns={"mora_capital": "Capital en mora", "mora_interes": "Cuotas vencidas"}))
+                    socios_fotos = [c for c in evolucion.columns if c not in COLS_FOTOS]
+                    if socios_fotos:
+                        st.markdown("#### 🤝 Capital por Socio")
+                        st.line_chart(evolucion[socios_fotos])
 
             # --- TAB 4: LÓGICA MULTI-SOCIOS ESCALABLE ---
             with tab4:
@@ -1139,99 +1127,62 @@ if check_login():
                 opciones_clientes = []
 
                 for i, d in enumerate(datos):
-                    if d.get('Estado') == 'Activo':
-                        tasa_cli = float(d.get('Tasa_Interes') or 0.0)
-                        
-                        # --- LÓGICA DE RECUPERACIÓN DE DATOS (COMPATIBILIDAD) ---
-                        # Buscamos si ya tiene un diccionario de distribución guardado
-                        distribucion = d.get('Distribucion_Socios') or {}
-                        
-                        # Si no existe (es dato antiguo) o faltan socios nuevos, recalculamos defaults
-                        # Si es dato antiguo con 'Porc_Socio1', intentamos usarlo
-                        if not distribucion:
-                            if 'Porc_Socio1' in d and len(socios_seleccionados) == 2:
-                                # Lógica compatible con lo anterior
-                                p1 = float(d.get('Porc_Socio1') or 0.0)
-                                p2 = tasa_cli - p1
-                                # Asignamos al primero y segundo de la lista actual
-                                distribucion = {socios_seleccionados[0]: p1, socios_seleccionados[1]: p2}
-                            else:
-                                # Si no hay datos previos o son más de 2 socios, dividimos equitativamente
-                                distribucion = {}
-                                for s in socios_seleccionados:
-                                    if "Bruno" in s:
-                                        distribucion[s] = 10.0
-                                    elif "Piera" in s:
-                                        distribucion[s] = 8.0
-                                    else:
-                                        distribucion[s] = tasa_cli / len(socios_seleccionados)
-                        
-                        # Guardamos datos calculados para la tabla visual
-                        fila_tabla = {"Cliente": d['Cliente'], "Tasa Total": f"{tasa_cli}%"}
+                    tasa_cli = float(d.get('Tasa_Interes') or 0.0)
+                    
+                    # --- LÓGICA DE RECUPERACIÓN DE DATOS (COMPATIBILIDAD) ---
+                    # Buscamos si ya tiene un diccionario de distribución guardado
+                    distribucion = d.get('Distribucion_Socios') or {}
+                    
+                    # Si no existe (es dato antiguo) o faltan socios nuevos, recalculamos defaults
+                    # Si es dato antiguo con 'Porc_Socio1', intentamos usarlo
+                    if not distribucion:
+                        if 'Porc_Socio1' in d and len(socios_seleccionados) == 2:
+                            # Lógica compatible con lo anterior
+                            p1 = float(d.get('Porc_Socio1') or 0.0)
+                            p2 = tasa_cli - p1
+                            # Asignamos al primero y segundo de la lista actual
+                            distribucion = {socios_seleccionados[0]: p1, socios_seleccionados[1]: p2}
+                        else:
+                            # Si no hay datos previos o son más de 2 socios, dividimos equitativamente
+                            distribucion = {}
+                            for s in socios_seleccionados:
+                                if "Bruno" in s:
+                                    distribucion[s] = 10.0
+                                elif "Piera" in s:
+                                    distribucion[s] = 8.0
+                                else:
+                                    distribucion[s] = tasa_cli / len(socios_seleccionados)
+                    
+                    # Guardamos datos calculados para la tabla visual
+                    fila_tabla = {"Cliente": d['Cliente'], "Tasa Total": f"{tasa_cli}%"}
+                    
+                    for socio in socios_seleccionados:
+                        pct = float(distribucion.get(socio, 0.0))
+                        ganancia = d['Monto_Capital'] * (pct / 100)
                         
-                        for socio in socios_seleccionados:
-                            pct = float(distribucion.get(socio, 0.0))
-                            ganancia = d['Monto_Capital'] * (pct / 100)
-                            
-                            acumulado[socio] = acumulado.get(socio, 0.0) + ganancia
-                            
-                            fila_tabla[f"% {socio}"] = f"{pct:.1f}%"
-                            fila_tabla[f"$ {socio}"] = ganancia # Valor numérico para config
+                        acumulado[socio] = acumulado.get(socio, 0.0) + ganancia
                         
-                        tabla_resumen.append(fila_tabla)
-                        opciones_clientes.append(f"{i} | {d['Cliente']} (Tasa: {tasa_cli}%)")
-
-                # --- NUEVA LÓGICA COMPLEMENTARIA PARA HISTORIAL ACUMULATIVO (SIN ELIMINAR TU LÓGICA) ---
-                tabla_historial_acumulada = []
-                acumulado_historico = {s: 0.0 for s in socios_seleccionados}
-
-                if logs_audit:
-                    df_audit_logs = pd.DataFrame(logs_audit)
-                    # Filtramos solo los registros de COBRO (Pagos realizados)
-                    pagos_reales = df_audit_logs[df_audit_logs['Operación'] == 'COBRO'].copy()
+                        fila_tabla[f"% {socio}"] = f"{pct:.1f}%"
+                        fila_tabla[f"$ {socio}"] = ganancia # Valor numérico para config
                     
-                    for _, log in pagos_reales.iterrows():
-                        cli_log = log['Cliente Afectado']
-                        det = log['Detalle del Movimiento']
-                        fecha_registro = log['Fecha/Hora']
-                        
-                        # Extraer el monto de interés del texto del log
-                        try:
-                            interes_pagado = float(det.split("Interés S/ ")[1].split(",")[0])
-                        except:
-                            interes_pagado = 0.0
+                    tabla_resumen.append(fila_tabla)
+                    opciones_clientes.append(f"{i} | {d['Cliente']} (Tasa: {tasa_cli}%)")
 
-                        # Buscar la distribución de socios que tiene el cliente
-                        c_data = next((item for item in datos if item['Cliente'] == cli_log), None)
-                        
-                        if c_data and interes_pagado > 0:
-                            dist = c_data.get('Distribucion_Socios') or {}
-                            t_total = float(c_data.get('Tasa_Interes', 1))
-                            
-                            fila_hist = {
-                                "Fecha de Pago": fecha_registro,
-                                "Cliente": cli_log,
-                                "Monto Recibido": interes_pagado
-                            }
-                            
-                            for s in socios_seleccionados:
-                                p_socio = dist.get(s)
-                                if p_socio is None:
-                                    s_upper = s.upper()
-                                    coincidencia = next((v for k, v in dist.items() if k.upper() in s_upper or s_upper in k.upper()), None)
-                                    
-                                    if coincidencia is not None:
-                                        p_socio = float(coincidencia)
-                                    else:
-                                        if "BRUNO" in s_upper: p_socio = 10.0
-                                        elif "PIERA" in s_upper: p_socio = 8.0
-                                        else: p_socio = t_total / len(socios_seleccionados)
-                                # Proporción: (Mi % / Tasa Total) * Lo que el cliente pagó realmente
-                                gan_socio = (float(p_socio) / t_total) * interes_pagado
-                                acumulado_historico[s] += gan_socio
-                                fila_hist[f"$ {s}"] = gan_socio                             
-                            
-                            tabla_historial_acumulada.append(fila_hist)
+                # --- HISTORIAL ACUMULATIVO (MATERIALIZADO) ---
+                # Los totales salen de ganancias_socios y el detalle, del reparto que cada cobro
+                # guardó al registrarse (pagos.reparto); ya no se busca el préstamo de cada pago.
+                acumulado_historico = {s: 0.0 for s in socios_seleccionados}
+                ganancias = cargar_ganancias_socios()
+                for g in ganancias:
+                    if g['socio'] in acumulado_historico:
+                        acumulado_historico[g['socio']] += float(g['monto'])
+
+                # Pagos realizados (libro 'pagos'), del último registrado hacia atrás, por páginas:
+                # no se descarga el libro completo en cada rerun
+                pagos_ledger, hay_mas_historial = cargar_pagos_recientes(
+                    st.session_state.get('paginas_historial_socios', 1), COLS_PAGOS_SOCIOS
+                )
+                df_historial = historial_reparto(pagos_ledger, socios_seleccionados)
 
                 # Reemplazamos el 'acumulado' de tus tarjetas por el 'acumulado_historico'
                 # para que las métricas superiores también sean acumulativas.
@@ -1242,19 +1193,27 @@ if check_login():
                 
                 # Creamos tantas columnas como socios haya
                 cols = st.columns(len(socios_seleccionados))
-                colores = ["#2980B9", "#8E44AD", "#27AE60", "#D35400", "#C0392B"] # Lista de colores para rotar
+                n_colores = 5 # Clases .socio-0 a .socio-4 de static/tema.css, se rotan
 
                 for idx, socio in enumerate(socios_seleccionados):
-                    color_actual = colores[idx % len(colores)]
                     monto_total = acumulado[socio]
                     with cols[idx]:
                         st.markdown(f"""
-                        <div class="metric-card" style="border-left: 6px solid {color_actual}; margin-bottom:10px;">
-                            <div class="metric-title" style="color:{color_actual}; font-size:13px;">{socio.upper()}</div>
+                        <div class="metric-card tarjeta-socio socio-{idx % n_colores}">
+                            <div class="metric-title nombre-socio" style="font-size:13px;">{socio.upper()}</div>
                             <div class="metric-value" style="font-size: 20px;">S/ {monto_total:,.2f}</div>
                         </div>
                         """, unsafe_allow_html=True)
 
+                if ganancias:
+                    with st.expander("📅 Ganancias por mes", expanded=False):
+                        tabla_mes = ganancias_por_mes(ganancias, socios_seleccionados)
+                        st.dataframe(
+                            tabla_mes,
+                            use_container_width=True,
+                            column_config={s: st.column_config.NumberColumn(s, format="S/ %.2f") for s in tabla_mes.columns}
+                        )
+
                 st.markdown("---")
 
                 # 4. ZONA DE EDICIÓN
@@ -1299,16 +1258,16 @@ if check_login():
                                 st.markdown("##### 👤 Resultado Financiero:")
                                 for idx, s in enumerate(socios_seleccionados):
                                     g = item_cli['Monto_Capital'] * (nuevos_valores[s] / 100)
-                                    color_actual = colores[idx % len(colores)]
                                                                        
                                     st.markdown(f"""
-                                    <div style="border-left: 4px solid {color_actual}; background-color: #1a1a1a; padding: 10px; margin-bottom: 5px; border-radius: 5px;">
-                                        <span style="color:{color_actual}; font-weight:bold;">{s}:</span> 
+                                    <div class="resultado-socio socio-{idx % n_colores}">
+                                        <span class="nombre-socio" style="font-weight:bold;">{s}:</span> 
                                         <span style="color:white; float:right;">S/ {g:,.2f}</span>
                                     </div>
                                     """, unsafe_allow_html=True)
 
                                 # --- NUEVA LÓGICA DE GUARDADO EN SUPABASE ---
+                                st.caption("Los cobros ya registrados conservan el reparto con que se cobraron (python recalcular_ganancias.py --repartir lo rehace con la distribución actual).")
                                 if st.button("💾 GUARDAR CAMBIOS"):
                                     try:
                                         # 1. Ejecutamos la actualización directamente en Supabase usando el ID
@@ -1317,6 +1276,7 @@ if check_login():
                                             "Distribucion_Socios": nuevos_valores,
                                             "Porc_Socio1": list(nuevos_valores.values())[0]
                                         }).eq("id", item_cli['id']).execute()
+                                        invalidar_cache("prestamos")
                                         
                                         # 2. Registramos el movimiento en la nueva tabla de auditoría SQL
                                         registrar_auditoria("REPARTICIÓN SOCIOS", f"Ajuste de porcentajes de interés", cliente=item_cli['Cliente'])
@@ -1339,12 +1299,8 @@ if check_login():
                     with c_view:
                         st.markdown("#### 📊 Tabla de Detalle Histórico")
                         
-                        if tabla_historial_acumulada:
-                            # Creamos el DataFrame desde el historial acumulado
-                            df_historial = pd.DataFrame(tabla_historial_acumulada)
-                            # Ordenamos para ver lo último que se pagó arriba
-                            df_historial = df_historial.iloc[::-1]
-
+                        if not df_historial.empty:
+                            # Ya viene ordenado con lo último que se pagó arriba
                             # Configuración dinámica de columnas (Respetando tu estilo)
                             col_config = {f"$ {s}": st.column_config.NumberColumn(f"Ganancia {s.split()[0]}", format="S/ %.2f") for s in socios_seleccionados}
                             col_config["Monto Recibido"] = st.column_config.NumberColumn("Total Interés", format="S/ %.2f")
@@ -1358,6 +1314,7 @@ if check_login():
                             )
                         else:
                             st.info("No se han registrado cobros en el historial aún.")
+                        boton_cargar_mas('paginas_historial_socios', hay_mas_historial)
                 else:
                     st.info("No hay clientes activos.")
         else:
@@ -1370,13 +1327,13 @@ if check_login():
                     <div class="luxury-subtitle">Control de Registros y Ajustes de Cartera</div>
                    </div>""", unsafe_allow_html=True)
         
-        datos, sha = cargar_datos()
+        prestamos_por_id = cargar_indice_prestamos()['por_id']
         
-        if datos:
+        if prestamos_por_id:
             # --- FILTRAR SOLO CLIENTES ACTIVOS ---
             lista_edicion = [
-                f"{i} | {d['Cliente']} (Capital: S/ {d['Monto_Capital']})" 
-                for i, d in enumerate(datos) 
+                f"{id_p} | {d['Cliente']} (Capital: S/ {d['Monto_Capital']})" 
+                for id_p, d in prestamos_por_id.items() 
                 if d.get('Estado') == 'Activo'
             ]
             
@@ -1386,9 +1343,9 @@ if check_login():
                 with col_sel1:
                     seleccion_edit = st.selectbox("Seleccione el registro activo a modificar o eliminar:", lista_edicion)
                 
-                # Extraer el índice original
-                idx_orig = int(seleccion_edit.split(" | ")[0])
-                item = datos[idx_orig]
+                # Extraer el id del préstamo
+                id_edit = int(seleccion_edit.split(" | ")[0])
+                item = prestamos_por_id[id_edit]
 
                 st.markdown("---")
                 
@@ -1396,7 +1353,7 @@ if check_login():
                 tab_edit, tab_del = st.tabs(["✏️ Editar Datos", "🗑️ Eliminar Registro"])
 
                 with tab_edit:
-                    with st.form(f"form_edit_{idx_orig}"):
+                    with st.form(f"form_edit_{id_edit}"):
                         st.markdown("### Modificar Información")
                         c_ed1, c_ed2 = st.columns(2)
                         
@@ -1429,6 +1386,7 @@ if check_login():
                         }
                         try:
                             get_supabase().table("prestamos").update(upd).eq("id", item['id']).execute()
+                            invalidar_cache("prestamos")
                             registrar_auditoria("EDICIÓN MANUAL", f"Ajuste de datos", cliente=nuevo_nombre)
                             st.success("✅ Cambios aplicados correctamente.")
                             time.sleep(1)
@@ -1446,6 +1404,7 @@ if check_login():
                         if confirmar_borrado == item['Cliente']:
                             try:
                                 get_supabase().table("prestamos").delete().eq("id", item['id']).execute()
+                                invalidar_cache("prestamos")
                                 registrar_auditoria(
                                     "ELIMINACIÓN DEFINITIVA", 
                                     f"BORRADO DE REGISTRO: Se eliminó préstamo de S/ {item['Monto_Capital']:,.2f}.", 
@@ -1465,39 +1424,51 @@ if check_login():
 
     # 5. HISTORIAL DE CRÉDITOS (Módulo Informativo con Búsqueda Inteligente y Montos)
     elif menu == "📂 Historial de Créditos":
-        st.markdown("""<div class="header-box">
+        st.markdown("""<div class="header-box pagina-historial">
                         <div class="luxury-title">📂 Historial de Créditos</div>
                         <div class="luxury-subtitle">Registro de Préstamos Finalizados y Capital Recuperado</div>
                        </div>""", unsafe_allow_html=True)
+
+        # --- MÉTRICAS DE ÉXITO DINÁMICAS ---
+        # Con la vista resumen_cartera se muestran antes de descargar el historial; con una
+        # búsqueda (o sin la vista) se repintan más abajo con las filas filtradas
+        huecos_hist = [col.empty() for col in st.columns(3)]
+        cerrados = (cargar_resumen_cartera() or {}).get("Pagado")
+        if cerrados:
+            mostrar_metricas(huecos_hist, [
+                ("CRÉDITOS CERRADOS", f"{cerrados['prestamos']}"),
+                ("CAPITAL RECUPERADO", f"S/ {cerrados['capital']:,.2f}"),
+                ("TOTAL INTERESES GANADOS", f"S/ {cerrados['interes']:,.2f}"),
+            ])
         
-        datos, _ = cargar_datos("prestamos")
-        # Filtramos solo los préstamos pagados
-        historial = [d for d in datos if d.get('Estado') == 'Pagado']
+        # Filtramos solo los préstamos pagados (directamente en Supabase)
+        historial = cargar_tabla_buscable(estado="Pagado", columnas=COLS_HISTORIAL)
         
-        if historial:
-            df_hist = pd.DataFrame(historial)
+        if len(historial):
+            df_hist = historial.df
             
             # --- 1. BUSCADOR INTELIGENTE HISTÓRICO ---
             st.markdown("### 🔍 Buscador Inteligente de Historial")
             busqueda_h = st.text_input("", placeholder="🔍 Escriba el nombre del cliente, fecha, monto o nota para filtrar...", label_visibility="collapsed")
             
             if busqueda_h:
-                mask = df_hist.apply(lambda row: row.astype(str).str.contains(busqueda_h, case=False).any(), axis=1)
-                df_hist = df_hist[mask]
+                # Sin distinguir mayúsculas ni tildes, sobre el índice precalculado
+                df_hist = historial.filtrar(busqueda_h)
                 st.caption(f"✨ Se encontraron {len(df_hist)} registros que coinciden con la búsqueda.")
 
             st.write("")
 
-            # --- 2. MÉTRICAS DE ÉXITO DINÁMICAS ---
-            h1, h2, h3 = st.columns(3)
-            # Ahora el Capital Recuperado sumará los montos reales ya que no se ponen en 0
-            cap_recuperado = df_hist['Monto_Capital'].sum()
-            # Calculamos el total de intereses ganados sumando la columna correspondiente
-            interes_ganado = df_hist['Pago_Mensual_Interes'].sum()
-            
-            h1.metric("CRÉDITOS CERRADOS", f"{len(df_hist)}")
-            h2.metric("CAPITAL RECUPERADO", f"S/ {cap_recuperado:,.2f}")
-            h3.metric("TOTAL INTERESES GANADOS", f"S/ {interes_ganado:,.2f}")
+            # --- 2. MÉTRICAS DE LAS FILAS FILTRADAS ---
+            if busqueda_h or not cerrados:
+                # Ahora el Capital Recuperado sumará los montos reales ya que no se ponen en 0
+                cap_recuperado = df_hist['Monto_Capital'].sum()
+                # Calculamos el total de intereses ganados sumando la columna correspondiente
+                interes_ganado = df_hist['Pago_Mensual_Interes'].sum()
+                mostrar_metricas(huecos_hist, [
+                    ("CRÉDITOS CERRADOS", f"{len(df_hist)}"),
+                    ("CAPITAL RECUPERADO", f"S/ {cap_recuperado:,.2f}"),
+                    ("TOTAL INTERESES GANADOS", f"S/ {interes_ganado:,.2f}"),
+                ])
 
             st.write("")
             
@@ -1525,20 +1496,6 @@ if check_login():
                 }
             )
             
-            # --- 4. CSS PARA NEGRITAS EN LAS CELDAS ---
-            st.markdown("""
-                <style>
-                div[data-testid="stDataFrame"] div[role="gridcell"] {
-                    font-weight: 800 !important;
-                    color: #1C1C1C !important;
-                    font-size: 14px !important;
-                }
-                div[data-testid="stDataFrame"] {
-                    border: 3px solid #D4AF37 !important;
-                    border-radius: 15px !important;
-                }
-                </style>
-            """, unsafe_allow_html=True)
             
             st.info("💡 Este módulo registra los créditos que han completado su ciclo de pago satisfactoriamente con sus montos originales.")
         else:
@@ -1546,17 +1503,64 @@ if check_login():
 
     # 6. AUDITORÍA
     elif menu == "📜 Auditoría":
-        st.markdown("""<div class="header-box">
+        st.markdown("""<div class="header-box pagina-auditoria">
                         <div class="luxury-title">📜 Auditoría del Sistema</div>
                         <div class="luxury-subtitle">Registro histórico de movimientos y accesos con filtrado inteligente</div>
                        </div>""", unsafe_allow_html=True)
         
-        logs, _ = cargar_datos("auditoria")
+        # Páginas de tamaño fijo, con el más reciente arriba
+        logs, hay_mas_logs = cargar_auditoria_buscable(paginas=st.session_state.get('paginas_auditoria', 1))
+
+        config_auditoria = {
+            "id": None,
+            "Fecha/Hora": st.column_config.TextColumn("📅 Fecha/Hora", width="medium"),
+            "Usuario": st.column_config.TextColumn("👤 Usuario", width="small"),
+            "Perfil": st.column_config.TextColumn("🛡️ Perfil", width="small"),
+            "Operación": st.column_config.TextColumn("⚙️ Operación", width="medium"),
+            "Cliente Afectado": st.column_config.TextColumn("👤 Cliente", width="medium"),
+            "Detalle del Movimiento": st.column_config.TextColumn("📝 Detalle del Movimiento", width="large"),
+        }
         
-        if logs:
-            df_audit = pd.DataFrame(logs)
-            # Ordenar por el más reciente arriba
-            df_audit = df_audit.iloc[::-1]
+        if len(logs):
+            # Con todo el historial ya cargado basta el buscador local; si no, se propone el del servidor
+            modo_busqueda = st.radio(
+                "Modo de búsqueda", ["⚡ Movimientos cargados", "🗄️ Todo el historial"],
+                index=1 if hay_mas_logs else 0, horizontal=True, key="modo_busqueda_auditoria",
+            )
+
+        if len(logs) and modo_busqueda == "🗄️ Todo el historial":
+            # --- BUSCADOR EN EL SERVIDOR (ILIKE SOBRE TODA LA TABLA, POR PÁGINAS) ---
+            st.markdown("### 🔍 Buscador en Todo el Historial")
+            f1, f2, f3 = st.columns([2, 1.2, 1])
+            texto_busqueda = f1.text_input("Texto", placeholder="🔍 Usuario, Cliente, Fecha o Detalle...")
+            rango_fechas = f2.date_input("Rango de fechas", value=(), format="DD/MM/YYYY")
+            operacion_busqueda = f3.selectbox("Operación", ["Todas"] + OPERACIONES_AUDITORIA)
+
+            desde = rango_fechas[0] if len(rango_fechas) > 0 else None
+            hasta = rango_fechas[1] if len(rango_fechas) > 1 else None
+            operacion = None if operacion_busqueda == "Todas" else operacion_busqueda
+
+            # Si cambian los criterios, la búsqueda vuelve a la primera página
+            criterios = (texto_busqueda, desde, hasta, operacion)
+            if st.session_state.get('criterios_busqueda_auditoria') != criterios:
+                st.session_state['criterios_busqueda_auditoria'] = criterios
+                st.session_state['paginas_busqueda_auditoria'] = 1
+
+            encontrados, hay_mas_encontrados = buscar_auditoria(
+                texto_busqueda, desde, hasta, operacion,
+                paginas=st.session_state.get('paginas_busqueda_auditoria', 1),
+            )
+            st.write("")
+            if encontrados:
+                st.dataframe(encontrados, use_container_width=True, hide_index=True, column_config=config_auditoria)
+                mas = " (hay más: cargue la siguiente página)" if hay_mas_encontrados else ""
+                st.caption(f"✨ {len(encontrados)} coincidencias en toda la auditoría{mas}.")
+                boton_cargar_mas('paginas_busqueda_auditoria', hay_mas_encontrados)
+            else:
+                st.info("No hay movimientos que coincidan con los filtros.")
+
+        elif len(logs):
+            df_audit = logs.df
 
             # --- BUSCADOR INTELIGENTE ---
             st.markdown("### 🔍 Buscador en Tiempo Real")
@@ -1564,9 +1568,8 @@ if check_login():
             
             # Lógica de filtrado inteligente (Busca en todas las columnas)
             if busqueda:
-                # Convertimos todo a string y buscamos la coincidencia sin importar mayúsculas/minúsculas
-                mask = df_audit.apply(lambda row: row.astype(str).str.contains(busqueda, case=False).any(), axis=1)
-                df_audit = df_audit[mask]
+                # Coincidencia en cualquier columna, sin importar mayúsculas/minúsculas ni tildes
+                df_audit = logs.filtrar(busqueda)
                 st.caption(f"✨ Se encontraron {len(df_audit)} resultados para: '{busqueda}'")
 
             st.write("")
@@ -1576,34 +1579,11 @@ if check_login():
                 df_audit,
                 use_container_width=True,
                 hide_index=True,
-                column_config={
-                    "Fecha/Hora": st.column_config.TextColumn("📅 Fecha/Hora", width="medium"),
-                    "Usuario": st.column_config.TextColumn("👤 Usuario", width="small"),
-                    "Perfil": st.column_config.TextColumn("🛡️ Perfil", width="small"),
-                    "Operación": st.column_config.TextColumn("⚙️ Operación", width="medium"),
-                    "Cliente Afectado": st.column_config.TextColumn("👤 Cliente", width="medium"),
-                    "Detalle del Movimiento": st.column_config.TextColumn("📝 Detalle del Movimiento", width="large"),
-                }
+                column_config=config_auditoria,
             )
+            st.caption(f"Mostrando los {len(logs)} movimientos más recientes.")
+            boton_cargar_mas('paginas_auditoria', hay_mas_logs)
 
-            # CSS Adicional para centrar y estilizar la tabla de auditoría
-            st.markdown("""
-                <style>
-                [data-testid="stDataFrame"] { 
-                    border: 2px solid #D4AF37 !important; 
-                    border-radius: 15px !important;
-                }
-                /* Negritas para los datos de la tabla */
-                div[data-testid="stDataFrame"] div[role="gridcell"] {
-                    font-weight: 700 !important;
-                    display: flex !important;
-                    text-align: center !important;
-                    justify-content: center !important;
-                    align-items: center !important;
-                    color: #1C1C1C !important;
-                }
-                </style>
-            """, unsafe_allow_html=True)
         else:
             st.info("No hay movimientos registrados en la plataforma.")
 
@@ -0,0 +1,119 @@
+"""
+Carga única de la tabla 'pagos' a partir de los registros COBRO de la auditoría.
+
+Lee la auditoría por lotes (keyset sobre id), extrae los montos del texto
+"Pago Recibido: Interés S/ X, Capital S/ Y" y crea un pago tipado por registro.
+Se puede volver a ejecutar: los registros ya migrados se omiten por 'Auditoria_Id' (único).
+Los detalles que no se pueden interpretar se listan al final en vez de contarse como 0.
+
+Uso: SUPABASE_URL=... SUPABASE_KEY=... python backfill_pagos.py
+"""
+import os
+import re
+import sys
+from datetime import datetime
+from conexion import obtener_cliente
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+TAMANO_LOTE = 1000
+RE_INTERES = re.compile(r"Inter[eé]s S/\s*([0-9]+(?:\.[0-9]+)?)")
+RE_CAPITAL = re.compile(r"Capital S/\s*([0-9]+(?:\.[0-9]+)?)")
+
+
+def print_log(msg):
+    print(msg)
+    sys.stdout.flush()
+
+
+def leer_montos(detalle):
+    """Devuelve (interés, capital) del detalle de un COBRO, o None si no se reconoce el formato."""
+    interes = RE_INTERES.search(detalle or "")
+    if not interes:
+        return None
+    capital = RE_CAPITAL.search(detalle)
+    return float(interes.group(1)), float(capital.group(1)) if capital else 0.0
+
+
+def a_fecha_peru(fecha_hora):
+    """'2024-05-01 10:30:00' (hora Perú, como la guarda la auditoría) -> ISO con zona -05:00."""
+    return datetime.strptime(fecha_hora, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%dT%H:%M:%S-05:00")
+
+
+def elegir_prestamo(candidatos, fecha_hora):
+    """Con clientes homónimos, el último préstamo otorgado antes del pago."""
+    previos = [p for p in candidatos if str(p.get("Fecha_Prestamo") or "") <= fecha_hora[:10]]
+    return max(previos or candidatos, key=lambda p: str(p.get("Fecha_Prestamo") or ""))
+
+
+def leer_por_lotes(supabase, tabla, columnas, filtro=None):
+    """Recorre la tabla completa por keyset sobre id (una respuesta de Supabase trae como máximo 1000 filas)."""
+    cursor = None
+    while True:
+        consulta = supabase.table(tabla).select(columnas)
+        if filtro:
+            consulta = consulta.eq(*filtro)
+        if cursor is not None:
+            consulta = consulta.gt("id", cursor)
+        filas = consulta.order("id").limit(TAMANO_LOTE).execute().data
+        yield from filas
+        if len(filas) < TAMANO_LOTE:
+            return
+        cursor = filas[-1]["id"]
+
+
+def guardar_lote(supabase, lote):
+    # Idempotente: un registro de auditoría ya migrado no se duplica
+    supabase.table("pagos").upsert(lote, on_conflict="Auditoria_Id", ignore_duplicates=True).execute()
+
+
+def backfill():
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print_log("❌ ERROR: Faltan las credenciales de Supabase.")
+        return
+
+    supabase = obtener_cliente(SUPABASE_URL, SUPABASE_KEY, ligero=True)
+
+    prestamos_por_cliente = {}
+    for p in leer_por_lotes(supabase, "prestamos", "id,Cliente,Fecha_Prestamo"):
+        prestamos_por_cliente.setdefault(p["Cliente"], []).append(p)
+
+    cobros = leer_por_lotes(
+        supabase, "auditoria", 'id,"Fecha/Hora",Usuario,"Cliente Afectado","Detalle del Movimiento"',
+        filtro=("Operación", "COBRO"),
+    )
+    lote, procesados, ilegibles = [], 0, []
+    for log in cobros:
+        montos = leer_montos(log["Detalle del Movimiento"])
+        if montos is None:
+            ilegibles.append(log)
+            continue
+
+        cliente = log["Cliente Afectado"]
+        candidatos = prestamos_por_cliente.get(cliente)
+        lote.append({
+            "Prestamo_Id": elegir_prestamo(candidatos, log["Fecha/Hora"])["id"] if candidatos else None,
+            "Cliente": cliente,
+            "Interes_Pagado": montos[0],
+            "Capital_Pagado": montos[1],
+            "Fecha_Pago": a_fecha_peru(log["Fecha/Hora"]),
+            "Usuario": log.get("Usuario"),
+            "Auditoria_Id": log["id"],
+        })
+        if len(lote) >= TAMANO_LOTE:
+            guardar_lote(supabase, lote)
+            procesados += len(lote)
+            lote = []
+
+    if lote:
+        guardar_lote(supabase, lote)
+        procesados += len(lote)
+
+    print_log(f"✅ {procesados} cobros de auditoría volcados en 'pagos' (los ya migrados se omiten).")
+    for log in ilegibles:
+        print_log(f"⚠️ Registro {log['id']} sin montos reconocibles: {log['Detalle del Movimiento']!r}")
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,149 @@
+"""
+Benchmark de arranque en frío de app.py.
+
+Cada repetición corre en un proceso de Python nuevo (sin módulos en caché) y mide:
+  importacion -> importar streamlit y los módulos propios que app.py carga antes del login
+  login       -> desde el inicio del proceso hasta tener dibujado el formulario de login
+                 (incluye cargar streamlit.testing, que también se paga en cada proceso)
+  dashboard   -> primera ejecución del Dashboard con sesión iniciada, contra un Supabase
+                 en memoria con datos sintéticos (incluye importar pandas y los cálculos)
+Además comprueba que ninguna dependencia pesada (pandas, supabase, httpx) se cargue
+antes del login.
+
+Uso:
+    python bench/arranque.py [--repeticiones 5] [--prestamos 500] [--json bench/resultados/arranque.json]
+                             [--max-login-ms 2500] [--max-dashboard-ms 6000]
+Termina con código 1 si se supera un límite o si el login vuelve a cargar una dependencia pesada.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "app.py")
+PESADOS = ("pandas", "supabase", "postgrest", "httpx")
+
+
+def medir_una_vez(cantidad_prestamos):
+    """Se ejecuta en el proceso hijo: una medición completa, devuelta como dict."""
+    inicio = time.perf_counter()
+    import streamlit  # noqa: F401
+    import conexion
+    import escritor_auditoria  # noqa: F401
+    import lecturas  # noqa: F401
+    import sincronizacion  # noqa: F401
+    importacion = time.perf_counter() - inicio
+
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(APP, default_timeout=300)
+    app.secrets["SUPABASE_URL"] = "http://supabase.invalid"
+    app.secrets["SUPABASE_KEY"] = "clave"
+    app.secrets["credenciales"] = {"admin": "x", "visor": "x"}
+    app.secrets["config"] = {"admins": ["admin"], "mostrar_splash": False}
+    app.run()
+    login = time.perf_counter() - inicio
+    cargados_en_login = [m for m in PESADOS if m in sys.modules]
+    formulario = len(app.text_input) == 2
+
+    # El cliente de la app pasa a ser un Supabase en memoria (con los mismos reintentos y métricas)
+    from simuladores.datos_sinteticos import generar_tablas
+    from simuladores.supabase_memoria import BaseMemoria, ClienteMemoria
+    base = BaseMemoria(generar_tablas(prestamos=cantidad_prestamos, auditoria=cantidad_prestamos * 10))
+    conexion.crear_cliente = lambda *args, **kwargs: conexion.ClienteSupabase(ClienteMemoria(base))
+
+    app.session_state["logged_in"] = True
+    app.session_state["usuario"] = "visor"
+    app.session_state["rol"] = "Visor"
+    app.session_state["splash_visto"] = True
+    app.session_state["last_active"] = time.time()
+    antes = time.perf_counter()
+    app.run()
+    dashboard = time.perf_counter() - antes
+
+    return {
+        "importacion_ms": round(importacion * 1000, 1),
+        "login_ms": round(login * 1000, 1),
+        "dashboard_ms": round(dashboard * 1000, 1),
+        "cargados_en_login": cargados_en_login,
+        "formulario_login": formulario,
+        "errores": [str(e.value) for e in app.exception],
+    }
+
+
+def medir(repeticiones, cantidad_prestamos):
+    mediciones = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--hijo", "--prestamos", str(cantidad_prestamos)],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        )
+        # La última línea es el JSON; lo anterior son avisos de Streamlit
+        mediciones.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+    return mediciones
+
+
+def resumir(mediciones):
+    resumen = {}
+    for clave in ("importacion_ms", "login_ms", "dashboard_ms"):
+        valores = [m[clave] for m in mediciones]
+        resumen[clave] = {"mediana": statistics.median(valores), "min": min(valores), "max": max(valores)}
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--prestamos", type=int, default=500)
+    parser.add_argument("--json", help="Archivo donde agregar el resultado (una línea JSON por corrida)")
+    parser.add_argument("--max-login-ms", type=float)
+    parser.add_argument("--max-dashboard-ms", type=float)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        sys.path.insert(0, RAIZ)
+        print(json.dumps(medir_una_vez(args.prestamos)))
+        return 0
+
+    mediciones = medir(args.repeticiones, args.prestamos)
+    resumen = resumir(mediciones)
+    for clave, valores in resumen.items():
+        print(f"{clave:<16} mediana {valores['mediana']:>8.1f}   min {valores['min']:>8.1f}   max {valores['max']:>8.1f}")
+
+    problemas = []
+    cargados = sorted({m for medicion in mediciones for m in medicion["cargados_en_login"]})
+    if cargados:
+        problemas.append(f"El login carga dependencias pesadas: {', '.join(cargados)}")
+    if not all(m["formulario_login"] for m in mediciones):
+        problemas.append("No se dibujó el formulario de login")
+    errores = sorted({e for m in mediciones for e in m["errores"]})
+    if errores:
+        problemas.append(f"El Dashboard terminó con errores: {errores}")
+    if args.max_login_ms and resumen["login_ms"]["mediana"] > args.max_login_ms:
+        problemas.append(f"Login: {resumen['login_ms']['mediana']} ms > {args.max_login_ms} ms")
+    if args.max_dashboard_ms and resumen["dashboard_ms"]["mediana"] > args.max_dashboard_ms:
+        problemas.append(f"Dashboard: {resumen['dashboard_ms']['mediana']} ms > {args.max_dashboard_ms} ms")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps({
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "repeticiones": args.repeticiones,
+                "prestamos": args.prestamos,
+                "resumen": resumen,
+                "problemas": problemas,
+            }, ensure_ascii=False) + "\n")
+
+    for problema in problemas:
+        print(f"❌ {problema}")
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
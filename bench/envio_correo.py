@@ -0,0 +1,108 @@
+"""
+Benchmark del envío de resúmenes por destinatario contra el SMTP local (simuladores/smtp_local.py).
+
+Arma un resumen por cobrador con datos sintéticos y mide cuánto tarda en salir todo:
+  por_mensaje   -> una sesión (saludo + login) por correo, como hacía notifier.enviar_correo
+  reutilizada   -> una sola sesión para todos (EnviadorSMTP con conexiones=1)
+  pool_N        -> N sesiones en paralelo
+El servidor simula la latencia de un servidor remoto al conectar y al aceptar cada mensaje.
+
+Uso:
+    python bench/envio_correo.py [--destinatarios 50] [--prestamos 2000] [--conexiones 2 4]
+                                 [--latencia-conexion 0.3] [--latencia-mensaje 0.05] [--fallar-cada 0]
+                                 [--json bench/resultados/envio_correo.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from envio_correo import EnviadorSMTP  # noqa: E402
+from reporte_correo import mensajes_por_destinatario  # noqa: E402
+from simuladores.datos_sinteticos import generar_prestamos  # noqa: E402
+from simuladores.smtp_local import ServidorSMTPLocal  # noqa: E402
+
+
+def armar_mensajes(cantidad_destinatarios, cantidad_prestamos):
+    hoy = date.today()
+    alertas = [
+        {
+            "id": p["id"], "nombre": p["Cliente"], "capital": p["Monto_Capital"], "cuota": p["Pago_Mensual_Interes"],
+            "dias": (date.fromisoformat(p["Fecha_Proximo_Pago"]) - hoy).days,
+            "fecha": date.fromisoformat(p["Fecha_Proximo_Pago"]).strftime("%d/%m/%Y"), "socios": set(),
+        }
+        for p in generar_prestamos(cantidad_prestamos, hoy) if p["Estado"] == "Activo"
+    ]
+    # Cada cobrador atiende una porción de la cartera
+    destinatarios = [
+        {"correo": f"cobrador{n}@local", "nombre": f"Cobrador {n}",
+         "clientes": [a["id"] for a in alertas[n::cantidad_destinatarios]]}
+        for n in range(cantidad_destinatarios)
+    ]
+    return mensajes_por_destinatario(alertas, "notifier@local", destinatarios)
+
+
+def medir_estrategia(mensajes, args, conexiones=None):
+    """Segundos, sesiones abiertas y fallidos; conexiones=None es una sesión por mensaje."""
+    with ServidorSMTPLocal(latencia_conexion=args.latencia_conexion, latencia_mensaje=args.latencia_mensaje,
+                           fallar_cada=args.fallar_cada) as servidor:
+        opciones = dict(servidor=servidor.host, puerto=servidor.puerto, tls=False, por_minuto=0)
+        inicio = time.perf_counter()
+        if conexiones is None:
+            fallidos = []
+            for mensaje in mensajes:
+                fallidos += EnviadorSMTP("notifier@local", "clave", conexiones=1, **opciones).enviar([mensaje])
+        else:
+            fallidos = EnviadorSMTP("notifier@local", "clave", conexiones=conexiones, **opciones).enviar(mensajes)
+        segundos = time.perf_counter() - inicio
+        return {
+            "segundos": round(segundos, 3),
+            "mensajes_por_segundo": round(len(mensajes) / segundos, 1),
+            "sesiones": servidor.conexiones,
+            "recibidos": len(servidor.recibidos),
+            "fallidos": len(fallidos),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--destinatarios", type=int, default=50)
+    parser.add_argument("--prestamos", type=int, default=2000)
+    parser.add_argument("--conexiones", type=int, nargs="*", default=[2, 4])
+    parser.add_argument("--latencia-conexion", type=float, default=0.3)
+    parser.add_argument("--latencia-mensaje", type=float, default=0.05)
+    parser.add_argument("--fallar-cada", type=int, default=0)
+    parser.add_argument("--json", help="Archivo donde agregar el resultado (una línea JSON por corrida)")
+    args = parser.parse_args()
+
+    mensajes = armar_mensajes(args.destinatarios, args.prestamos)
+    print(f"{len(mensajes)} mensajes, {sum(len(m.as_bytes()) for m in mensajes) / 1e6:.1f} MB")
+
+    estrategias = [("por_mensaje", None), ("reutilizada", 1)] + [(f"pool_{n}", n) for n in args.conexiones]
+    resultados = {}
+    for nombre, conexiones in estrategias:
+        resultados[nombre] = r = medir_estrategia(mensajes, args, conexiones)
+        print(f"{nombre:<12} {r['segundos']:>7.2f} s   {r['mensajes_por_segundo']:>6.1f} msg/s   "
+              f"{r['sesiones']:>4} sesiones   {r['fallidos']} fallidos")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps({
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "mensajes": len(mensajes),
+                "latencia_conexion": args.latencia_conexion,
+                "latencia_mensaje": args.latencia_mensaje,
+                "fallar_cada": args.fallar_cada,
+                "resultados": resultados,
+            }, ensure_ascii=False) + "\n")
+    return 1 if any(r["fallidos"] for r in resultados.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Benchmark de la preparación de datos de cada página de app.py con datos sintéticos.
+
+Mide, sin Streamlit y sin red, lo que cada página hace con los datos antes de dibujarlos,
+contra un Supabase en memoria (simuladores/supabase_memoria.py) cargado con
+simuladores/datos_sinteticos.py:
+  dashboard       -> cartera activa, panorama_cartera (mora / hoy / próximos), la vista
+                     resumen_cartera y la proyección de cobros agrupada por mes
+  multi_socio     -> ganancias_socios por mes y el historial de cobros desde pagos.reparto
+  busqueda        -> índice TablaBuscable del Historial y de la primera página de Auditoría,
+                     filtrar() con varias consultas y la búsqueda de Auditoría en el servidor
+  registrar_pago  -> cartera activa por vencimiento, el selector de clientes y aplicar_pagos()
+                     sobre un lote de cobros (Carga Masiva)
+Las lecturas pasan por conexion.ClienteSupabase y, como en la app, por la réplica
+SnapshotTabla, que arranca al día (solo refresca las diferencias). La primera descarga
+completa se mide aparte con --paginas replica: con cientos de miles de pagos la domina el
+simulador, que recorre la tabla entera en cada lote.
+Las consultas (lecturas.py), las columnas (COLS_*) y la preparación de cada tabla
+(cartera.py) son las mismas funciones que llama app.py.
+De cada paso se informa la mediana de las repeticiones, las filas que produce y las
+consultas al Supabase en memoria: su tiempo es el del simulador, no el de la red.
+
+Uso:
+    python bench/paginas.py [--prestamos 10000] [--auditoria 1000000] [--repeticiones 5]
+                            [--paginas dashboard busqueda replica] [--json bench/resultados/paginas.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd  # noqa: E402
+
+import conexion  # noqa: E402
+from busqueda import TablaBuscable, normalizar  # noqa: E402
+from cartera import (  # noqa: E402
+    agrupar_proyeccion, aplicar_pagos, fracciones_socios, ganancias_por_mes, historial_reparto, normalizar_pagos_lote,
+    opciones_cobro, panorama_cartera, proyectar_cobros,
+)
+from lecturas import (  # noqa: E402
+    COLS_AUDITORIA, COLS_COBRANZA, COLS_DASHBOARD, COLS_HISTORIAL, COLS_PAGOS_SOCIOS, COLS_PROYECCION,
+    TAMANO_PAGINA_AUDITORIA, leer_ganancias_socios, leer_pagina_auditoria, leer_pagina_pagos, leer_resumen_cartera,
+)
+from simuladores.datos_sinteticos import SOCIOS, generar_tablas  # noqa: E402
+from simuladores.supabase_memoria import BaseMemoria, ClienteMemoria  # noqa: E402
+from sincronizacion import SnapshotTabla  # noqa: E402
+
+# Lo que escribiría un usuario en los buscadores: un nombre, nombre y apellido con y sin
+# tildes, un monto, un año y algo que no está
+CONSULTAS = ("garcia", "Rosa Quispe", "lucia chavez", "1500", "2025", "zzz")
+MESES_PROYECCION = 6  # valor por defecto del slider del Dashboard
+COBROS_LOTE = 500
+
+
+class Contexto:
+    """Supabase en memoria, réplicas locales y mediciones de una corrida."""
+
+    def __init__(self, base, hoy):
+        self.base = base
+        self.hoy = hoy
+        self.cliente = conexion.ClienteSupabase(ClienteMemoria(base))
+        self.snapshots = {}
+        self.mediciones = {}
+        self.pagina = None
+        for tabla in ("prestamos", "pagos"):
+            # Réplica ya sincronizada, como después de la primera lectura de la app
+            snapshot = self.replica(tabla)
+            snapshot.filas = {f["id"]: dict(f) for f in base.tablas[tabla]}
+            snapshot.marca = max((f["updated_at"] for f in base.tablas[tabla]), default=None)
+
+    def replica(self, tabla):
+        if tabla not in self.snapshots:
+            self.snapshots[tabla] = SnapshotTabla(tabla)
+        return self.snapshots[tabla]
+
+    def leer(self, tabla, estado=None, columnas=None, orden=None):
+        """Como _consultar_tabla() de app.py con snapshot_local: refresco por diferencias y consulta local."""
+        snapshot = self.replica(tabla)
+        snapshot.refrescar(self.cliente)
+        return snapshot.consultar(estado, columnas, orden)
+
+    def medir(self, paso, funcion, contar=len):
+        consultas = self.base.consultas
+        inicio = time.perf_counter()
+        resultado = funcion()
+        ms = (time.perf_counter() - inicio) * 1000
+        self.mediciones.setdefault((self.pagina, paso), []).append({
+            "ms": ms, "filas": contar(resultado), "consultas": self.base.consultas - consultas,
+        })
+        return resultado
+
+
+# --- PÁGINAS ---
+def pagina_replica(ctx):
+    """Primera lectura de cada tabla: la réplica se descarga completa por lotes de 1000."""
+    previas = dict(ctx.snapshots)
+
+    def descargar(tabla):
+        ctx.snapshots.pop(tabla, None)
+        ctx.replica(tabla).refrescar(ctx.cliente)
+        return ctx.replica(tabla).filas
+    for tabla in ("prestamos", "pagos"):
+        ctx.medir(tabla, lambda: descargar(tabla))
+    ctx.snapshots.update(previas)
+
+
+def pagina_dashboard(ctx):
+    datos = ctx.medir("cartera_activa", lambda: ctx.leer("prestamos", "Activo", COLS_DASHBOARD))
+    ctx.medir("panorama", lambda: panorama_cartera(pd.DataFrame(datos), ctx.hoy),
+              contar=lambda p: len(p["mora"]) + len(p["hoy"]) + len(p["proximos"]))
+    ctx.medir("resumen_cartera", lambda: leer_resumen_cartera(ctx.cliente))
+
+    def proyeccion():
+        activos = pd.DataFrame(ctx.leer("prestamos", "Activo", COLS_PROYECCION))
+        cuotas = proyectar_cobros(activos, MESES_PROYECCION, ctx.hoy)
+        return agrupar_proyeccion(cuotas, "mes", fracciones_socios(activos))
+    ctx.medir("proyeccion", proyeccion)
+
+
+def pagina_multi_socio(ctx):
+    socios = list(SOCIOS[:2])  # los seleccionados por defecto en la pestaña
+
+    ctx.medir("ganancias_por_mes", lambda: ganancias_por_mes(leer_ganancias_socios(ctx.cliente), socios))
+    # Primera página del libro, como cargar_pagos_recientes() de la pestaña
+    pagos = ctx.medir("libro_pagos", lambda: leer_pagina_pagos(ctx.cliente, None, TAMANO_PAGINA_AUDITORIA, COLS_PAGOS_SOCIOS))
+    ctx.medir("historial_reparto", lambda: historial_reparto(pagos, socios))
+
+
+def pagina_busqueda(ctx):
+    historial = ctx.medir("indice_historial", lambda: TablaBuscable(ctx.leer("prestamos", "Pagado", COLS_HISTORIAL)))
+    ctx.medir("filtrar_historial", lambda: sum(len(historial.filtrar(c)) for c in CONSULTAS), contar=int)
+
+    auditoria = ctx.medir("indice_auditoria", lambda: TablaBuscable(
+        leer_pagina_auditoria(ctx.cliente, None, TAMANO_PAGINA_AUDITORIA, columnas=COLS_AUDITORIA)))
+    ctx.medir("filtrar_auditoria", lambda: sum(len(auditoria.filtrar(c)) for c in CONSULTAS), contar=int)
+
+    def servidor():
+        # "Todo el historial": una página de coincidencias por consulta (ilike sobre texto_busqueda)
+        return sum(len(leer_pagina_auditoria(ctx.cliente, None, TAMANO_PAGINA_AUDITORIA, columnas=COLS_AUDITORIA,
+                                             texto=normalizar(texto).strip() or None)) for texto in CONSULTAS)
+    ctx.medir("buscar_auditoria_servidor", servidor, contar=int)
+
+
+def pagina_registrar_pago(ctx):
+    datos = ctx.medir("cartera_activa", lambda: ctx.leer("prestamos", "Activo", COLS_COBRANZA, "Fecha_Proximo_Pago"))
+    ctx.medir("selector_clientes", lambda: opciones_cobro(datos))
+    # Carga Masiva: cuota completa de los primeros vencimientos, como un CSV del cobrador
+    lote = pd.DataFrame([
+        {"Prestamo_Id": d["id"], "Cliente": d["Cliente"], "Interes": d["Pago_Mensual_Interes"], "Capital": 0, "Renovar": "si"}
+        for d in datos[:COBROS_LOTE]
+    ])
+    ctx.medir("carga_masiva", lambda: aplicar_pagos(datos, normalizar_pagos_lote(lote), ctx.hoy))
+
+
+PAGINAS = {
+    "replica": pagina_replica,
+    "dashboard": pagina_dashboard,
+    "multi_socio": pagina_multi_socio,
+    "busqueda": pagina_busqueda,
+    "registrar_pago": pagina_registrar_pago,
+}
+
+
+def resumir(mediciones):
+    resumen = {}
+    for (pagina, paso), valores in mediciones.items():
+        ms = [v["ms"] for v in valores]
+        resumen.setdefault(pagina, {})[paso] = {
+            "mediana_ms": round(statistics.median(ms), 1), "min_ms": round(min(ms), 1), "max_ms": round(max(ms), 1),
+            "filas": valores[-1]["filas"], "consultas": statistics.median([v["consultas"] for v in valores]),
+        }
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prestamos", type=int, default=10000)
+    parser.add_argument("--auditoria", type=int, help="Registros de auditoría (por defecto, 10 por préstamo)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--paginas", nargs="+", choices=list(PAGINAS), default=[p for p in PAGINAS if p != "replica"])
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", help="Archivo donde agregar el resultado (una línea JSON por corrida)")
+    args = parser.parse_args()
+    cantidad_auditoria = args.auditoria if args.auditoria is not None else args.prestamos * 10
+
+    hoy = date.today()
+    inicio = time.perf_counter()
+    base = BaseMemoria(generar_tablas(prestamos=args.prestamos, auditoria=cantidad_auditoria, hoy=hoy, semilla=args.semilla))
+    print(f"Datos: {args.prestamos} préstamos, {cantidad_auditoria} de auditoría, {len(base.tablas['pagos'])} pagos "
+          f"({time.perf_counter() - inicio:.1f} s)")
+
+    ctx = Contexto(base, hoy)
+    for _ in range(args.repeticiones):
+        for nombre in args.paginas:
+            ctx.pagina = nombre
+            PAGINAS[nombre](ctx)
+    resumen = resumir(ctx.mediciones)
+
+    for pagina, pasos in resumen.items():
+        print(f"\n{pagina}")
+        for paso, valores in pasos.items():
+            print(f"  {paso:<26} mediana {valores['mediana_ms']:>9.1f} ms   min {valores['min_ms']:>9.1f}   "
+                  f"max {valores['max_ms']:>9.1f}   filas {valores['filas']:>8}   consultas {valores['consultas']:>5g}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps({
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "pandas": pd.__version__,
+                "repeticiones": args.repeticiones,
+                "prestamos": args.prestamos,
+                "auditoria": cantidad_auditoria,
+                "semilla": args.semilla,
+                "resumen": resumen,
+            }, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Búsqueda de texto sobre una tabla ya descargada (Historial y Auditoría).
+
+En lugar de convertir cada celda a texto en cada pulsación (df.apply fila por fila),
+TablaBuscable arma una sola vez por versión de los datos una columna "pajar" con todas
+las columnas de la fila en minúsculas y sin tildes. Cada búsqueda es entonces un
+str.contains vectorizado sobre esa columna: "garcia" encuentra "García" y "nunez", "Núñez".
+Con varias palabras se exige que aparezcan todas, en cualquier columna y orden.
+"""
+import unicodedata
+
+import pandas as pd
+
+# Separa las columnas dentro del pajar para que una búsqueda no una el final de una con el inicio de otra
+_SEPARADOR = "\x1f"
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ni diéresis ('Ñuflo Chávez' -> 'nuflo chavez')."""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def _normalizar_serie(serie):
+    return (
+        serie.str.normalize("NFKD")
+        .str.replace("[\u0300-\u036f]", "", regex=True)  # marcas combinables (tildes)
+        .str.lower()
+    )
+
+
+class TablaBuscable:
+    """DataFrame de solo lectura con su índice de búsqueda normalizado."""
+
+    def __init__(self, filas, columnas=None):
+        self.df = filas if isinstance(filas, pd.DataFrame) else pd.DataFrame(filas)
+        columnas = [c for c in (columnas or self.df.columns) if c in self.df]
+        if self.df.empty or not columnas:
+            self.pajar = pd.Series("", index=self.df.index, dtype=object)
+            return
+        textos = [self.df[c].astype(object).where(self.df[c].notna(), "").astype(str) for c in columnas]
+        self.pajar = _normalizar_serie(textos[0].str.cat(textos[1:], sep=_SEPARADOR))
+
+    def __len__(self):
+        return len(self.df)
+
+    def filtrar(self, consulta):
+        """Filas que contienen todas las palabras de la consulta (sin distinguir mayúsculas ni tildes)."""
+        palabras = normalizar(consulta).split()
+        if not palabras:
+            return self.df
+        coincide = pd.Series(True, index=self.df.index)
+        for palabra in palabras:
+            coincide &= self.pajar.str.contains(palabra, regex=False)
+        return self.df[coincide]
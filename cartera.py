@@ -0,0 +1,404 @@
+"""
+Cálculos vectorizados sobre la cartera de préstamos.
+
+Compartido por app.py (Dashboard) y notifier.py para que ambos clasifiquen los
+vencimientos con la misma regla y en una sola pasada de pandas.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Días hacia adelante que cuentan como "próximo vencimiento"
+DIAS_AVISO = 5
+# Porcentajes que se asumen para un préstamo sin 'Distribucion_Socios' guardada (como la pestaña Multi-Socio
+# y calcular_reparto() de sql/006); también para los antiguos que solo guardan 'Porc_Socio1'
+PORCENTAJES_POR_DEFECTO = {"Bruno Tapia": 10.0, "Piera Juarez": 8.0}
+
+
+def panorama_cartera(prestamos, hoy=None, dias_aviso=DIAS_AVISO):
+    """
+    Parsea 'Fecha_Proximo_Pago' una sola vez y calcula los días al vencimiento de toda la cartera.
+
+    Devuelve un dict de DataFrames que conservan el orden original:
+      cartera  -> todos los préstamos con fecha válida, con columnas 'Vencimiento' (datetime64) y 'dias'
+      mora     -> dias < 0
+      hoy      -> dias == 0
+      proximos -> 0 < dias <= dias_aviso
+    """
+    df = prestamos if isinstance(prestamos, pd.DataFrame) else pd.DataFrame(prestamos)
+    hoy = pd.Timestamp(hoy or date.today())
+
+    if df.empty or "Fecha_Proximo_Pago" not in df:
+        df = df.assign(Vencimiento=pd.Series(dtype="datetime64[ns]"), dias=pd.Series(dtype="int64"))
+    else:
+        vencimiento = pd.to_datetime(df["Fecha_Proximo_Pago"], format="%Y-%m-%d", errors="coerce")
+        df = df.assign(Vencimiento=vencimiento, dias=(vencimiento - hoy).dt.days)
+        df = df[df["Vencimiento"].notna()].astype({"dias": "int64"})
+
+    dias = df["dias"]
+    return {
+        "cartera": df,
+        "mora": df[dias < 0],
+        "hoy": df[dias == 0],
+        "proximos": df[(dias > 0) & (dias <= dias_aviso)],
+    }
+
+
+def indexar_prestamos(prestamos):
+    """
+    Índices hash de la cartera para búsquedas O(1):
+      por_id      -> {id: préstamo}
+      por_cliente -> {nombre: préstamo}; con homónimos queda el primero, como el next() al que reemplaza
+    """
+    por_id, por_cliente = {}, {}
+    for p in prestamos:
+        por_id[p["id"]] = p
+        por_cliente.setdefault(p.get("Cliente"), p)
+    return {"por_id": por_id, "por_cliente": por_cliente}
+
+
+def _distribucion(prestamo):
+    """{socio: porcentaje} con el que se reparte el interés: 'Distribucion_Socios' o PORCENTAJES_POR_DEFECTO."""
+    distribucion = prestamo.get("Distribucion_Socios")
+    if not isinstance(distribucion, dict) or not distribucion:
+        return PORCENTAJES_POR_DEFECTO
+    return {socio: float(pct) for socio, pct in distribucion.items() if pct is not None and float(pct) != 0}
+
+
+def socios_del_prestamo(prestamo):
+    """Socios que reciben parte del interés del préstamo: los mismos que reparto_pago() (y el libro 'pagos')."""
+    return set(_distribucion(prestamo))
+
+
+def reparto_pago(prestamo, interes):
+    """
+    {socio: monto} del interés cobrado: (porcentaje del socio / tasa del préstamo) * interés.
+    Misma regla que calcular_reparto() de sql/006_ganancias_socios.sql.
+    """
+    tasa = float(prestamo.get("Tasa_Interes") or 0) or 1.0
+    return {socio: round(pct / tasa * float(interes), 2) for socio, pct in _distribucion(prestamo).items()}
+
+
+# --- PÁGINAS DE app.py (también las mide bench/paginas.py) ---
+def opciones_cobro(prestamos):
+    """{"Cliente | Vence: AAAA-MM-DD": posición} para el selector de 'Registrar Pago'."""
+    return {f"{p['Cliente']} | Vence: {p.get('Fecha_Proximo_Pago', 'N/A')}": i for i, p in enumerate(prestamos)}
+
+
+def a_hora_peru(serie):
+    """Timestamps ISO de Supabase -> texto en hora Perú, con el mismo formato que 'Fecha/Hora' de auditoría."""
+    return pd.to_datetime(serie, utc=True, format="ISO8601").dt.tz_convert("America/Lima").dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def historial_reparto(pagos, socios):
+    """
+    Detalle de la pestaña Multi-Socio: una fila por cobro con interés y reparto guardado
+    (pagos.reparto, sql/006), en el orden recibido, con la columna "$ <socio>" de cada socio.
+    """
+    df = pd.DataFrame(pagos)
+    if df.empty:
+        return df
+    repartos = df["reparto"].map(lambda r: r if isinstance(r, dict) else {})
+    interes_pagado = pd.to_numeric(df["Interes_Pagado"], errors="coerce").fillna(0.0)
+    con_reparto = (interes_pagado > 0) & repartos.map(bool)
+    historial = pd.DataFrame({
+        "Fecha de Pago": a_hora_peru(df["Fecha_Pago"][con_reparto]),
+        "Cliente": df["Cliente"][con_reparto],
+        "Monto Recibido": interes_pagado[con_reparto],
+    })
+    for socio in socios:
+        historial[f"$ {socio}"] = repartos[con_reparto].map(lambda r, s=socio: float(r.get(s, 0.0)))
+    return historial
+
+
+def ganancias_por_mes(ganancias, socios):
+    """Filas de ganancias_socios como tabla mes x socio (solo `socios`), del mes más reciente al más antiguo."""
+    por_mes = pd.DataFrame(ganancias, columns=["socio", "mes", "monto", "pagos"])
+    por_mes["monto"] = pd.to_numeric(por_mes["monto"])
+    return (
+        por_mes[por_mes["socio"].isin(socios)]
+        .pivot_table(index="mes", columns="socio", values="monto", aggfunc="sum", fill_value=0.0)
+        .sort_index(ascending=False)
+    )
+
+
+# --- PROYECCIÓN DE COBROS ---
+def fechas_de_pago(vencimientos, cuotas):
+    """
+    Matriz (préstamos x cuotas) con las próximas fechas de pago en una sola pasada de numpy.
+
+    La columna k equivale a aplicar k veces sumar_un_mes() de app.py: mismo día del mes, o el
+    último día si el mes es más corto. Como la función recorta en cada paso, un 31/01 pasa a
+    28/02 y se queda en 28 (28/03, 28/04...): el día de la cuota k es el mínimo entre el día
+    original y la duración de cada mes recorrido hasta k (mínimo acumulado).
+    """
+    vencimientos = pd.to_datetime(pd.Series(vencimientos), format="%Y-%m-%d").to_numpy("datetime64[D]")
+    mes_inicial = vencimientos.astype("datetime64[M]")
+    dia_inicial = (vencimientos - mes_inicial.astype("datetime64[D]")).astype(int) + 1
+
+    meses = mes_inicial[:, None] + np.arange(cuotas)
+    duracion = ((meses + 1).astype("datetime64[D]") - meses.astype("datetime64[D]")).astype(int)
+    dias = np.minimum.accumulate(np.minimum(duracion, dia_inicial[:, None]), axis=1)
+    return meses.astype("datetime64[D]") + (dias - 1)
+
+
+def proyectar_cobros(prestamos, meses=6, hoy=None):
+    """
+    Cuotas de interés esperadas de la cartera activa: el mes en curso y los `meses` siguientes completos.
+
+    Cada préstamo renueva cada mes desde 'Fecha_Proximo_Pago' cobrando 'Pago_Mensual_Interes'
+    (el capital no cambia). Devuelve una fila por cuota con id, Cliente, cuota (0 = la próxima),
+    Vencimiento (datetime64), Interes y vencida (la fecha ya pasó y sigue sin pagarse).
+    """
+    df = prestamos if isinstance(prestamos, pd.DataFrame) else pd.DataFrame(prestamos)
+    hoy = pd.Timestamp(hoy or date.today()).normalize()
+    limite = hoy.to_period("M").start_time + pd.DateOffset(months=meses + 1)
+    columnas = ["id", "Cliente", "cuota", "Vencimiento", "Interes", "vencida"]
+    if df.empty or "Fecha_Proximo_Pago" not in df:
+        return pd.DataFrame(columns=columnas)
+
+    vencimiento = pd.to_datetime(df["Fecha_Proximo_Pago"], format="%Y-%m-%d", errors="coerce")
+    df = df[vencimiento.notna()]
+    vencimiento = vencimiento[vencimiento.notna()]
+    if df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    # Los préstamos en mora necesitan además una cuota por cada mes de atraso
+    atraso = max(0, (hoy.year - vencimiento.min().year) * 12 + hoy.month - vencimiento.min().month)
+    cuotas = meses + atraso + 1
+    fechas = fechas_de_pago(vencimiento.dt.strftime("%Y-%m-%d"), cuotas)
+
+    proyeccion = pd.DataFrame({
+        "id": np.repeat(df["id"].to_numpy(), cuotas),
+        "Cliente": np.repeat(df["Cliente"].to_numpy(), cuotas),
+        "cuota": np.tile(np.arange(cuotas), len(df)),
+        "Vencimiento": fechas.ravel(),
+        "Interes": np.repeat(pd.to_numeric(df["Pago_Mensual_Interes"], errors="coerce").fillna(0.0).to_numpy(), cuotas),
+    })
+    proyeccion = proyeccion[proyeccion["Vencimiento"] < limite].reset_index(drop=True)
+    proyeccion["vencida"] = proyeccion["Vencimiento"] < hoy
+    return proyeccion
+
+
+def fracciones_socios(prestamos):
+    """Parte del interés de cada préstamo que le toca a cada socio (id, socio, fraccion); ver reparto_pago()."""
+    df = prestamos if isinstance(prestamos, pd.DataFrame) else pd.DataFrame(prestamos)
+    columnas = ["id", "Tasa_Interes", "Distribucion_Socios"]
+    filas = [
+        (p["id"], socio, monto)
+        for p in df.reindex(columns=columnas).to_dict("records")
+        for socio, monto in reparto_pago(p, 1.0).items()
+    ] if not df.empty else []
+    return pd.DataFrame(filas, columns=["id", "socio", "fraccion"])
+
+
+def agrupar_proyeccion(proyeccion, frecuencia="mes", fracciones=None):
+    """
+    Interés esperado por período ("mes" o "semana", de lunes a domingo) y, si se pasan las
+    fracciones de fracciones_socios(), por socio; si no, una sola columna 'Total'.
+    Las cuotas vencidas sin pagar se suman aparte en la fila 'Vencido'.
+    """
+    if proyeccion.empty:
+        return pd.DataFrame()
+    if fracciones is not None:
+        datos = proyeccion.merge(fracciones, on="id")
+        datos = datos.assign(Interes=datos["Interes"] * datos["fraccion"])
+    else:
+        datos = proyeccion.assign(socio="Total")
+
+    # Se agrupa por la fecha de inicio del período y solo se da formato a las pocas filas resultantes
+    futuras = datos[~datos["vencida"]]
+    inicio = futuras["Vencimiento"].dt.to_period("M" if frecuencia == "mes" else "W-SUN").dt.start_time
+    tabla = futuras.assign(Periodo=inicio).pivot_table(index="Periodo", columns="socio", values="Interes", aggfunc="sum", fill_value=0.0)
+    tabla.index = tabla.index.strftime("%Y-%m" if frecuencia == "mes" else "%Y-%m-%d")
+
+    vencido = datos[datos["vencida"]].groupby("socio")["Interes"].sum()
+    if not vencido.empty:
+        tabla = pd.concat([vencido.to_frame("Vencido").T, tabla]).fillna(0.0)
+    tabla.index.name = "Periodo"
+    tabla.columns.name = None
+    return tabla
+
+
+# --- FOTO DIARIA DE LA CARTERA ---
+def foto_cartera(prestamos, hoy=None):
+    """
+    Fila de fotos_cartera para los préstamos activos dados: capital, flujo mensual, mora y
+    capital que le corresponde a cada socio (reparto_pago sobre el capital, redondeado por
+    préstamo). Misma cuenta que guardar_foto_cartera() de sql/009_fotos_cartera.sql.
+    """
+    df = prestamos if isinstance(prestamos, pd.DataFrame) else pd.DataFrame(prestamos)
+    df = df.reindex(columns=["id", "Monto_Capital", "Pago_Mensual_Interes", "Fecha_Proximo_Pago",
+                             "Tasa_Interes", "Distribucion_Socios"])
+    hoy = pd.Timestamp(hoy or date.today()).normalize()
+    capital = pd.to_numeric(df["Monto_Capital"], errors="coerce").fillna(0.0)
+    interes = pd.to_numeric(df["Pago_Mensual_Interes"], errors="coerce").fillna(0.0)
+    en_mora = pd.to_datetime(df["Fecha_Proximo_Pago"], format="%Y-%m-%d", errors="coerce") < hoy
+
+    exposicion = {}
+    for prestamo, monto in zip(df.to_dict("records"), capital):
+        for socio, parte in reparto_pago(prestamo, monto).items():
+            exposicion[socio] = exposicion.get(socio, 0.0) + parte
+    return {
+        "fecha": hoy.strftime("%Y-%m-%d"),
+        "capital_activo": round(float(capital.sum()), 2),
+        "flujo_mensual": round(float(interes.sum()), 2),
+        "prestamos_activos": len(df),
+        "mora_prestamos": int(en_mora.sum()),
+        "mora_capital": round(float(capital[en_mora].sum()), 2),
+        "mora_interes": round(float(interes[en_mora].sum()), 2),
+        "exposicion_socios": {socio: round(monto, 2) for socio, monto in sorted(exposicion.items())},
+    }
+
+
+def evolucion_cartera(fotos):
+    """
+    fotos_cartera como serie de tiempo: índice 'fecha' (datetime64) y una columna por métrica,
+    con la exposición de cada socio abierta en columnas (0 los días en que no tenía capital).
+    """
+    df = pd.DataFrame(fotos)
+    if df.empty:
+        return df
+    exposicion = pd.DataFrame(df["exposicion_socios"].map(lambda e: e if isinstance(e, dict) else {}).tolist(), index=df.index)
+    df = pd.concat([df.drop(columns=["exposicion_socios", "updated_at"], errors="ignore"),
+                    exposicion.fillna(0.0).astype(float)], axis=1)
+    df["fecha"] = pd.to_datetime(df["fecha"], format="%Y-%m-%d")
+    return df.set_index("fecha").sort_index().apply(pd.to_numeric, errors="coerce")
+
+
+# --- COBROS EN LOTE ---
+# Encabezados aceptados en el CSV de carga masiva (sin distinguir mayúsculas ni espacios)
+COLUMNAS_PAGO_LOTE = {
+    "prestamo_id": "Prestamo_Id", "id": "Prestamo_Id", "prestamo": "Prestamo_Id", "préstamo": "Prestamo_Id",
+    "cliente": "Cliente",
+    "interes": "Interes", "interés": "Interes", "interes_pagado": "Interes",
+    "capital": "Capital", "capital_pagado": "Capital",
+    "renovar": "Renovar",
+    "nota": "Nota", "observaciones": "Nota",
+}
+# Margen con el que la pantalla sugiere renovar aunque el interés no cubra la cuota exacta
+TOLERANCIA_RENOVACION = 5
+_SI = {"si", "sí", "s", "true", "verdadero", "1", "x", "yes"}
+_NO = {"no", "n", "false", "falso", "0"}
+# Un solo tipo de separador seguido de grupos de tres cifras ('1,500', '1.500', '1,500,000') es de miles
+_SOLO_MILES = r"-?[1-9]\d{0,2}(?:,\d{3})+|-?[1-9]\d{0,2}(?:\.\d{3})+"
+
+
+def _montos(serie):
+    """
+    Montos escritos como 'S/ 1,500.50', '1.500,50' (Excel en español) o '1,500' -> float; vacío -> NaN.
+    Un separador solo es decimal si no le siguen exactamente tres cifras ('1,5' y '0,500' -> 1.5 y 0.5).
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.where(serie.notna(), "").astype(str).str.replace("S/", "", regex=False).str.replace(" ", "", regex=False)
+    # Con ambos separadores, el primero es el de miles; la coma que queda es la decimal
+    miles = np.where(texto.str.rfind(",") > texto.str.rfind("."), ".", ",")
+    solo_miles = texto.str.fullmatch(_SOLO_MILES)
+    texto = pd.Series([t.replace(",", "").replace(".", "") if s else t.replace(m, "") if "," in t and "." in t else t
+                       for t, m, s in zip(texto, miles, solo_miles)], index=serie.index)
+    numeros = pd.to_numeric(texto.str.replace(",", ".", regex=False), errors="coerce")
+    invalidos = numeros.isna() & (texto != "")
+    if invalidos.any():
+        fila = invalidos.idxmax()
+        raise ValueError(f"Monto no válido en la fila {fila + 1}: {serie[fila]!r}")
+    return numeros
+
+
+def normalizar_pagos_lote(pagos):
+    """
+    Lleva un CSV o una grilla de cobros al formato de aplicar_pagos():
+    Prestamo_Id, Cliente, Interes, Capital, Renovar (True / False / None) y Nota.
+    Lanza ValueError si un monto escrito no se puede leer (para no tomarlo como vacío).
+    """
+    df = pagos if isinstance(pagos, pd.DataFrame) else pd.DataFrame(pagos)
+    df = df.rename(columns=lambda c: COLUMNAS_PAGO_LOTE.get(str(c).strip().lower().replace(" ", "_"), c))
+    df = df.reindex(columns=["Prestamo_Id", "Cliente", "Interes", "Capital", "Renovar", "Nota"]).reset_index(drop=True)
+    texto = df["Renovar"].map(lambda v: str(v).strip().lower() if pd.notna(v) else "")
+    return df.assign(
+        Prestamo_Id=pd.to_numeric(df["Prestamo_Id"], errors="coerce").where(lambda i: i % 1 == 0).astype("Int64"),
+        Cliente=df["Cliente"].where(df["Cliente"].notna(), "").astype(str).str.strip(),
+        Interes=_montos(df["Interes"]),
+        Capital=_montos(df["Capital"]).fillna(0.0),
+        Renovar=texto.map(lambda v: True if v in _SI else False if v in _NO else None).astype(object),
+        Nota=df["Nota"].where(df["Nota"].notna(), "").astype(str).str.strip(),
+    )
+
+
+def aplicar_pagos(prestamos, pagos, hoy=None):
+    """
+    Resultado de varios cobros a la vez con la regla de 'Registrar Pago' de app.py:
+      * el interés que falta respecto de la cuota se suma al capital (y lo pagado de más lo descuenta)
+      * la nueva cuota es el nuevo capital por la tasa
+      * al renovar, el vencimiento pasa al mes siguiente como con sumar_un_mes()
+      * con capital <= 0 el préstamo queda cancelado (Estado 'Pagado')
+    prestamos: los activos, con las columnas de lecturas.COLS_COBRANZA. pagos: salida de normalizar_pagos_lote();
+    el préstamo se busca por Prestamo_Id o, si falta, por el nombre exacto del cliente. Sin interés se
+    asume la cuota completa y sin Renovar se renueva si el interés cubre la cuota (TOLERANCIA_RENOVACION).
+
+    Devuelve una fila por cobro, en el orden recibido, con los datos del préstamo antes y después;
+    'Error' explica por qué una fila no se puede aplicar (vacío si está bien).
+    """
+    cartera = prestamos if isinstance(prestamos, pd.DataFrame) else pd.DataFrame(prestamos)
+    cartera = cartera.reindex(columns=["id", "Cliente", "Fecha_Proximo_Pago", "Monto_Capital", "Tasa_Interes",
+                                       "Pago_Mensual_Interes", "Observaciones"])
+    pagos = normalizar_pagos_lote(pagos)
+    hoy = pd.Timestamp(hoy or date.today())
+
+    # Préstamo de cada fila: por id o por un nombre que no se repita entre los activos
+    homonimos = cartera["Cliente"].duplicated(keep=False)
+    por_nombre = pd.Series(cartera["id"].to_numpy(), index=cartera["Cliente"].to_numpy())[~homonimos.to_numpy()]
+    por_id = set(cartera["id"])
+    error = pd.Series("", index=pagos.index, dtype=object)
+    sin_id = pagos["Prestamo_Id"].isna()
+    error[sin_id & (pagos["Cliente"] == "")] = "Falta el id del préstamo o el cliente"
+    ambiguo = sin_id & pagos["Cliente"].isin(cartera.loc[homonimos, "Cliente"])
+    error[ambiguo] = "Hay varios préstamos activos con ese nombre: indique el id"
+    ids = pagos["Prestamo_Id"].astype("Float64").fillna(pagos["Cliente"].map(por_nombre).astype("Float64"))
+    error[(error == "") & ~ids.isin(por_id)] = "No es un préstamo activo"
+    error[(error == "") & ids.duplicated(keep="first") & ids.notna()] = "El préstamo ya tiene otro cobro en este lote"
+
+    df = pagos.assign(id=ids).merge(cartera.rename(columns={"Cliente": "Cliente_Prestamo"}), on="id", how="left")
+    df.index = pagos.index
+    cuota = pd.to_numeric(df["Pago_Mensual_Interes"], errors="coerce").fillna(0.0)
+    interes = df["Interes"].fillna(cuota)
+    error[(error == "") & ((interes < 0) | (df["Capital"] < 0))] = "Los montos no pueden ser negativos"
+
+    renovar = df["Renovar"].where(df["Renovar"].notna(), interes >= cuota - TOLERANCIA_RENOVACION).astype(bool)
+    interes_pendiente = cuota - interes
+    nuevo_capital = pd.to_numeric(df["Monto_Capital"], errors="coerce").fillna(0.0) - df["Capital"] + interes_pendiente
+    nueva_cuota = nuevo_capital * (pd.to_numeric(df["Tasa_Interes"], errors="coerce").fillna(0.0) / 100)
+
+    vencimiento = pd.to_datetime(df["Fecha_Proximo_Pago"], format="%Y-%m-%d", errors="coerce")
+    error[(error == "") & vencimiento.isna()] = "El préstamo no tiene una fecha de vencimiento válida"
+    valido = error == ""
+    cancelado = valido & (nuevo_capital <= 0)
+    # Al cancelar el vencimiento ya no importa: se deja como estaba
+    renovar = valido & renovar & ~cancelado
+    nuevo_vencimiento = df["Fecha_Proximo_Pago"].copy()
+    if renovar.any():
+        siguiente = fechas_de_pago(vencimiento[renovar].dt.strftime("%Y-%m-%d"), 2)[:, 1]
+        nuevo_vencimiento[renovar] = pd.DatetimeIndex(siguiente).strftime("%Y-%m-%d")
+    observaciones = df["Nota"].where(df["Nota"] != "", df["Observaciones"])
+
+    return pd.DataFrame({
+        "Fila": pagos.index + 1,
+        "id": df["id"].astype("Int64"),
+        "Cliente": df["Cliente_Prestamo"].fillna(df["Cliente"]),
+        "Interes": interes,
+        "Capital": df["Capital"],
+        "Renovar": renovar,
+        "Capital_Anterior": df["Monto_Capital"],
+        "Vencimiento_Anterior": df["Fecha_Proximo_Pago"],
+        "Interes_Pendiente": interes_pendiente,
+        "Nuevo_Capital": nuevo_capital,
+        "Nueva_Cuota": nueva_cuota,
+        "Nuevo_Vencimiento": nuevo_vencimiento,
+        "Cancelado": cancelado,
+        "Fecha_Finalizacion": np.where(cancelado, hoy.strftime("%Y-%m-%d"), None),
+        "Nota": df["Nota"],
+        # Sin nota ni observación previa queda None (no NaN): la fila viaja como JSON a Supabase
+        "Observaciones": observaciones.astype(object).where(observaciones.notna(), None),
+        "Error": error,
+    })
@@ -0,0 +1,161 @@
+"""
+Fábrica única del cliente de Supabase para app.py, notifier.py y los scripts.
+
+- Un cliente por proceso (y por credenciales) sobre un httpx.Client con conexiones
+  keep-alive, para no repetir el handshake TLS en cada consulta.
+- Tiempo de espera configurable por consulta.
+- Reintentos acotados con espera exponencial aleatoria (full jitter) ante errores de red.
+  Las inserciones y las funciones RPC no son idempotentes: solo se reintentan si la
+  conexión ni siquiera llegó a establecerse.
+- Contadores de latencia y fallos (MetricasConexion) para detectar un backend lento.
+
+httpx y supabase se importan recién al crear el cliente, para que importar este
+módulo no retrase la pantalla de login. Con ligero=True se usa solo el cliente REST
+(postgrest), sin los módulos de auth, storage y realtime de supabase-py: basta para
+los scripts que únicamente consultan tablas (notifier.py, backfill_pagos.py).
+"""
+import random
+import threading
+import time
+
+TIMEOUT_SEGUNDOS = 10.0
+REINTENTOS = 3
+# Una consulta que tarda más que esto cuenta como lenta en las métricas
+UMBRAL_LENTA_SEGUNDOS = 2.0
+
+
+def _es_reintentable(error, idempotente):
+    import httpx
+    # Fallos en los que seguro no llegó al servidor: se pueden reintentar incluso las inserciones
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    # Resto de fallos de red: la consulta pudo haberse aplicado
+    return idempotente and isinstance(error, httpx.TransportError)
+
+
+class MetricasConexion:
+    """Contadores de latencia y fallos compartidos por todas las consultas del cliente."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.fallos = 0        # consultas que fallaron después de agotar los reintentos
+        self.reintentos = 0
+        self.lentas = 0
+        self.latencia_total = 0.0
+        self.latencia_max = 0.0
+        self.ultimo_error = None
+
+    def registrar(self, segundos, error=None, reintento=False):
+        with self._lock:
+            self.consultas += 1
+            self.latencia_total += segundos
+            self.latencia_max = max(self.latencia_max, segundos)
+            if segundos > UMBRAL_LENTA_SEGUNDOS:
+                self.lentas += 1
+            if error is not None:
+                self.ultimo_error = f"{type(error).__name__}: {error}"
+                if reintento:
+                    self.reintentos += 1
+                else:
+                    self.fallos += 1
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "consultas": self.consultas,
+                "fallos": self.fallos,
+                "reintentos": self.reintentos,
+                "lentas": self.lentas,
+                "latencia_media_ms": round(1000 * self.latencia_total / self.consultas, 1) if self.consultas else 0.0,
+                "latencia_max_ms": round(1000 * self.latencia_max, 1),
+                "ultimo_error": self.ultimo_error,
+            }
+
+
+class _Consulta:
+    """Envuelve un constructor de consultas de postgrest para que execute() pase por los reintentos."""
+
+    def __init__(self, constructor, cliente, idempotente):
+        self._constructor = constructor
+        self._cliente = cliente
+        self._idempotente = idempotente
+
+    def execute(self):
+        return self._cliente.ejecutar(self._constructor.execute, self._idempotente)
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._constructor, nombre)
+        idempotente = self._idempotente and nombre != "insert"
+        if not callable(atributo):
+            # Propiedades encadenables como .not_
+            return _Consulta(atributo, self._cliente, idempotente) if hasattr(atributo, "execute") else atributo
+
+        def encadenar(*args, **kwargs):
+            resultado = atributo(*args, **kwargs)
+            return _Consulta(resultado, self._cliente, idempotente) if hasattr(resultado, "execute") else resultado
+        return encadenar
+
+
+class ClienteSupabase:
+    """Mismo uso que el cliente de supabase-py (table / rpc), con reintentos y métricas."""
+
+    def __init__(self, cliente, reintentos=REINTENTOS):
+        self.cliente = cliente
+        self.reintentos = reintentos
+        self.metricas = MetricasConexion()
+
+    def table(self, nombre):
+        return _Consulta(self.cliente.table(nombre), self, idempotente=True)
+
+    def rpc(self, funcion, parametros=None):
+        return _Consulta(self.cliente.rpc(funcion, parametros or {}), self, idempotente=False)
+
+    def ejecutar(self, funcion, idempotente=True):
+        for intento in range(self.reintentos + 1):
+            inicio = time.perf_counter()
+            try:
+                respuesta = funcion()
+            except Exception as e:
+                ultimo = not _es_reintentable(e, idempotente) or intento == self.reintentos
+                self.metricas.registrar(time.perf_counter() - inicio, error=e, reintento=not ultimo)
+                if ultimo:
+                    raise
+                time.sleep(random.uniform(0, min(8.0, 0.25 * 2 ** (intento + 1))))
+                continue
+            self.metricas.registrar(time.perf_counter() - inicio)
+            return respuesta
+
+
+def crear_cliente(url, key, timeout=TIMEOUT_SEGUNDOS, reintentos=REINTENTOS, ligero=False):
+    import httpx
+    http = httpx.Client(
+        timeout=httpx.Timeout(timeout, connect=min(5.0, timeout)),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+        http2=True,
+        follow_redirects=True,
+    )
+    if ligero:
+        from postgrest import SyncPostgrestClient
+        cliente = SyncPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            http_client=http,
+        )
+    else:
+        from supabase import ClientOptions, create_client
+        opciones = ClientOptions(httpx_client=http, auto_refresh_token=False, persist_session=False)
+        cliente = create_client(url, key, options=opciones)
+    return ClienteSupabase(cliente, reintentos)
+
+
+_CLIENTES = {}
+_LOCK_CLIENTES = threading.Lock()
+
+
+def obtener_cliente(url, key, timeout=TIMEOUT_SEGUNDOS, reintentos=REINTENTOS, ligero=False):
+    """Cliente compartido del proceso para estas credenciales (reutiliza sus conexiones)."""
+    with _LOCK_CLIENTES:
+        if (url, key, ligero) not in _CLIENTES:
+            _CLIENTES[(url, key, ligero)] = crear_cliente(url, key, float(timeout), int(reintentos), ligero)
+        return _CLIENTES[(url, key, ligero)]
@@ -0,0 +1,156 @@
+"""
+Envío por SMTP de los correos del notifier.
+
+Cada hilo abre una sola conexión autenticada (STARTTLS + login) y la reutiliza para
+todos los mensajes que le tocan, en lugar de pagar el saludo, el TLS y el login por
+correo. Con conexiones > 1 los mensajes salen en paralelo por un pequeño pool, y
+LimiteTasa espacia los envíos de todos los hilos para no superar el cupo del servidor.
+
+Cada mensaje se reintenta por separado: ante una desconexión o una respuesta 4xx
+(temporal) se descarta la conexión, se espera con backoff y se vuelve a conectar;
+las respuestas 5xx (dirección rechazada, credenciales) no se reintentan. El callback
+al_enviar avisa de cada mensaje aceptado para que notifier.py registre lo ya enviado.
+"""
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVIDOR = "smtp.gmail.com"
+PUERTO = 587
+CONEXIONES = 2             # Gmail admite pocas sesiones simultáneas por cuenta
+MENSAJES_POR_MINUTO = 60   # 0 = sin límite
+REINTENTOS = 3
+TIMEOUT_SEGUNDOS = 30
+
+
+class LimiteTasa:
+    """Reparte turnos separados por 60/por_minuto segundos entre todos los hilos."""
+
+    def __init__(self, por_minuto):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self._siguiente = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def _es_temporal(error):
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # Desconexiones y fallos de red (SMTPServerDisconnected es subclase de OSError desde 3.4)
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class EnviadorSMTP:
+    """Envía listas de mensajes reutilizando conexiones; ver enviar()."""
+
+    def __init__(self, usuario, clave, servidor=SERVIDOR, puerto=PUERTO, tls=True,
+                 conexiones=CONEXIONES, por_minuto=MENSAJES_POR_MINUTO,
+                 reintentos=REINTENTOS, timeout=TIMEOUT_SEGUNDOS):
+        self.usuario, self.clave = usuario, clave
+        self.servidor, self.puerto, self.tls, self.timeout = servidor, puerto, tls, timeout
+        self.conexiones = max(1, conexiones)
+        self.reintentos = max(1, reintentos)
+        self.limite = LimiteTasa(por_minuto)
+        self._local = threading.local()
+        self._abiertas = []
+        self._lock = threading.Lock()
+        self.sesiones = 0      # conexiones abiertas en total (incluye reconexiones)
+        self.reintentados = 0
+
+    def _conectar(self):
+        smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout)
+        try:
+            if self.tls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.clave)
+        except BaseException:
+            smtp.close()
+            raise
+        with self._lock:
+            self._abiertas.append(smtp)
+            self.sesiones += 1
+        return smtp
+
+    def _conexion(self):
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            smtp = self._local.smtp = self._conectar()
+        return smtp
+
+    def _descartar(self):
+        smtp = getattr(self._local, "smtp", None)
+        self._local.smtp = None
+        if smtp is not None:
+            with self._lock:
+                if smtp in self._abiertas:
+                    self._abiertas.remove(smtp)
+            smtp.close()
+
+    def _limpiar_sesion(self, error):
+        """Tras un rechazo la sesión sana se reutiliza (RSET); tras una desconexión o un 421 se descarta."""
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            return
+        if isinstance(error, smtplib.SMTPResponseException) and error.smtp_code != 421:
+            try:
+                smtp.rset()
+                return
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._descartar()
+
+    def _enviar_uno(self, mensaje, al_enviar=None):
+        """None si salió; si no, el último error."""
+        for intento in range(self.reintentos):
+            self.limite.esperar()
+            try:
+                self._conexion().send_message(mensaje)
+            except (smtplib.SMTPException, OSError) as e:
+                self._limpiar_sesion(e)
+                if not _es_temporal(e) or intento == self.reintentos - 1:
+                    return e
+            else:
+                if al_enviar is not None:
+                    al_enviar(mensaje)
+                return None
+            with self._lock:
+                self.reintentados += 1
+            time.sleep(random.uniform(0, min(8.0, 0.5 * 2 ** intento)))
+
+    def enviar(self, mensajes, al_enviar=None):
+        """
+        Envía todos los mensajes y cierra las conexiones al terminar.
+        al_enviar(mensaje), si se indica, se llama desde el hilo de envío apenas el servidor
+        acepta cada mensaje (no debe lanzar excepciones).
+        Devuelve la lista de (mensaje, error) de los que no salieron tras los reintentos.
+        """
+        mensajes = list(mensajes)
+        if not mensajes:
+            return []
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.conexiones, len(mensajes))) as pool:
+                errores = list(pool.map(lambda m: self._enviar_uno(m, al_enviar), mensajes))
+        finally:
+            self.cerrar()
+        return [(m, e) for m, e in zip(mensajes, errores) if e is not None]
+
+    def cerrar(self):
+        with self._lock:
+            abiertas, self._abiertas = self._abiertas, []
+        for smtp in abiertas:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
@@ -0,0 +1,122 @@
+"""
+Escritor de auditoría en segundo plano.
+
+registrar_auditoria() solo encola el evento; un hilo lo envía a Supabase en
+inserciones de varias filas, cada cierto intervalo o al juntar un lote. Si el envío
+falla se reintenta con espera exponencial, y lo que no se pudo enviar (o queda en
+cola al apagar el proceso) se guarda en un archivo de respaldo (spool) en formato
+JSON Lines que se vuelve a encolar en cuanto Supabase responde de nuevo.
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+
+class EscritorAuditoria:
+    def __init__(self, cliente, ruta_spool, intervalo=2.0, tamano_lote=50, reintentos=5, al_escribir=None):
+        self.cliente = cliente
+        self.ruta_spool = ruta_spool
+        self.intervalo = intervalo
+        self.tamano_lote = tamano_lote
+        self.reintentos = reintentos
+        self.al_escribir = al_escribir  # p. ej. invalidar la caché de lecturas de auditoría
+        self._cola = queue.Queue()
+        self._detener = threading.Event()
+        self._lock_spool = threading.Lock()
+        self._recuperar_spool()
+        self._hilo = threading.Thread(target=self._bucle, name="escritor-auditoria", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def registrar(self, evento):
+        """Encola un evento (dict con las columnas de 'auditoria'). No bloquea."""
+        self._cola.put(evento)
+
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def cerrar(self, timeout=5.0):
+        """Detiene el hilo, intenta un último envío y guarda en el spool lo que no salió."""
+        if self._detener.is_set():
+            return
+        self._detener.set()
+        self._hilo.join(timeout)
+        restantes = self._vaciar_cola()
+        if restantes and not self._insertar(restantes):
+            self._guardar_spool(restantes)
+
+    # --- HILO DE ENVÍO ---
+    def _bucle(self):
+        while not self._detener.is_set():
+            lote = self._tomar_lote()
+            if lote:
+                self._enviar(lote)
+
+    def _tomar_lote(self):
+        """Espera el primer evento y junta los que lleguen hasta completar el lote o el intervalo."""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _enviar(self, lote):
+        for intento in range(self.reintentos):
+            if self._insertar(lote):
+                # Supabase volvió a responder: reencolamos lo que haya quedado en el spool
+                self._recuperar_spool()
+                return
+            # Espera exponencial con variación aleatoria; si se pide detener, se corta la espera
+            espera = min(30.0, 0.5 * 2 ** intento) * random.uniform(0.5, 1.0)
+            if self._detener.wait(espera):
+                break
+        self._guardar_spool(lote)
+
+    def _insertar(self, lote):
+        try:
+            self.cliente.table("auditoria").insert(lote).execute()
+        except Exception as e:
+            print(f"Error Auditoría ({len(lote)} eventos): {e}")
+            return False
+        if self.al_escribir:
+            self.al_escribir()
+        return True
+
+    def _vaciar_cola(self):
+        eventos = []
+        while True:
+            try:
+                eventos.append(self._cola.get_nowait())
+            except queue.Empty:
+                return eventos
+
+    # --- SPOOL EN DISCO ---
+    def _guardar_spool(self, eventos):
+        with self._lock_spool:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta_spool)), exist_ok=True)
+            with open(self.ruta_spool, "a", encoding="utf-8") as archivo:
+                for evento in eventos:
+                    archivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+    def _recuperar_spool(self):
+        with self._lock_spool:
+            if not os.path.exists(self.ruta_spool):
+                return
+            with open(self.ruta_spool, encoding="utf-8") as archivo:
+                eventos = [json.loads(linea) for linea in archivo if linea.strip()]
+            os.remove(self.ruta_spool)
+        for evento in eventos:
+            self._cola.put(evento)
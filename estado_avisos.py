@@ -0,0 +1,119 @@
+"""
+Registro de los avisos que notifier.py ya envió, para que cada ejecución mande solo lo nuevo.
+
+Un aviso es (destinatario, préstamo, vencimiento, tramo). Como "próximos", "vence hoy" y
+"mora" son tramos distintos, cada préstamo se avisa una vez al entrar en la ventana y otra
+cada vez que escala; al renovarse cambia el vencimiento y empieza un ciclo nuevo.
+  modo "novedades" -> solo las alertas sin registro
+  modo "completo"  -> todas, como resumen diario, pero a lo sumo una vez por día
+
+Se registra después de cada mensaje aceptado por el servidor SMTP: si la ejecución se corta
+a mitad o se vuelve a lanzar el workflow, la siguiente retoma sin repetir lo ya enviado.
+Dos almacenes con la misma interfaz: EstadoTabla (tabla 'avisos_enviados' de Supabase, ver
+sql/005_avisos_enviados.sql) y EstadoArchivo (JSON local, para pruebas o sin base).
+"""
+import abc
+import json
+import os
+import threading
+from datetime import timedelta
+
+from reporte_correo import tramo
+
+MODOS_AVISO = ("novedades", "completo")
+CLAVE_TABLA = "destinatario,prestamo_id,vencimiento,tramo"
+TAMANO_LOTE = 1000          # máximo de filas por respuesta de Supabase
+IDS_POR_CONSULTA = 200      # ids por filtro in_ (mantiene corta la URL)
+DIAS_RETENCION_ARCHIVO = 180
+
+
+def clave_aviso(destinatario, alerta):
+    return (destinatario, int(alerta["id"]), alerta["vencimiento"], tramo(alerta["dias"]))
+
+
+class _Estado(abc.ABC):
+    """Parte común: {clave: fecha del último envío ('AAAA-MM-DD')} y la regla de qué falta enviar."""
+
+    def __init__(self, hoy):
+        self.hoy = hoy.isoformat()
+        self.enviados = {}
+        self._lock = threading.Lock()
+
+    def pendientes(self, destinatario, alertas, modo="novedades"):
+        if modo not in MODOS_AVISO:
+            raise ValueError(f"Modo de aviso desconocido: {modo!r} (use {' o '.join(MODOS_AVISO)})")
+        if modo == "completo":
+            return [a for a in alertas if self.enviados.get(clave_aviso(destinatario, a)) != self.hoy]
+        return [a for a in alertas if clave_aviso(destinatario, a) not in self.enviados]
+
+    def registrar(self, destinatario, alertas):
+        """Marca como enviadas las alertas de un mensaje; se llama desde los hilos del envío."""
+        claves = [clave_aviso(destinatario, a) for a in alertas]
+        with self._lock:
+            for clave in claves:
+                self.enviados[clave] = self.hoy
+            self._persistir(claves)
+
+    @abc.abstractmethod
+    def _persistir(self, claves):
+        """Guarda en el backend las claves recién marcadas (con el lock tomado)."""
+
+
+class EstadoTabla(_Estado):
+    """Estado en la tabla 'avisos_enviados'; cargar() trae solo el de los préstamos con alerta hoy."""
+
+    def __init__(self, cliente, hoy):
+        super().__init__(hoy)
+        self.cliente = cliente
+
+    def cargar(self, alertas):
+        ids = sorted({int(a["id"]) for a in alertas})
+        # Los ciclos anteriores al vencimiento más antiguo en alerta ya no importan
+        desde = min((a["vencimiento"] for a in alertas), default=self.hoy)
+        for i in range(0, len(ids), IDS_POR_CONSULTA):
+            inicio = 0
+            while True:
+                filas = (
+                    self.cliente.table("avisos_enviados").select(CLAVE_TABLA + ",fecha")
+                    .in_("prestamo_id", ids[i:i + IDS_POR_CONSULTA]).gte("vencimiento", desde)
+                    .order("prestamo_id").order("destinatario").order("vencimiento").order("tramo")
+                    .range(inicio, inicio + TAMANO_LOTE - 1).execute().data
+                )
+                for f in filas:
+                    self.enviados[(f["destinatario"], int(f["prestamo_id"]), f["vencimiento"], f["tramo"])] = f["fecha"]
+                if len(filas) < TAMANO_LOTE:
+                    break
+                inicio += TAMANO_LOTE
+        return self
+
+    def _persistir(self, claves):
+        filas = [
+            {"destinatario": d, "prestamo_id": p, "vencimiento": v, "tramo": t, "fecha": self.hoy}
+            for d, p, v, t in claves
+        ]
+        for i in range(0, len(filas), TAMANO_LOTE):
+            # Upsert: idempotente, se reintenta sin duplicar
+            self.cliente.table("avisos_enviados").upsert(filas[i:i + TAMANO_LOTE], on_conflict=CLAVE_TABLA).execute()
+
+
+class EstadoArchivo(_Estado):
+    """Estado en un JSON local, reescrito de forma atómica tras cada mensaje."""
+
+    def __init__(self, ruta, hoy):
+        super().__init__(hoy)
+        self.ruta = ruta
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as archivo:
+                avisos = json.load(archivo)["avisos"]
+            limite = (hoy - timedelta(days=DIAS_RETENCION_ARCHIVO)).isoformat()
+            self.enviados = {(d, p, v, t): f for d, p, v, t, f in avisos if f >= limite}
+
+    def cargar(self, alertas):
+        return self
+
+    def _persistir(self, claves):
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"avisos": [[*clave, fecha] for clave, fecha in self.enviados.items()]}, archivo, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
@@ -0,0 +1,113 @@
+"""
+Consultas a Supabase de las páginas de app.py, sin Streamlit.
+
+app.py las envuelve con su caché (st.cache_data) y error_conexion(); bench/paginas.py las
+llama tal cual contra el Supabase en memoria, así el benchmark mide el mismo código y pide
+las mismas columnas que la app. Reciben el cliente como primer argumento
+(conexion.ClienteSupabase o simuladores.supabase_memoria.ClienteMemoria).
+"""
+
+# --- COLUMNAS QUE CADA PÁGINA NECESITA DE 'prestamos' ---
+COLS_COBRANZA = ["id", "Cliente", "Fecha_Proximo_Pago", "Monto_Capital", "Tasa_Interes", "Pago_Mensual_Interes", "Observaciones"]
+COLS_DASHBOARD = COLS_COBRANZA + ["Telefono", "Distribucion_Socios", "Porc_Socio1"]
+# Columnas de 'pagos' que usa el historial de socios ('reparto': lo que le tocó a cada socio, sql/006;
+# 'id': cursor de las páginas)
+COLS_PAGOS_SOCIOS = ["id", "Prestamo_Id", "Cliente", "Interes_Pagado", "Fecha_Pago", "reparto"]
+COLS_PAGOS_CORRECCION = ["id", "Prestamo_Id", "Cliente", "Interes_Pagado", "Capital_Pagado", "Fecha_Pago"]
+COLS_PROYECCION = ["id", "Cliente", "Fecha_Proximo_Pago", "Pago_Mensual_Interes", "Tasa_Interes", "Distribucion_Socios"]
+COLS_HISTORIAL = ["Cliente", "DNI", "Telefono", "Monto_Capital", "Tasa_Interes", "Pago_Mensual_Interes", "Fecha_Prestamo", "Fecha_Proximo_Pago", "Fecha_Finalizacion", "Observaciones"]
+# Columnas visibles de la auditoría
+COLS_AUDITORIA = ["id", "Fecha/Hora", "Usuario", "Perfil", "Operación", "Cliente Afectado", "Detalle del Movimiento"]
+
+# --- LECTURA PAGINADA (KEYSET) ---
+# La auditoría crece con cada acceso y movimiento: se lee de la más reciente a la más
+# antigua en páginas de tamaño fijo, pidiendo siempre "id < último id visto". A diferencia
+# de un OFFSET, el costo de cada página no crece con la antigüedad del registro.
+# Se pagina sobre 'id' y no sobre 'Fecha/Hora' porque el id es único y crece con cada
+# inserción, mientras que dos eventos pueden compartir el mismo segundo. El libro 'pagos'
+# se pagina igual.
+TAMANO_PAGINA_AUDITORIA = 100
+
+
+def columna_sql(nombre):
+    # PostgREST exige comillas dobles para nombres con espacios o símbolos ("Fecha/Hora")
+    return nombre if nombre.replace("_", "").isalnum() else f'"{nombre}"'
+
+
+def seleccion(columnas):
+    return ",".join(columna_sql(c) for c in columnas) if columnas else "*"
+
+
+def escapar_like(texto):
+    # '%' y '_' escritos por el usuario se buscan literalmente, no como comodines
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def consultar_tabla(cliente, nombre_tabla, estado=None, columnas=None, orden=None):
+    """Tabla completa con filtro por Estado, proyección y orden ("Columna" o "Columna desc") en la consulta."""
+    consulta = cliente.table(nombre_tabla).select(seleccion(columnas))
+    if estado:
+        consulta = consulta.eq("Estado", estado)
+    if orden:
+        campo, _, sentido = orden.partition(" ")
+        consulta = consulta.order(campo, desc=sentido.strip().lower() == "desc")
+    return consulta.execute().data
+
+
+def recorrer_paginas(leer_pagina, paginas=1, tamano=TAMANO_PAGINA_AUDITORIA):
+    """
+    (registros, hay_mas) con las primeras `paginas` páginas; paginas=None las recorre todas.
+    leer_pagina(antes_de_id) devuelve hasta `tamano` filas con 'id' menor (None: la primera).
+    """
+    registros, cursor, leidas = [], None, 0
+    while paginas is None or leidas < paginas:
+        pagina = leer_pagina(cursor)
+        registros.extend(pagina)
+        leidas += 1
+        if len(pagina) < tamano:
+            return registros, False
+        cursor = pagina[-1]["id"]
+    return registros, True
+
+
+def leer_pagina_auditoria(cliente, antes_de_id, tamano, operacion=None, columnas=None, texto=None, desde=None, hasta=None):
+    """Una página de auditoría por id descendente; texto ya normalizado (busqueda.normalizar)."""
+    consulta = cliente.table("auditoria").select(seleccion(columnas))
+    if operacion:
+        consulta = consulta.eq("Operación", operacion)
+    if texto:
+        # Cada palabra (ya en minúsculas y sin tildes) debe aparecer en 'texto_busqueda',
+        # la columna generada con índice de trigramas de sql/003_busqueda_auditoria.sql
+        for palabra in texto.split():
+            consulta = consulta.ilike("texto_busqueda", f"%{escapar_like(palabra)}%")
+    # 'Fecha/Hora' se guarda como texto 'AAAA-MM-DD HH:MM:SS': el orden de texto es el cronológico
+    if desde:
+        consulta = consulta.gte(columna_sql("Fecha/Hora"), f"{desde} 00:00:00")
+    if hasta:
+        consulta = consulta.lte(columna_sql("Fecha/Hora"), f"{hasta} 23:59:59")
+    if antes_de_id is not None:
+        consulta = consulta.lt("id", antes_de_id)
+    return consulta.order("id", desc=True).limit(tamano).execute().data
+
+
+def leer_pagina_pagos(cliente, antes_de_id, tamano, columnas=None):
+    """Una página del libro 'pagos' por id descendente (el último registrado primero)."""
+    consulta = cliente.table("pagos").select(seleccion(columnas))
+    if antes_de_id is not None:
+        consulta = consulta.lt("id", antes_de_id)
+    return consulta.order("id", desc=True).limit(tamano).execute().data
+
+
+# --- TABLAS Y VISTAS RESUMIDAS (sql/006, sql/008) ---
+def leer_ganancias_socios(cliente):
+    """Filas {socio, mes, monto, pagos} de ganancias_socios, del mes más antiguo al más reciente."""
+    return cliente.table("ganancias_socios").select("socio,mes,monto,pagos").order("mes").execute().data
+
+
+def leer_resumen_cartera(cliente):
+    """{Estado: {capital, interes, prestamos}} desde la vista resumen_cartera."""
+    filas = cliente.table("resumen_cartera").select("Estado,capital,interes,prestamos").execute().data
+    return {
+        f["Estado"]: {"capital": float(f["capital"] or 0), "interes": float(f["interes"] or 0), "prestamos": int(f["prestamos"])}
+        for f in filas
+    }
@@ -1,10 +1,14 @@
+import json
 import os
-import smtplib
 import sys
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
-from supabase import create_client
+import pandas as pd
+from conexion import obtener_cliente, TIMEOUT_SEGUNDOS, REINTENTOS
+from sincronizacion import SnapshotTabla
+from cartera import panorama_cartera, socios_del_prestamo, DIAS_AVISO
+from reporte_correo import mensajes_por_destinatario, MAX_FILAS_CORREO as FILAS_POR_DEFECTO
+from envio_correo import EnviadorSMTP, SERVIDOR, PUERTO, CONEXIONES, MENSAJES_POR_MINUTO
+from estado_avisos import EstadoTabla, EstadoArchivo
 
 # Forzar que los mensajes se vean en tiempo real en GitHub
 def print_log(msg):
@@ -17,6 +21,85 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 GMAIL_USER = os.environ.get("GMAIL_USER")
 GMAIL_PASS = os.environ.get("GMAIL_PASS")
 RECEPTOR = os.environ.get("RECEPTOR")
+# Carpeta opcional donde persistir la réplica local entre ejecuciones (ver sincronizacion.py)
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR")
+# Timeout por consulta (segundos) y reintentos ante fallos de red (ver conexion.py)
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", TIMEOUT_SEGUNDOS))
+SUPABASE_REINTENTOS = int(os.environ.get("SUPABASE_REINTENTOS", REINTENTOS))
+# Días hacia adelante que se avisan (los vencidos siempre se incluyen)
+DIAS_ANTICIPACION = int(os.environ.get("DIAS_ANTICIPACION", DIAS_AVISO))
+# Por encima de este número de filas el correo adjunta la lista en CSV ("csv") o se parte en varios ("dividir")
+MAX_FILAS_CORREO = int(os.environ.get("MAX_FILAS_CORREO", FILAS_POR_DEFECTO))
+MODO_CORREO_GRANDE = os.environ.get("MODO_CORREO_GRANDE", "csv")
+# Resúmenes por socio o cobrador, además del completo para RECEPTOR (ver reporte_correo.filtrar_destinatario):
+# [{"correo": "bruno@...", "socio": "Bruno Tapia"}, {"correo": "cobrador@...", "nombre": "Zona Norte", "clientes": [12, 40]}]
+DESTINATARIOS = json.loads(os.environ.get("DESTINATARIOS") or "[]")
+# "novedades": solo alertas nuevas o que escalaron de tramo; "completo": resumen diario con todas.
+# Cada destinatario puede cambiarlo con su propia clave "modo".
+MODO_AVISO = os.environ.get("MODO_AVISO", "novedades")
+# Dónde se recuerda lo ya enviado: "supabase" (tabla avisos_enviados), la ruta de un JSON, o "no"
+ESTADO_AVISOS = os.environ.get("ESTADO_AVISOS", "supabase")
+# Servidor SMTP (SMTP_TLS=0 para el servidor local de simuladores/smtp_local.py), sesiones en paralelo y cupo por minuto
+SMTP_SERVIDOR = os.environ.get("SMTP_SERVIDOR", SERVIDOR)
+SMTP_PUERTO = int(os.environ.get("SMTP_PUERTO", PUERTO))
+SMTP_TLS = os.environ.get("SMTP_TLS", "1") != "0"
+SMTP_CONEXIONES = int(os.environ.get("SMTP_CONEXIONES", CONEXIONES))
+SMTP_POR_MINUTO = int(os.environ.get("SMTP_POR_MINUTO", MENSAJES_POR_MINUTO))
+# Foto diaria de la cartera para la pestaña EVOLUCIÓN del Dashboard (sql/009); FOTO_CARTERA=0 la desactiva
+FOTO_CARTERA = os.environ.get("FOTO_CARTERA", "1") != "0"
+
+# Solo lo que usa el correo (y el reparto por socio); 'id' además sirve de cursor para leer por lotes
+COLUMNAS_ALERTA = [
+    "id", "Cliente", "Monto_Capital", "Pago_Mensual_Interes", "Fecha_Proximo_Pago",
+    "Tasa_Interes", "Distribucion_Socios",
+]
+TAMANO_LOTE = 1000  # máximo de filas por respuesta de Supabase
+
+def leer_por_vencer(supabase, limite):
+    """Préstamos activos con vencimiento <= limite ('AAAA-MM-DD'), por keyset sobre id."""
+    cursor = None
+    while True:
+        consulta = (
+            supabase.table("prestamos").select(",".join(COLUMNAS_ALERTA))
+            .eq("Estado", "Activo").lte("Fecha_Proximo_Pago", limite)
+        )
+        if cursor is not None:
+            consulta = consulta.gt("id", cursor)
+        filas = consulta.order("id").limit(TAMANO_LOTE).execute().data
+        yield from filas
+        if len(filas) < TAMANO_LOTE:
+            return
+        cursor = filas[-1]["id"]
+
+def abrir_estado(supabase, hoy, alertas):
+    """Avisos ya enviados de estos préstamos según ESTADO_AVISOS; None si está desactivado o no se pudo leer."""
+    if ESTADO_AVISOS.lower() in ("", "0", "no"):
+        return None
+    try:
+        if ESTADO_AVISOS.lower() == "supabase":
+            estado = EstadoTabla(supabase, hoy)
+        else:
+            estado = EstadoArchivo(ESTADO_AVISOS, hoy)
+        estado.cargar(alertas)
+        print_log(f"Estado de avisos: {len(estado.enviados)} avisos previos registrados para estos préstamos.")
+        return estado
+    except Exception as e:
+        # Sin estado se avisa todo: es preferible un correo repetido a no avisar
+        print_log(f"⚠️ No se pudo leer el estado de avisos ({e}); se enviarán todas las alertas.")
+        return None
+
+def guardar_foto_cartera(supabase, hoy):
+    """Escribe (o reemplaza) la foto de hoy de la cartera; un fallo no debe impedir los avisos."""
+    if not FOTO_CARTERA:
+        return
+    try:
+        foto = supabase.rpc("guardar_foto_cartera", {"p_fecha": hoy.isoformat()}).execute().data
+        print_log(
+            f"Foto de la cartera del {foto['fecha']}: capital activo S/ {float(foto['capital_activo']):,.2f}, "
+            f"{foto['mora_prestamos']} préstamos en mora (S/ {float(foto['mora_capital']):,.2f})."
+        )
+    except Exception as e:
+        print_log(f"⚠️ No se pudo guardar la foto diaria de la cartera: {e}")
 
 def check_and_notify():
     try:
@@ -27,134 +110,110 @@ def check_and_notify():
             return
 
         print_log("Conectando a Supabase...")
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = obtener_cliente(SUPABASE_URL, SUPABASE_KEY, SUPABASE_TIMEOUT, SUPABASE_REINTENTOS, ligero=True)
         
-        # Consultar préstamos activos
-        response = supabase.table("prestamos").select("*").eq("Estado", "Activo").execute()
-        prestamos = response.data
+        # Consultar solo los préstamos activos que vencen dentro de la ventana de aviso
+        hoy = datetime.now().date()
+        limite = (hoy + timedelta(days=DIAS_ANTICIPACION)).isoformat()
+        if SNAPSHOT_DIR:
+            # Solo se descarga lo que cambió desde la ejecución anterior; el filtro se aplica en local
+            snapshot = SnapshotTabla("prestamos", ruta=os.path.join(SNAPSHOT_DIR, "prestamos.json"))
+            cambios = snapshot.refrescar(supabase)
+            print_log(f"Réplica local actualizada: {cambios} cambios desde la última ejecución.")
+            prestamos = [
+                p for p in snapshot.consultar(estado="Activo", columnas=COLUMNAS_ALERTA)
+                if p["Fecha_Proximo_Pago"] and str(p["Fecha_Proximo_Pago"]) <= limite
+            ]
+        else:
+            prestamos = list(leer_por_vencer(supabase, limite))
         
-        print_log(f"Conexión exitosa. Se encontraron {len(prestamos)} préstamos activos.")
+        print_log(f"Conexión exitosa. {len(prestamos)} préstamos activos vencen hasta el {limite}.")
+        # Se calcula en la base sobre toda la cartera activa: no hace falta descargarla
+        guardar_foto_cartera(supabase, hoy)
         
-        hoy = datetime.now().date()
-        alerta_clientes = []
+        # Misma clasificación vectorizada que el Dashboard: mora, vence hoy y próximos N días
+        panorama = panorama_cartera(prestamos, hoy, dias_aviso=DIAS_ANTICIPACION)
+        alertas = panorama['cartera'][panorama['cartera']['dias'] <= DIAS_ANTICIPACION]
+        if alertas.empty:
+            alertas = alertas.reindex(columns=['id', 'Cliente', 'Monto_Capital', 'Pago_Mensual_Interes', 'dias', 'Vencimiento'])
 
-        for p in prestamos:
-            v_pago = p.get('Fecha_Proximo_Pago')
-            if not v_pago: continue
-            
-            vencimiento = datetime.strptime(str(v_pago), "%Y-%m-%d").date()
-            dias = (vencimiento - hoy).days
-            
-            print_log(f"Revisando: {p['Cliente']} | Vence en: {dias} días")
-
-            if dias <= 5:
-                # --- AQUÍ ESTÁ LA CORRECCIÓN BASADA EN TU CÓDIGO STREAMLIT ---
-                # Usamos .get(..., 0.0) para evitar errores si el campo viene vacío
-                capital = float(p.get('Monto_Capital', 0.0) or 0.0)
-                interes = float(p.get('Pago_Mensual_Interes', 0.0) or 0.0)
-                
-                alerta_clientes.append({
-                    "nombre": p['Cliente'],
-                    "capital": capital,  # Columna: Monto_Capital
-                    "cuota": interes,    # Columna: Pago_Mensual_Interes
-                    "dias": dias,
-                    "fecha": vencimiento.strftime("%d/%m/%Y")
-                })
+        # Usamos fillna(0.0) para evitar errores si el campo viene vacío
+        alerta_clientes = [
+            {
+                "id": int(prestamo_id),
+                "nombre": cliente,
+                "capital": float(capital),  # Columna: Monto_Capital
+                "cuota": float(interes),    # Columna: Pago_Mensual_Interes
+                "dias": int(dias),
+                "fecha": fecha,
+                "vencimiento": vencimiento,
+                "socios": socios,
+            }
+            for prestamo_id, cliente, capital, interes, dias, fecha, vencimiento, socios in zip(
+                alertas['id'],
+                alertas['Cliente'],
+                pd.to_numeric(alertas['Monto_Capital'], errors="coerce").fillna(0.0),
+                pd.to_numeric(alertas['Pago_Mensual_Interes'], errors="coerce").fillna(0.0),
+                alertas['dias'],
+                alertas['Vencimiento'].dt.strftime("%d/%m/%Y"),
+                alertas['Vencimiento'].dt.strftime("%Y-%m-%d"),
+                [socios_del_prestamo(p) for p in alertas.to_dict("records")],
+            )
+        ]
+        print_log(
+            f"Alertas: {len(panorama['mora'])} en mora, {len(panorama['hoy'])} vencen hoy, "
+            f"{len(panorama['proximos'])} en los próximos {DIAS_ANTICIPACION} días "
+            f"(capital S/ {sum(c['capital'] for c in alerta_clientes):,.2f})."
+        )
 
         if alerta_clientes:
             print_log(f"Preparando envío de correo para {len(alerta_clientes)} deudores...")
-            enviar_correo(alerta_clientes)
+            enviar_correo(alerta_clientes, abrir_estado(supabase, hoy, alerta_clientes))
         else:
             print_log("✅ No hay clientes para notificar hoy.")
 
+        m = supabase.metricas.resumen()
+        print_log(f"Supabase: {m['consultas']} consultas, {m['reintentos']} reintentos, "
+                  f"latencia media {m['latencia_media_ms']} ms (máx. {m['latencia_max_ms']} ms).")
+
     except Exception as e:
         print_log(f"❌ ERROR CRÍTICO DURANTE LA EJECUCIÓN: {str(e)}")
 
-def enviar_correo(clientes):
+def enviar_correo(clientes, estado=None):
     try:
-        msg = MIMEMultipart()
-        msg['From'] = GMAIL_USER
-        msg['To'] = RECEPTOR
-        msg['Subject'] = f"🏦 REPORTE EJECUTIVO: {len(clientes)} Vencimientos Detectados"
-
-        filas = ""
-        # Ordenamos por urgencia (días)
-        for c in sorted(clientes, key=lambda x: x['dias']):
-            # Colores según estado
-            color_fondo = "#FDEDEC" if c['dias'] < 0 else "#FEF9E7" if c['dias'] == 0 else "#F4F6F7"
-            color_texto = "#C0392B" if c['dias'] < 0 else "#9A7D0A" if c['dias'] == 0 else "#2C3E50"
-            estado = f"MORA ({abs(c['dias'])} días)" if c['dias'] < 0 else "VENCE HOY" if c['dias'] == 0 else f"Faltan {c['dias']} días"
-            
-            filas += f"""
-            <tr style="background-color: {color_fondo};">
-                <td style="padding: 12px; border-bottom: 1px solid #ddd; font-weight: bold; color: #1C1C1C;">{c['nombre']}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #ddd; text-align: center; color: #1C1C1C;">S/ {c['capital']:,.2f}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #ddd; text-align: center; color: #1C1C1C;">S/ {c['cuota']:,.2f}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #ddd; text-align: center; color: #1C1C1C;">{c['fecha']}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #ddd; text-align: center; color: {color_texto}; font-weight: 900; text-transform: uppercase; font-size: 11px;">{estado}</td>
-            </tr>"""
-
-        html = f"""
-        <html>
-        <body style="margin: 0; padding: 0; background-color: #f4f4f4; font-family: 'Segoe UI', Arial, sans-serif;">
-            <table align="center" border="0" cellpadding="0" cellspacing="0" width="650" style="background-color: #ffffff; border-radius: 15px; overflow: hidden; margin-top: 40px; margin-bottom: 40px; box-shadow: 0 10px 30px rgba(0,0,0,0.1);">
-                <!-- HEADER LUXURY -->
-                <tr>
-                    <td align="center" style="background: linear-gradient(135deg, #1a1a1a 0%, #333333 100%); padding: 40px 20px; border-bottom: 4px solid #D4AF37;">
-                        <img src="https://cdn-icons-png.flaticon.com/512/2489/2489756.png" width="60" style="filter: drop-shadow(0 2px 4px rgba(0,0,0,0.5)); margin-bottom: 15px;">
-                        <h1 style="color: #D4AF37; margin: 0; text-transform: uppercase; letter-spacing: 4px; font-size: 24px; font-weight: 900;">Reporte de Cobranza</h1>
-                        <p style="color: #ffffff; margin-top: 5px; opacity: 0.8; font-size: 13px; text-transform: uppercase; letter-spacing: 2px;">Gestión de Activos & Créditos</p>
-                    </td>
-                </tr>
-                
-                <!-- CONTENT -->
-                <tr>
-                    <td style="padding: 30px;">
-                        <p style="color: #2C3E50; font-size: 16px; margin-bottom: 25px;">Estimado Administrador,<br><br>Se ha realizado un escaneo automático del sistema y se han detectado <b>{len(clientes)}</b> vencimientos que requieren atención inmediata:</p>
-                        
-                        <table width="100%" border="0" cellpadding="0" cellspacing="0" style="border-collapse: collapse;">
-                            <thead>
-                                <tr style="background-color: #1a1a1a;">
-                                    <th style="color: #D4AF37; padding: 12px; font-size: 12px; text-align: left; text-transform: uppercase;">Cliente</th>
-                                    <th style="color: #D4AF37; padding: 12px; font-size: 12px; text-align: center; text-transform: uppercase;">Capital</th>
-                                    <th style="color: #D4AF37; padding: 12px; font-size: 12px; text-align: center; text-transform: uppercase;">Cuota</th>
-                                    <th style="color: #D4AF37; padding: 12px; font-size: 12px; text-align: center; text-transform: uppercase;">Vence</th>
-                                    <th style="color: #D4AF37; padding: 12px; font-size: 12px; text-align: center; text-transform: uppercase;">Estado</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {filas}
-                            </tbody>
-                        </table>
-                        
-                        <div style="margin-top: 30px; padding: 20px; background-color: #FDFEFE; border: 1px dashed #D4AF37; border-radius: 10px; text-align: center;">
-                            <p style="color: #2C3E50; font-size: 14px; margin: 0;">Para gestionar estos pagos, acceda al portal administrativo:</p>
-                            <p style="margin-top: 15px;">
-                                <a href="https://sistemadeprestamos200196110623-tehmek4ykvshbumtmyzcjx.streamlit.app/" style="background: linear-gradient(90deg, #D4AF37 0%, #B8860B 100%); color: #ffffff; text-decoration: none; padding: 12px 30px; border-radius: 8px; font-weight: bold; text-transform: uppercase; font-size: 13px; display: inline-block; box-shadow: 0 4px 15px rgba(212,175,55,0.3);">Abrir Sistema Financiero</a>
-                            </p>
-                        </div>
-                    </td>
-                </tr>
-                
-                <!-- FOOTER -->
-                <tr>
-                    <td align="center" style="padding: 20px; background-color: #f9f9f9; border-top: 1px solid #eee;">
-                        <p style="color: #999; font-size: 11px; margin: 0;">ESTE ES UN MENSAJE AUTOMÁTICO GENERADO POR<br><b>ANDRE VALQUI SYSTEM v2.0 | ENCRIPTACIÓN DE GRADO BANCARIO</b></p>
-                        <p style="color: #999; font-size: 10px; margin-top: 5px;">© {datetime.now().year} Todos los derechos reservados.</p>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        # Reporte completo para RECEPTOR y un resumen por cada socio o cobrador con solo sus clientes
+        destinatarios = ([{"correo": RECEPTOR, "saludo": "Estimado Administrador"}] if RECEPTOR else []) + DESTINATARIOS
+        omitidas = []
+        
+        def pendientes(destinatario, alertas):
+            if estado is None:
+                return alertas
+            nuevas = estado.pendientes(destinatario["correo"], alertas, destinatario.get("modo", MODO_AVISO))
+            omitidas.append(len(alertas) - len(nuevas))
+            return nuevas
         
-        msg.attach(MIMEText(html, 'html'))
+        def registrar(msg):
+            try:
+                estado.registrar(msg['To'], msg.alertas)
+            except Exception as e:
+                print_log(f"⚠️ Enviado a {msg['To']} pero no se pudo registrar: {str(e)}")
+        
+        mensajes = mensajes_por_destinatario(clientes, GMAIL_USER, destinatarios, MAX_FILAS_CORREO, MODO_CORREO_GRANDE, pendientes)
+        if sum(omitidas):
+            print_log(f"Se omiten {sum(omitidas)} alertas ya avisadas.")
+        if not mensajes:
+            print_log("✅ No hay alertas nuevas para enviar.")
+            return
         
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(GMAIL_USER, GMAIL_PASS)
-            server.send_message(msg)
-        print_log("✅ ¡Correo Ejecutivo enviado con éxito!")
+        enviador = EnviadorSMTP(
+            GMAIL_USER, GMAIL_PASS, SMTP_SERVIDOR, SMTP_PUERTO, tls=SMTP_TLS,
+            conexiones=SMTP_CONEXIONES, por_minuto=SMTP_POR_MINUTO,
+        )
+        fallidos = enviador.enviar(mensajes, al_enviar=registrar if estado is not None else None)
+        print_log(f"{'⚠️' if fallidos else '✅'} ¡Correo Ejecutivo enviado! ({len(mensajes) - len(fallidos)} de {len(mensajes)} mensaje(s), "
+                  f"{enviador.sesiones} sesión(es) SMTP, {enviador.reintentados} reintento(s))")
+        for msg, error in fallidos:
+            print_log(f"❌ No se pudo enviar a {msg['To']} ({msg['Subject']}): {error}")
         
     except Exception as e:
         print_log(f"❌ Error al enviar el correo: {str(e)}")
@@ -0,0 +1,79 @@
+"""
+Recálculo completo de las ganancias por socio (conciliación de sql/006_ganancias_socios.sql).
+
+Reconstruye 'ganancias_socios' desde el libro 'pagos' con la RPC recalcular_ganancias_socios
+y la compara, socio por socio, con la suma de pagos.reparto leída por lotes.
+  --repartir        además vuelve a repartir todos los cobros con la distribución actual
+                    de cada préstamo (los ya registrados conservan la de su momento)
+  --solo-verificar  no reconstruye nada: solo compara y termina con código 1 si hay diferencias
+
+Uso: SUPABASE_URL=... SUPABASE_KEY=... python recalcular_ganancias.py [--repartir | --solo-verificar]
+"""
+import argparse
+import os
+import sys
+from backfill_pagos import leer_por_lotes, print_log
+from conexion import obtener_cliente
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+TOLERANCIA = 0.01  # redondeo a céntimos de cada reparto
+
+
+def totales_desde_pagos(supabase):
+    """{socio: monto} sumando pagos.reparto de todo el libro."""
+    totales = {}
+    for pago in leer_por_lotes(supabase, "pagos", "id,reparto"):
+        for socio, monto in (pago.get("reparto") or {}).items():
+            totales[socio] = totales.get(socio, 0.0) + float(monto)
+    return totales
+
+
+def totales_materializados(supabase):
+    """{socio: monto} sumando los meses de ganancias_socios (unas pocas filas por socio)."""
+    totales = {}
+    for fila in supabase.table("ganancias_socios").select("socio,monto").execute().data:
+        totales[fila["socio"]] = totales.get(fila["socio"], 0.0) + float(fila["monto"])
+    return totales
+
+
+def comparar(materializados, libro):
+    diferencias = []
+    for socio in sorted(set(materializados) | set(libro)):
+        esperado, actual = libro.get(socio, 0.0), materializados.get(socio, 0.0)
+        marca = "✅" if abs(esperado - actual) <= TOLERANCIA else "❌"
+        print_log(f"{marca} {socio:<25} ganancias_socios S/ {actual:>14,.2f}   pagos.reparto S/ {esperado:>14,.2f}")
+        if marca == "❌":
+            diferencias.append(socio)
+    return diferencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--repartir", action="store_true")
+    grupo.add_argument("--solo-verificar", action="store_true")
+    args = parser.parse_args()
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print_log("❌ ERROR: Faltan las credenciales de Supabase.")
+        return 1
+
+    supabase = obtener_cliente(SUPABASE_URL, SUPABASE_KEY, ligero=True)
+
+    if not args.solo_verificar:
+        print_log("Reconstruyendo ganancias_socios desde 'pagos'...")
+        for fila in supabase.rpc("recalcular_ganancias_socios", {"p_repartir": args.repartir}).execute().data:
+            print_log(f"   {fila['socio_total']:<25} S/ {float(fila['monto_total']):>14,.2f} ({fila['pagos_total']} cobros)")
+
+    diferencias = comparar(totales_materializados(supabase), totales_desde_pagos(supabase))
+    if diferencias:
+        print_log(f"❌ {len(diferencias)} socio(s) no cuadran: ejecute sin --solo-verificar para reconstruir.")
+        return 1
+    print_log("✅ Los totales por socio cuadran con el libro de pagos.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Armado del correo de vencimientos de notifier.py.
+
+Las plantillas (string.Template) se compilan una vez al importar el módulo y las filas
+se unen con join, así el costo crece de forma lineal con la cantidad de alertas.
+Para que un correo no crezca sin límite, por encima de MAX_FILAS_CORREO:
+  - modo "csv":      un solo correo con las filas más urgentes y la lista completa adjunta en CSV
+  - modo "dividir":  varios correos ("parte 1 de N") de hasta MAX_FILAS_CORREO filas cada uno
+Todos incluyen el resumen por tramo (mora / vence hoy / próximos) de la lista completa.
+
+Cada alerta es un dict con id, nombre, capital, cuota, dias, fecha ('dd/mm/aaaa'), vencimiento ('aaaa-mm-dd') y socios
+(los que participan del interés). Además del reporte completo, filtrar_destinatario() arma
+el resumen de cada socio o cobrador con solo sus clientes.
+"""
+import csv
+import html
+import io
+from datetime import datetime
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from string import Template
+
+MAX_FILAS_CORREO = 200
+MODOS = ("csv", "dividir")
+URL_SISTEMA = "https://sistemadeprestamos200196110623-tehmek4ykvshbumtmyzcjx.streamlit.app/"
+
+# (fondo, texto) de cada tramo
+COLORES_TRAMO = {
+    "mora": ("#FDEDEC", "#C0392B"),
+    "hoy": ("#FEF9E7", "#9A7D0A"),
+    "proximos": ("#F4F6F7", "#2C3E50"),
+}
+NOMBRES_TRAMO = {"mora": "En mora", "hoy": "Vencen hoy", "proximos": "Próximos"}
+
+_CELDA = "padding: 12px; border-bottom: 1px solid #ddd;"
+_CABECERA = "color: #D4AF37; padding: 12px; font-size: 12px; text-transform: uppercase;"
+
+PLANTILLA_FILA = Template(f"""
+            <tr style="background-color: $fondo;">
+                <td style="{_CELDA} font-weight: bold; color: #1C1C1C;">$nombre</td>
+                <td style="{_CELDA} text-align: center; color: #1C1C1C;">S/ $capital</td>
+                <td style="{_CELDA} text-align: center; color: #1C1C1C;">S/ $cuota</td>
+                <td style="{_CELDA} text-align: center; color: #1C1C1C;">$fecha</td>
+                <td style="{_CELDA} text-align: center; color: $color; font-weight: 900; text-transform: uppercase; font-size: 11px;">$estado</td>
+            </tr>""")
+
+PLANTILLA_TRAMO = Template(f"""
+                                <tr style="background-color: $fondo;">
+                                    <td style="padding: 8px 12px; color: $color; font-weight: bold;">$tramo</td>
+                                    <td style="padding: 8px 12px; text-align: center; color: #1C1C1C;">$cantidad</td>
+                                    <td style="padding: 8px 12px; text-align: center; color: #1C1C1C;">S/ $capital</td>
+                                    <td style="padding: 8px 12px; text-align: center; color: #1C1C1C;">S/ $cuota</td>
+                                </tr>""")
+
+PLANTILLA_CORREO = Template(f"""
+        <html>
+        <body style="margin: 0; padding: 0; background-color: #f4f4f4; font-family: 'Segoe UI', Arial, sans-serif;">
+            <table align="center" border="0" cellpadding="0" cellspacing="0" width="650" style="background-color: #ffffff; border-radius: 15px; overflow: hidden; margin-top: 40px; margin-bottom: 40px; box-shadow: 0 10px 30px rgba(0,0,0,0.1);">
+                <!-- HEADER LUXURY -->
+                <tr>
+                    <td align="center" style="background: linear-gradient(135deg, #1a1a1a 0%, #333333 100%); padding: 40px 20px; border-bottom: 4px solid #D4AF37;">
+                        <img src="https://cdn-icons-png.flaticon.com/512/2489/2489756.png" width="60" style="filter: drop-shadow(0 2px 4px rgba(0,0,0,0.5)); margin-bottom: 15px;">
+                        <h1 style="color: #D4AF37; margin: 0; text-transform: uppercase; letter-spacing: 4px; font-size: 24px; font-weight: 900;">Reporte de Cobranza</h1>
+                        <p style="color: #ffffff; margin-top: 5px; opacity: 0.8; font-size: 13px; text-transform: uppercase; letter-spacing: 2px;">Gestión de Activos & Créditos</p>
+                    </td>
+                </tr>
+
+                <!-- CONTENT -->
+                <tr>
+                    <td style="padding: 30px;">
+                        <p style="color: #2C3E50; font-size: 16px; margin-bottom: 25px;">$saludo,<br><br>Se ha realizado un escaneo automático del sistema y se han detectado <b>$total</b> vencimientos que requieren atención inmediata:</p>
+
+                        <!-- RESUMEN POR TRAMO -->
+                        <table width="100%" border="0" cellpadding="0" cellspacing="0" style="border-collapse: collapse; margin-bottom: 25px;">
+                            <thead>
+                                <tr style="background-color: #1a1a1a;">
+                                    <th style="{_CABECERA} text-align: left;">Tramo</th>
+                                    <th style="{_CABECERA} text-align: center;">Préstamos</th>
+                                    <th style="{_CABECERA} text-align: center;">Capital</th>
+                                    <th style="{_CABECERA} text-align: center;">Cuota</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                $resumen
+                            </tbody>
+                        </table>
+
+                        <p style="color: #2C3E50; font-size: 14px; margin-bottom: 15px;">$detalle</p>
+                        <table width="100%" border="0" cellpadding="0" cellspacing="0" style="border-collapse: collapse;">
+                            <thead>
+                                <tr style="background-color: #1a1a1a;">
+                                    <th style="{_CABECERA} text-align: left;">Cliente</th>
+                                    <th style="{_CABECERA} text-align: center;">Capital</th>
+                                    <th style="{_CABECERA} text-align: center;">Cuota</th>
+                                    <th style="{_CABECERA} text-align: center;">Vence</th>
+                                    <th style="{_CABECERA} text-align: center;">Estado</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                $filas
+                            </tbody>
+                        </table>
+
+                        <div style="margin-top: 30px; padding: 20px; background-color: #FDFEFE; border: 1px dashed #D4AF37; border-radius: 10px; text-align: center;">
+                            <p style="color: #2C3E50; font-size: 14px; margin: 0;">Para gestionar estos pagos, acceda al portal administrativo:</p>
+                            <p style="margin-top: 15px;">
+                                <a href="{URL_SISTEMA}" style="background: linear-gradient(90deg, #D4AF37 0%, #B8860B 100%); color: #ffffff; text-decoration: none; padding: 12px 30px; border-radius: 8px; font-weight: bold; text-transform: uppercase; font-size: 13px; display: inline-block; box-shadow: 0 4px 15px rgba(212,175,55,0.3);">Abrir Sistema Financiero</a>
+                            </p>
+                        </div>
+                    </td>
+                </tr>
+
+                <!-- FOOTER -->
+                <tr>
+                    <td align="center" style="padding: 20px; background-color: #f9f9f9; border-top: 1px solid #eee;">
+                        <p style="color: #999; font-size: 11px; margin: 0;">ESTE ES UN MENSAJE AUTOMÁTICO GENERADO POR<br><b>ANDRE VALQUI SYSTEM v2.0 | ENCRIPTACIÓN DE GRADO BANCARIO</b></p>
+                        <p style="color: #999; font-size: 10px; margin-top: 5px;">© $anio Todos los derechos reservados.</p>
+                    </td>
+                </tr>
+            </table>
+        </body>
+        </html>
+        """)
+
+
+def tramo(dias):
+    return "mora" if dias < 0 else "hoy" if dias == 0 else "proximos"
+
+
+def texto_estado(dias):
+    return f"MORA ({abs(dias)} días)" if dias < 0 else "VENCE HOY" if dias == 0 else f"Faltan {dias} días"
+
+
+def resumen_por_tramo(clientes):
+    """{tramo: {'cantidad', 'capital', 'cuota'}} de la lista completa, en el orden mora / hoy / próximos."""
+    resumen = {t: {"cantidad": 0, "capital": 0.0, "cuota": 0.0} for t in COLORES_TRAMO}
+    for c in clientes:
+        grupo = resumen[tramo(c["dias"])]
+        grupo["cantidad"] += 1
+        grupo["capital"] += c["capital"]
+        grupo["cuota"] += c["cuota"]
+    return resumen
+
+
+def render_resumen(resumen):
+    return "".join(
+        PLANTILLA_TRAMO.substitute(
+            fondo=COLORES_TRAMO[t][0], color=COLORES_TRAMO[t][1], tramo=NOMBRES_TRAMO[t],
+            cantidad=r["cantidad"], capital=f"{r['capital']:,.2f}", cuota=f"{r['cuota']:,.2f}",
+        )
+        for t, r in resumen.items()
+    )
+
+
+def render_filas(clientes):
+    filas = []
+    for c in clientes:
+        fondo, color = COLORES_TRAMO[tramo(c["dias"])]
+        filas.append(PLANTILLA_FILA.substitute(
+            fondo=fondo, color=color, nombre=html.escape(str(c["nombre"])),
+            capital=f"{c['capital']:,.2f}", cuota=f"{c['cuota']:,.2f}",
+            fecha=c["fecha"], estado=texto_estado(c["dias"]),
+        ))
+    return "".join(filas)
+
+
+def render_html(clientes, resumen, total, detalle="", saludo="Estimado Administrador"):
+    return PLANTILLA_CORREO.substitute(
+        saludo=html.escape(saludo), total=total, resumen=render_resumen(resumen),
+        detalle=detalle, filas=render_filas(clientes), anio=datetime.now().year,
+    )
+
+
+def csv_alertas(clientes):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(["Cliente", "Capital", "Cuota", "Vence", "Dias", "Estado"])
+    for c in clientes:
+        escritor.writerow([c["nombre"], f"{c['capital']:.2f}", f"{c['cuota']:.2f}", c["fecha"], c["dias"], texto_estado(c["dias"])])
+    # utf-8-sig (con BOM) para que Excel reconozca las tildes
+    return salida.getvalue().encode("utf-8-sig")
+
+
+def _mensaje(remitente, destinatario, asunto, cuerpo_html, adjunto=None):
+    msg = MIMEMultipart()
+    msg['From'] = remitente
+    msg['To'] = destinatario
+    msg['Subject'] = asunto
+    msg.attach(MIMEText(cuerpo_html, 'html'))
+    if adjunto:
+        nombre, contenido = adjunto
+        parte = MIMEApplication(contenido, Name=nombre)
+        parte['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        msg.attach(parte)
+    return msg
+
+
+def construir_mensajes(clientes, remitente, destinatario, max_filas=MAX_FILAS_CORREO, modo="csv", saludo="Estimado Administrador"):
+    """
+    Lista de mensajes listos para enviar, con las alertas ordenadas por urgencia.
+    Cada mensaje lleva en .alertas las que cubre (todas en modo "csv"), para registrarlas al enviarlo.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de correo desconocido: {modo!r} (use {' o '.join(MODOS)})")
+    clientes = sorted(clientes, key=lambda c: c["dias"])
+    total = len(clientes)
+    resumen = resumen_por_tramo(clientes)
+    asunto = f"🏦 REPORTE EJECUTIVO: {total} Vencimientos Detectados"
+
+    if total <= max_filas:
+        msg = _mensaje(remitente, destinatario, asunto, render_html(clientes, resumen, total, saludo=saludo))
+        msg.alertas = clientes
+        return [msg]
+
+    if modo == "csv":
+        detalle = f"Se muestran los {max_filas} más urgentes; la lista completa va adjunta en CSV."
+        cuerpo = render_html(clientes[:max_filas], resumen, total, detalle, saludo)
+        adjunto = (f"vencimientos_{datetime.now():%Y%m%d}.csv", csv_alertas(clientes))
+        msg = _mensaje(remitente, destinatario, asunto, cuerpo, adjunto)
+        msg.alertas = clientes
+        return [msg]
+
+    partes = [clientes[i:i + max_filas] for i in range(0, total, max_filas)]
+    mensajes = []
+    for n, parte in enumerate(partes, start=1):
+        detalle = f"Parte {n} de {len(partes)}: vencimientos {(n - 1) * max_filas + 1} a {(n - 1) * max_filas + len(parte)}."
+        cuerpo = render_html(parte, resumen, total, detalle, saludo)
+        msg = _mensaje(remitente, destinatario, f"{asunto} ({n}/{len(partes)})", cuerpo)
+        msg.alertas = parte
+        mensajes.append(msg)
+    return mensajes
+
+
+def filtrar_destinatario(clientes, destinatario):
+    """
+    Alertas que le tocan a un destinatario de DESTINATARIOS:
+      {"correo": ..., "socio": "Bruno Tapia"}          -> préstamos donde ese socio tiene participación
+      {"correo": ..., "clientes": [12, "Rosa Peña 7"]} -> cartera de un cobrador, por id o nombre
+      {"correo": ...}                                  -> todas
+    """
+    if destinatario.get("socio"):
+        return [c for c in clientes if destinatario["socio"] in c.get("socios", ())]
+    if "clientes" in destinatario:
+        asignados = {str(x) for x in destinatario["clientes"]}
+        return [c for c in clientes if str(c.get("id")) in asignados or c["nombre"] in asignados]
+    return list(clientes)
+
+
+def mensajes_por_destinatario(clientes, remitente, destinatarios, max_filas=MAX_FILAS_CORREO, modo="csv", pendientes=None):
+    """
+    Mensajes de todos los destinatarios con al menos una alerta, en el orden de la lista.
+    pendientes(destinatario, alertas) puede descartar las ya avisadas (ver estado_avisos.py).
+    """
+    mensajes = []
+    for destinatario in destinatarios:
+        propios = filtrar_destinatario(clientes, destinatario)
+        if pendientes is not None:
+            propios = pendientes(destinatario, propios)
+        if propios:
+            nombre = destinatario.get("nombre") or destinatario.get("socio") or destinatario["correo"]
+            saludo = destinatario.get("saludo") or f"Estimado(a) {nombre}"
+            mensajes += construir_mensajes(propios, remitente, destinatario["correo"], max_filas, modo, saludo)
+    return mensajes
@@ -0,0 +1 @@
+"""Sustitutos locales de los servicios externos (Supabase, SMTP) para pruebas de carga y benchmarks."""
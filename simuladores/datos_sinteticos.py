@@ -0,0 +1,181 @@
+"""
+Datos sintéticos con la forma de las tablas reales de Supabase.
+
+- prestamos: activos y pagados, tasas y capitales habituales, vencimientos alrededor de
+  hoy (en mora, algunos hace meses, hoy y a futuro), clientes que vuelven a pedir (mismo
+  nombre y DNI en varios préstamos) y 'Distribucion_Socios' entre dos o tres socios o el
+  antiguo 'Porc_Socio1'.
+- auditoria: todas las operaciones de OPERACIONES_AUDITORIA de app.py con el texto exacto que
+  escribe registrar_auditoria() ("Pago Recibido: Interés S/ X, Capital S/ Y", también el de la
+  carga masiva), del más antiguo al más reciente.
+- pagos: el libro tipado correspondiente a cada COBRO (ver sql/002_pagos.sql).
+
+Con la misma semilla se obtienen siempre los mismos datos. generar_auditoria() es un
+generador para poder recorrer millones de filas sin tenerlas todas en memoria.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+
+SOCIOS = ("Bruno Tapia", "Piera Juarez", "Carla Mendoza")  # el tercero solo aparece en algunos repartos
+USUARIOS = ("BRUNOTAPIA", "PIERAJUAREZ", "ADMIN")
+NOMBRES = ("Juan", "María", "José", "Rosa", "Luis", "Ana", "Carlos", "Lucía", "Jorge", "Carmen", "Ñuflo", "Andrés")
+APELLIDOS = ("Quispe", "Flores", "Sánchez", "Rodríguez", "García", "Huamán", "Chávez", "Ramírez", "Torres", "Peña")
+CAPITALES = (300, 500, 800, 1000, 1500, 2000, 3000, 5000)
+TASAS = (10.0, 15.0, 18.0, 20.0)
+ZONA_PERU = timezone(timedelta(hours=-5))
+
+
+def _marca(momento):
+    return momento.astimezone(timezone.utc).isoformat()
+
+
+def generar_prestamos(cantidad, hoy=None, semilla=1, proporcion_recurrentes=0.1):
+    """
+    Lista de préstamos con ids 1..cantidad; uno de cada cuatro ya está 'Pagado'.
+    Una `proporcion_recurrentes` de ellos es de un cliente anterior (mismo nombre, DNI y teléfono).
+    """
+    azar = random.Random(semilla)
+    hoy = hoy or date.today()
+    prestamos = []
+    for i in range(1, cantidad + 1):
+        capital = float(azar.choice(CAPITALES))
+        tasa = azar.choice(TASAS)
+        otorgado = hoy - timedelta(days=azar.randint(30, 720))
+        pagado = azar.random() < 0.25
+        # La mayoría vence en torno a hoy; unos pocos arrastran meses de mora
+        dias = azar.randint(-20, 40) if azar.random() < 0.95 else azar.randint(-180, -21)
+        if prestamos and azar.random() < proporcion_recurrentes:
+            anterior = azar.choice(prestamos)
+            cliente, dni, telefono = anterior["Cliente"], anterior["DNI"], anterior["Telefono"]
+        else:
+            cliente = f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {i}"
+            dni, telefono = str(40000000 + i), f"9{azar.randint(10000000, 99999999)}"
+        prestamo = {
+            "id": i,
+            "Cliente": cliente,
+            "DNI": dni,
+            "Telefono": telefono,
+            "Fecha_Prestamo": otorgado.isoformat(),
+            "Fecha_Proximo_Pago": (hoy + timedelta(days=dias)).isoformat(),
+            "Monto_Capital": capital,
+            "Tasa_Interes": tasa,
+            "Pago_Mensual_Interes": round(capital * tasa / 100, 2),
+            "Estado": "Pagado" if pagado else "Activo",
+            "Observaciones": azar.choice(("", "Cliente puntual", "Renovación", "Pide ampliación")),
+            "Fecha_Finalizacion": (hoy - timedelta(days=azar.randint(0, 60))).isoformat() if pagado else None,
+            "Distribucion_Socios": None,
+            "Porc_Socio1": None,
+            # Última modificación en el último mes: cada una distinta, para que la réplica
+            # por diferencias (sincronizacion.py) no vuelva a leer toda la tabla
+            "updated_at": _marca(datetime.combine(hoy, datetime.min.time(), ZONA_PERU)
+                                 - timedelta(days=azar.randint(1, 30), seconds=azar.randint(0, 86399))),
+        }
+        forma = azar.random()
+        if forma < 0.6:
+            socio1 = min(10.0, tasa)
+            prestamo["Distribucion_Socios"] = {SOCIOS[0]: socio1, SOCIOS[1]: tasa - socio1}
+        elif forma < 0.7:
+            socio1, socio2 = min(8.0, tasa), min(5.0, tasa - min(8.0, tasa))
+            prestamo["Distribucion_Socios"] = {SOCIOS[0]: socio1, SOCIOS[1]: socio2, SOCIOS[2]: tasa - socio1 - socio2}
+        elif forma < 0.85:
+            prestamo["Porc_Socio1"] = min(10.0, tasa)
+        prestamos.append(prestamo)
+    return prestamos
+
+
+def generar_auditoria(cantidad, prestamos, desde=None, semilla=2, proporcion_cobros=0.4):
+    """
+    Genera `cantidad` registros de auditoría (ids 1..cantidad) en orden cronológico.
+    Cada COBRO trae en la clave auxiliar '_pago' los montos y el id del préstamo,
+    para que generar_tablas() arme el libro 'pagos' sin volver a parsear el texto.
+    """
+    azar = random.Random(semilla)
+    momento = desde or datetime.now(ZONA_PERU) - timedelta(days=365)
+    paso = timedelta(days=365) / max(cantidad, 1)
+    for i in range(1, cantidad + 1):
+        momento += paso
+        usuario = azar.choice(USUARIOS)
+        prestamo = azar.choice(prestamos)
+        tipo = azar.random()
+        registro = {
+            "id": i,
+            "Fecha/Hora": momento.strftime("%Y-%m-%d %H:%M:%S"),
+            "Usuario": usuario,
+            "Perfil": "Admin",
+            "Cliente Afectado": "-",
+            "updated_at": _marca(momento),
+        }
+        if tipo < proporcion_cobros:
+            interes = prestamo["Pago_Mensual_Interes"] if azar.random() < 0.8 else round(prestamo["Pago_Mensual_Interes"] / 2, 2)
+            capital = float(azar.choice((0, 0, 0, 50, 100, 200)))
+            origen = " (carga masiva)" if azar.random() < 0.1 else ""
+            registro.update({
+                "Operación": "COBRO",
+                "Cliente Afectado": prestamo["Cliente"],
+                "Detalle del Movimiento": f"Pago Recibido{origen}: Interés S/ {interes}, Capital S/ {capital}",
+                "_pago": (prestamo["id"], interes, capital),
+            })
+        elif tipo < proporcion_cobros + 0.02:
+            cuota = prestamo["Pago_Mensual_Interes"]
+            previos = f"Interés S/ {cuota}, Capital S/ 0.0"
+            if azar.random() < 0.5:
+                registro.update({
+                    "Operación": "CORRECCIÓN COBRO",
+                    "Detalle del Movimiento": f"Se editó un cobro antiguo de {prestamo['Cliente']}: {previos} -> "
+                                              f"Interés S/ {round(cuota / 2, 2)}, Capital S/ 0.0",
+                })
+            else:
+                registro.update({
+                    "Operación": "ANULACIÓN COBRO",
+                    "Detalle del Movimiento": f"Se eliminó registro de cobro: {previos}",
+                })
+            registro["Cliente Afectado"] = prestamo["Cliente"]
+        elif tipo < proporcion_cobros + 0.1:
+            registro.update({
+                "Operación": "CREACIÓN CRÉDITO",
+                "Cliente Afectado": prestamo["Cliente"],
+                "Detalle del Movimiento": f"Préstamo de S/ {prestamo['Monto_Capital']}",
+            })
+        elif tipo < proporcion_cobros + 0.15:
+            operacion, detalle = azar.choice((
+                ("EDICIÓN MANUAL", "Ajuste de datos"),
+                ("EDICIÓN MANUAL", "Ajuste de datos"),
+                ("REPARTICIÓN SOCIOS", "Ajuste de porcentajes de interés"),
+                ("ELIMINACIÓN DEFINITIVA", f"BORRADO DE REGISTRO: Se eliminó préstamo de S/ {prestamo['Monto_Capital']:,.2f}."),
+            ))
+            registro.update({
+                "Operación": operacion,
+                "Cliente Afectado": prestamo["Cliente"],
+                "Detalle del Movimiento": detalle,
+            })
+        else:
+            operacion = azar.choice(("INICIO DE SESIÓN", "CIERRE DE SESIÓN"))
+            registro.update({
+                "Operación": operacion,
+                "Detalle del Movimiento": "Acceso exitoso al portal" if operacion == "INICIO DE SESIÓN"
+                else f"El usuario {usuario.lower()} cerró su sesión",
+            })
+        yield registro
+
+
+def generar_tablas(prestamos=500, auditoria=5000, hoy=None, semilla=1):
+    """Dict {tabla: filas} con prestamos, auditoria, pagos y eliminados listo para BaseMemoria."""
+    filas_prestamos = generar_prestamos(prestamos, hoy, semilla)
+    filas_auditoria, filas_pagos = [], []
+    for registro in generar_auditoria(auditoria, filas_prestamos, semilla=semilla + 1):
+        pago = registro.pop("_pago", None)
+        filas_auditoria.append(registro)
+        if pago:
+            prestamo_id, interes, capital = pago
+            filas_pagos.append({
+                "id": len(filas_pagos) + 1,
+                "Prestamo_Id": prestamo_id,
+                "Cliente": registro["Cliente Afectado"],
+                "Interes_Pagado": interes,
+                "Capital_Pagado": capital,
+                "Fecha_Pago": datetime.strptime(registro["Fecha/Hora"], "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%dT%H:%M:%S-05:00"),
+                "Usuario": registro["Usuario"],
+                "Auditoria_Id": registro["id"],
+                "updated_at": registro["updated_at"],
+            })
+    return {"prestamos": filas_prestamos, "auditoria": filas_auditoria, "pagos": filas_pagos, "eliminados": []}
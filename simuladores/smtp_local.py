@@ -0,0 +1,137 @@
+"""
+Servidor SMTP local (sin TLS) para probar el envío del notifier sin Gmail.
+
+Habla lo justo del protocolo para smtplib: EHLO/HELO, AUTH PLAIN/LOGIN (acepta cualquier
+clave), MAIL, RCPT, DATA, RSET, NOOP y QUIT. Cada conexión se atiende en su propio hilo.
+Para que las mediciones se parezcan a un servidor real se puede simular:
+  latencia_conexion -> espera antes del saludo (TCP + TLS + login de un servidor remoto)
+  latencia_mensaje  -> espera al cerrar cada DATA
+  fallar_cada       -> cada N mensajes responde 421 y corta la conexión (error temporal)
+
+    with ServidorSMTPLocal(latencia_mensaje=0.05) as servidor:
+        EnviadorSMTP(None, None, "127.0.0.1", servidor.puerto, tls=False).enviar(mensajes)
+        servidor.recibidos  # [(remitente, [destinatarios], bytes)]
+"""
+import base64
+import socketserver
+import threading
+import time
+
+
+class _Sesion(socketserver.StreamRequestHandler):
+
+    def responder(self, linea):
+        self.wfile.write(linea.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        servidor = self.server.simulador
+        servidor._contar("conexiones")
+        time.sleep(servidor.latencia_conexion)
+        self.responder("220 smtp-local listo")
+        remitente, destinatarios = None, []
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando, _, argumento = linea.decode("utf-8", "replace").strip().partition(" ")
+            comando = comando.upper()
+            if comando == "EHLO":
+                self.responder("250-smtp-local")
+                self.responder("250-8BITMIME")
+                self.responder("250 AUTH PLAIN LOGIN")
+            elif comando == "HELO":
+                self.responder("250 smtp-local")
+            elif comando == "AUTH":
+                if argumento.upper().startswith("LOGIN"):
+                    self.responder("334 " + base64.b64encode(b"Username:").decode())
+                    self.rfile.readline()
+                    self.responder("334 " + base64.b64encode(b"Password:").decode())
+                    self.rfile.readline()
+                servidor._contar("autenticaciones")
+                self.responder("235 autenticado")
+            elif comando == "MAIL":
+                remitente, destinatarios = argumento.partition(":")[2].strip("<> "), []
+                self.responder("250 OK")
+            elif comando == "RCPT":
+                destinatarios.append(argumento.partition(":")[2].strip("<> "))
+                self.responder("250 OK")
+            elif comando == "DATA":
+                self.responder("354 termine con <CRLF>.<CRLF>")
+                lineas = []
+                while True:
+                    dato = self.rfile.readline()
+                    if not dato or dato in (b".\r\n", b".\n"):
+                        break
+                    lineas.append(dato[1:] if dato.startswith(b"..") else dato)
+                time.sleep(servidor.latencia_mensaje)
+                if servidor._debe_fallar():
+                    self.responder("421 servicio no disponible, intente mas tarde")
+                    return
+                servidor._guardar(remitente, destinatarios, b"".join(lineas))
+                remitente, destinatarios = None, []
+                self.responder("250 OK en cola")
+            elif comando == "RSET":
+                remitente, destinatarios = None, []
+                self.responder("250 OK")
+            elif comando == "NOOP":
+                self.responder("250 OK")
+            elif comando == "QUIT":
+                self.responder("221 hasta luego")
+                return
+            else:
+                self.responder("502 comando no implementado")
+
+
+class _ServidorTCP(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPLocal:
+    """Servidor en un hilo de fondo; puerto=0 elige uno libre (ver .puerto)."""
+
+    def __init__(self, host="127.0.0.1", puerto=0, latencia_conexion=0.0, latencia_mensaje=0.0, fallar_cada=0):
+        self.latencia_conexion = latencia_conexion
+        self.latencia_mensaje = latencia_mensaje
+        self.fallar_cada = fallar_cada
+        self.recibidos = []
+        self.conexiones = 0
+        self.autenticaciones = 0
+        self.rechazos = 0
+        self._mensajes_vistos = 0
+        self._lock = threading.Lock()
+        self._tcp = _ServidorTCP((host, puerto), _Sesion)
+        self._tcp.simulador = self
+        self.host, self.puerto = self._tcp.server_address
+        self._hilo = None
+
+    def _contar(self, contador):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def _debe_fallar(self):
+        with self._lock:
+            self._mensajes_vistos += 1
+            if self.fallar_cada and self._mensajes_vistos % self.fallar_cada == 0:
+                self.rechazos += 1
+                return True
+            return False
+
+    def _guardar(self, remitente, destinatarios, contenido):
+        with self._lock:
+            self.recibidos.append((remitente, destinatarios, contenido))
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *error):
+        self.detener()
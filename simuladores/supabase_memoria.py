@@ -0,0 +1,490 @@
+"""
+Supabase en memoria: imita el constructor de consultas de postgrest que usa la app
+(select / filtros / order / limit / insert / upsert / update / delete / rpc) sobre
+listas de diccionarios, sin red.
+
+Mantiene 'updated_at' y escribe lápidas en 'eliminados' como los triggers de
+sql/001_sincronizacion_delta.sql, así la réplica de sincronizacion.py funciona igual, y
+calcula las columnas generadas de las migraciones (auditoria.texto_busqueda, sql/003).
+También reproduce los triggers de sql/006 (pagos.reparto y ganancias_socios) y las RPC
+recalcular_ganancias_socios, registrar_cobro (sql/007), guardar_foto_cartera (sql/009) y registrar_cobros (sql/010), y las vistas de solo lectura de
+VISTAS (resumen_cartera, sql/008). Otras funciones RPC se registran con BaseMemoria.registrar_rpc(nombre, funcion).
+tests/test_cobros_memoria.py fija el contrato de los cobros y del reparto: si cambia el SQL, cambia aquí.
+
+Uso:
+    base = BaseMemoria({"prestamos": [...], "auditoria": [...]})
+    cliente = ClienteMemoria(base)   # se puede envolver en conexion.ClienteSupabase
+"""
+import itertools
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from cartera import fechas_de_pago, foto_cartera, reparto_pago
+
+
+class ErrorCobro(Exception):
+    """Rechazo de una RPC de cobro; code (el SQLSTATE de la función) y message como postgrest.APIError."""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.message, self.code = message, code
+
+
+def _ahora():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _patron_like(patron):
+    """Convierte un patrón LIKE de PostgREST en regex sin distinguir mayúsculas.
+    '%' y '*' son comodines, '_' un carácter, y la barra invertida escapa al siguiente."""
+    regex = []
+    for escapado, comodin in re.findall(r"\\(.)|(.)", patron, re.DOTALL):
+        if escapado:
+            regex.append(re.escape(escapado))
+        elif comodin in "%*":
+            regex.append(".*")
+        elif comodin == "_":
+            regex.append(".")
+        else:
+            regex.append(re.escape(comodin))
+    return re.compile("^" + "".join(regex) + "$", re.IGNORECASE | re.DOTALL)
+
+
+def _sin_tildes(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def _texto_busqueda_auditoria(fila):
+    columnas = ("Fecha/Hora", "Usuario", "Perfil", "Operación", "Cliente Afectado", "Detalle del Movimiento")
+    return _sin_tildes(" ".join(str(fila[c]) for c in columnas if fila.get(c) is not None)).lower()
+
+
+# Columnas GENERATED ALWAYS de las migraciones: {tabla: {columna: función(fila)}}
+COLUMNAS_GENERADAS = {"auditoria": {"texto_busqueda": _texto_busqueda_auditoria}}
+
+
+def _generar_columnas(tabla, fila):
+    for columna, calcular in COLUMNAS_GENERADAS.get(tabla, {}).items():
+        fila[columna] = calcular(fila)
+    return fila
+
+
+# --- TRIGGERS DE sql/006_ganancias_socios.sql ---
+def _mes_peru(fecha_pago):
+    momento = datetime.fromisoformat(str(fecha_pago).replace("Z", "+00:00"))
+    return momento.astimezone(timezone(timedelta(hours=-5))).strftime("%Y-%m-01")
+
+
+def _preparar_reparto(base, vieja, nueva, prestamos_por_id=None):
+    """BEFORE INSERT/UPDATE de pagos: reparto fijado al cobrar y escalado en las correcciones."""
+    if (vieja is not None and nueva.get("reparto") == vieja.get("reparto")
+            and nueva.get("Interes_Pagado") != vieja.get("Interes_Pagado")):
+        anterior = float(vieja.get("Interes_Pagado") or 0)
+        if anterior > 0 and vieja.get("reparto"):
+            factor = float(nueva["Interes_Pagado"]) / anterior
+            nueva["reparto"] = {socio: round(monto * factor, 2) for socio, monto in vieja["reparto"].items()}
+        else:
+            nueva["reparto"] = None
+    if nueva.get("reparto") is None:
+        if prestamos_por_id is None:
+            prestamos_por_id = {p["id"]: p for p in base.tablas.get("prestamos", [])}
+        prestamo = prestamos_por_id.get(nueva.get("Prestamo_Id"))
+        nueva["reparto"] = reparto_pago(prestamo, nueva.get("Interes_Pagado") or 0) if prestamo else {}
+
+
+def _acumular_reparto(base, reparto, fecha_pago, signo):
+    totales = base.tablas.setdefault("ganancias_socios", [])
+    mes = _mes_peru(fecha_pago)
+    for socio, monto in (reparto or {}).items():
+        fila = next((g for g in totales if g["socio"] == socio and g["mes"] == mes), None)
+        if fila is None:
+            fila = {"socio": socio, "mes": mes, "monto": 0.0, "pagos": 0}
+            totales.append(fila)
+        fila.update(monto=round(fila["monto"] + signo * monto, 2), pagos=fila["pagos"] + signo, updated_at=_ahora())
+
+
+def _actualizar_ganancias(base, vieja, nueva):
+    """AFTER INSERT/UPDATE/DELETE de pagos: mantiene ganancias_socios."""
+    if (vieja is not None and nueva is not None and vieja.get("reparto") == nueva.get("reparto")
+            and vieja.get("Fecha_Pago") == nueva.get("Fecha_Pago")):
+        return
+    if vieja is not None:
+        _acumular_reparto(base, vieja.get("reparto"), vieja["Fecha_Pago"], -1)
+    if nueva is not None:
+        _acumular_reparto(base, nueva.get("reparto"), nueva["Fecha_Pago"], 1)
+
+
+def _recalcular_ganancias_socios(base, parametros):
+    prestamos_por_id = {p["id"]: p for p in base.tablas.get("prestamos", [])}
+    for pago in base.tablas.get("pagos", []):
+        if parametros.get("p_repartir") or pago.get("reparto") is None:
+            pago["reparto"] = None
+            _preparar_reparto(base, None, pago, prestamos_por_id)
+    base.tablas["ganancias_socios"] = []
+    for pago in base.tablas.get("pagos", []):
+        _acumular_reparto(base, pago["reparto"], pago["Fecha_Pago"], 1)
+    totales = {}
+    for g in base.tablas["ganancias_socios"]:
+        total = totales.setdefault(g["socio"], {"socio_total": g["socio"], "monto_total": 0.0, "pagos_total": 0})
+        total["monto_total"] = round(total["monto_total"] + g["monto"], 2)
+        total["pagos_total"] += g["pagos"]
+    return [totales[s] for s in sorted(totales)]
+
+
+# --- RPC DE sql/007_registrar_cobro.sql ---
+def _registrar_cobro(base, parametros, origen=""):
+    """Mismos parámetros p_*, respuesta y códigos de error que la función; atómica porque corre con el lock de la base."""
+    p = {"p_capital": 0, "p_renovar": True, "p_nota": None, "p_usuario": "SISTEMA", "p_perfil": "-",
+         "p_vencimiento": None, "p_capital_anterior": None, **parametros}
+    interes, capital = float(p["p_interes"]), float(p["p_capital"])
+    if interes < 0 or capital < 0:
+        raise ErrorCobro("Los montos no pueden ser negativos", "22023")
+    prestamo = next((f for f in base.tablas.get("prestamos", []) if f["id"] == p["p_prestamo_id"]), None)
+    if prestamo is None or prestamo.get("Estado") != "Activo":
+        raise ErrorCobro(f"El préstamo {p['p_prestamo_id']} no está activo", "P0002")
+    vencimiento = str(prestamo["Fecha_Proximo_Pago"])[:10]
+    if p["p_vencimiento"] is not None and vencimiento != str(p["p_vencimiento"])[:10]:
+        raise ErrorCobro(f"El préstamo cambió (vence el {vencimiento}): vuelva a cargar la página", "40001")
+    if (p["p_capital_anterior"] is not None
+            and abs(float(prestamo["Monto_Capital"]) - float(p["p_capital_anterior"])) > 0.005):
+        raise ErrorCobro(f"El préstamo cambió (capital S/ {prestamo['Monto_Capital']}): vuelva a cargar la página", "40001")
+
+    ahora = datetime.now(timezone(timedelta(hours=-5)))
+    cliente = ClienteMemoria(base)
+    nuevo_capital = float(prestamo["Monto_Capital"]) - capital + (float(prestamo["Pago_Mensual_Interes"]) - interes)
+    if nuevo_capital <= 0:
+        cambios = {"Estado": "Pagado", "Fecha_Finalizacion": ahora.date().isoformat(),
+                   "Observaciones": p["p_nota"] or prestamo.get("Observaciones")}
+    else:
+        if p["p_renovar"]:
+            vencimiento = str(fechas_de_pago([vencimiento], 2)[0, 1])
+        cambios = {"Monto_Capital": nuevo_capital, "Pago_Mensual_Interes": nuevo_capital * float(prestamo["Tasa_Interes"]) / 100,
+                   "Fecha_Proximo_Pago": vencimiento}
+    prestamo = cliente.table("prestamos").update(cambios).eq("id", prestamo["id"]).execute().data[0]
+    pago = cliente.table("pagos").insert({
+        "Prestamo_Id": prestamo["id"], "Cliente": prestamo["Cliente"], "Interes_Pagado": interes,
+        "Capital_Pagado": capital, "Fecha_Pago": ahora.isoformat(), "Usuario": p["p_usuario"],
+    }).execute().data[0]
+    cliente.table("auditoria").insert({
+        "Fecha/Hora": ahora.strftime("%Y-%m-%d %H:%M:%S"), "Usuario": p["p_usuario"], "Perfil": p["p_perfil"],
+        "Operación": "COBRO", "Cliente Afectado": prestamo["Cliente"],
+        "Detalle del Movimiento": f"Pago Recibido{origen}: Interés S/ {p['p_interes']}, Capital S/ {p['p_capital']}",
+    }).execute()
+    return {
+        "Pago_Id": pago["id"], "Prestamo_Id": prestamo["id"], "Estado": prestamo["Estado"],
+        "Monto_Capital": prestamo["Monto_Capital"], "Pago_Mensual_Interes": prestamo["Pago_Mensual_Interes"],
+        "Fecha_Proximo_Pago": str(prestamo["Fecha_Proximo_Pago"])[:10],
+    }
+
+
+# --- RPC DE sql/009_fotos_cartera.sql ---
+def _guardar_foto_cartera(base, parametros):
+    hoy = parametros.get("p_fecha") or datetime.now(timezone(timedelta(hours=-5))).date().isoformat()
+    activos = [p for p in base.tablas.get("prestamos", []) if p.get("Estado") == "Activo"]
+    foto = foto_cartera(activos, hoy)
+    return ClienteMemoria(base).table("fotos_cartera").upsert(foto, on_conflict="fecha").execute().data[0]
+
+
+# --- RPC DE sql/010_registrar_cobros.sql ---
+def _registrar_cobros(base, parametros):
+    """Lote de cobros: valida todo, omite los préstamos que cambiaron y aplica el resto como registrar_cobro."""
+    cobros = parametros["p_cobros"]
+    if any(c.get("interes") is None or float(c["interes"]) < 0 or float(c.get("capital") or 0) < 0 for c in cobros):
+        raise ErrorCobro("Los montos no pueden ser negativos", "22023")
+    if len({c["prestamo_id"] for c in cobros}) != len(cobros):
+        raise ErrorCobro("Un préstamo aparece más de una vez en el lote", "22023")
+    aplicados, omitidos = [], []
+    for c in cobros:
+        try:
+            aplicados.append(_registrar_cobro(base, {
+                "p_prestamo_id": c["prestamo_id"], "p_interes": c["interes"], "p_capital": c.get("capital") or 0,
+                "p_renovar": True if c.get("renovar") is None else c["renovar"], "p_nota": c.get("nota"),
+                "p_vencimiento": c.get("vencimiento"), "p_capital_anterior": c.get("capital_anterior"),
+                "p_usuario": parametros.get("p_usuario", "SISTEMA"), "p_perfil": parametros.get("p_perfil", "-"),
+            }, origen=" (carga masiva)"))
+        except ErrorCobro as e:
+            # Con los montos ya validados solo quedan "no está activo" (P0002) y "cambió" (40001)
+            if e.code not in ("P0002", "40001"):
+                raise
+            omitidos.append(c["prestamo_id"])
+    return {"aplicados": aplicados, "omitidos": omitidos}
+
+
+# --- VISTAS ---
+def _resumen_cartera(base):
+    """sql/008: capital, interés y cantidad de préstamos por Estado."""
+    resumen = {}
+    for p in base.tablas.get("prestamos", []):
+        fila = resumen.setdefault(p.get("Estado"), {"Estado": p.get("Estado"), "capital": 0.0, "interes": 0.0, "prestamos": 0})
+        fila["capital"] += float(p.get("Monto_Capital") or 0)
+        fila["interes"] += float(p.get("Pago_Mensual_Interes") or 0)
+        fila["prestamos"] += 1
+    return list(resumen.values())
+
+
+# {vista: función(base) -> filas}; se recalculan en cada consulta
+VISTAS = {"resumen_cartera": _resumen_cartera}
+
+
+# {tabla: (antes(base, vieja, nueva), después(base, vieja, nueva))}; vieja es None al insertar y nueva al borrar
+TRIGGERS = {"pagos": (_preparar_reparto, _actualizar_ganancias)}
+RPCS_MIGRACIONES = {
+    "recalcular_ganancias_socios": _recalcular_ganancias_socios,
+    "registrar_cobro": _registrar_cobro,
+    "guardar_foto_cartera": _guardar_foto_cartera,
+    "registrar_cobros": _registrar_cobros,
+}
+
+
+def _antes(base, tabla, vieja, nueva):
+    if tabla in TRIGGERS and nueva is not None:
+        TRIGGERS[tabla][0](base, vieja, nueva)
+
+
+def _despues(base, tabla, vieja, nueva):
+    if tabla in TRIGGERS:
+        TRIGGERS[tabla][1](base, vieja, nueva)
+
+
+def _comparable(valor):
+    # Ordena vacíos al final como Postgres y evita comparar None con números
+    return (valor is None, valor if valor is not None else 0)
+
+
+class BaseMemoria:
+    """Tablas en memoria compartidas por todos los clientes que las usen."""
+
+    def __init__(self, tablas=None):
+        self.tablas = {nombre: [dict(f) for f in filas] for nombre, filas in (tablas or {}).items()}
+        self.rpcs = dict(RPCS_MIGRACIONES)
+        self.consultas = 0
+        self._ids = itertools.count(max([f.get("id", 0) for filas in self.tablas.values() for f in filas] or [0]) + 1)
+        self._lock = threading.RLock()  # reentrante: una RPC puede consultar tablas
+        marca = _ahora()
+        for tabla, filas in self.tablas.items():
+            for fila in filas:
+                fila.setdefault("updated_at", marca)
+                _generar_columnas(tabla, fila)
+        if "pagos" in self.tablas:
+            # Como la carga inicial al final de sql/006
+            _recalcular_ganancias_socios(self, {})
+
+    def registrar_rpc(self, nombre, funcion):
+        """funcion(base, parametros) -> datos devueltos por .rpc(nombre, parametros).execute()."""
+        self.rpcs[nombre] = funcion
+
+    def nuevo_id(self):
+        return next(self._ids)
+
+
+class ConsultaMemoria:
+    def __init__(self, base, tabla):
+        self.base = base
+        self.tabla = tabla
+        self.filtros = []
+        self.ordenes = []
+        self.limite = None
+        self.desde = 0
+        self.operacion = "select"
+        self.datos = None
+        self.opciones = {}
+        self.columnas = None  # None = todas ("*")
+        self._negar = False
+
+    # --- FILTROS ---
+    def _filtrar(self, condicion):
+        if self._negar:
+            self._negar = False
+            self.filtros.append(lambda f: not condicion(f))
+        else:
+            self.filtros.append(condicion)
+        return self
+
+    @property
+    def not_(self):
+        self._negar = True
+        return self
+
+    def select(self, *columnas, **opciones):
+        nombres = [c.strip().strip('"') for texto in columnas for c in texto.split(",")]
+        self.columnas = None if not nombres or "*" in nombres else nombres
+        return self
+
+    # PostgREST acepta nombres entre comillas dobles ("Fecha/Hora"); aquí se comparan sin ellas
+    def eq(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) == valor or str(f.get(columna)) == str(valor))
+
+    def neq(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) != valor)
+
+    def lt(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) is not None and f.get(columna) < valor)
+
+    def lte(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) is not None and f.get(columna) <= valor)
+
+    def gt(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) is not None and f.get(columna) > valor)
+
+    def gte(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) is not None and f.get(columna) >= valor)
+
+    def in_(self, columna, valores):
+        columna = columna.strip('"')
+        valores = list(valores)
+        return self._filtrar(lambda f: f.get(columna) in valores)
+
+    def is_(self, columna, valor):
+        columna = columna.strip('"')
+        return self._filtrar(lambda f: f.get(columna) is None)
+
+    def ilike(self, columna, patron):
+        columna = columna.strip('"')
+        regex = _patron_like(patron)
+        return self._filtrar(lambda f: bool(regex.match(str(f.get(columna) or ""))))
+
+    def or_(self, expresion):
+        """Soporta las dos formas que usa el repo: keyset (updated_at, id) y una lista de ilike."""
+        keyset = re.fullmatch(r'updated_at\.gt\."(.+?)",and\(updated_at\.eq\."(.+?)",id\.gt\.(\d+)\)', expresion)
+        if keyset:
+            marca, _, ultimo_id = keyset.groups()
+            ultimo_id = int(ultimo_id)
+            return self._filtrar(lambda f: f["updated_at"] > marca or (f["updated_at"] == marca and f["id"] > ultimo_id))
+        condiciones = [
+            (columna.strip('"'), _patron_like(patron))
+            for columna, _, patron in re.findall(r'("[^"]+"|[^,.()]+)\.ilike\.("?)(.*?)\2(?=,|$)', expresion)
+        ]
+        if not condiciones:
+            raise NotImplementedError(f"Filtro or_ no soportado: {expresion}")
+        return self._filtrar(lambda f: any(r.match(str(f.get(c) or "")) for c, r in condiciones))
+
+    def order(self, columna, desc=False, **opciones):
+        self.ordenes.append((columna.strip('"'), desc))
+        return self
+
+    def limit(self, cantidad, **opciones):
+        self.limite = cantidad
+        return self
+
+    def range(self, inicio, fin):
+        self.desde, self.limite = inicio, fin - inicio + 1
+        return self
+
+    # --- ESCRITURAS ---
+    def insert(self, datos, **opciones):
+        self.operacion, self.datos = "insert", datos
+        return self
+
+    def upsert(self, datos, on_conflict="id", ignore_duplicates=False, **opciones):
+        self.operacion, self.datos = "upsert", datos
+        self.opciones = {"on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def update(self, datos, **opciones):
+        self.operacion, self.datos = "update", datos
+        return self
+
+    def delete(self, **opciones):
+        self.operacion = "delete"
+        return self
+
+    def execute(self):
+        with self.base._lock:
+            self.base.consultas += 1
+            if self.tabla in VISTAS:
+                if self.operacion != "select":
+                    raise NotImplementedError(f"La vista {self.tabla} es de solo lectura")
+                filas = VISTAS[self.tabla](self.base)
+            else:
+                filas = self.base.tablas.setdefault(self.tabla, [])
+            if self.operacion in ("insert", "upsert"):
+                datos = self._insertar(filas)
+            else:
+                seleccion = [f for f in filas if all(c(f) for c in self.filtros)]
+                if self.operacion == "update":
+                    for fila in seleccion:
+                        vieja = dict(fila)
+                        fila.update(self.datos, updated_at=_ahora())
+                        _antes(self.base, self.tabla, vieja, fila)
+                        _generar_columnas(self.tabla, fila)
+                        _despues(self.base, self.tabla, vieja, fila)
+                elif self.operacion == "delete":
+                    self._eliminar(filas, seleccion)
+                else:
+                    for columna, desc in reversed(self.ordenes):
+                        seleccion.sort(key=lambda f: _comparable(f.get(columna)), reverse=desc)
+                    fin = None if self.limite is None else self.desde + self.limite
+                    seleccion = seleccion[self.desde:fin]
+                    if self.columnas:
+                        seleccion = [{c: f.get(c) for c in self.columnas} for f in seleccion]
+                datos = [dict(f) for f in seleccion]
+        return SimpleNamespace(data=datos, count=None)
+
+    def _insertar(self, filas):
+        # on_conflict admite claves compuestas: "destinatario,prestamo_id"
+        claves = [c.strip() for c in self.opciones.get("on_conflict", "id").split(",")]
+        insertadas = []
+        for nueva in self.datos if isinstance(self.datos, list) else [self.datos]:
+            nueva = _generar_columnas(self.tabla, dict(nueva, updated_at=_ahora()))
+            existente = next((
+                f for f in filas
+                if all(c in nueva for c in claves) and all(f.get(c) == nueva[c] for c in claves)
+            ), None)
+            if existente is not None and self.operacion == "upsert":
+                if not self.opciones.get("ignore_duplicates"):
+                    vieja = dict(existente)
+                    existente.update(nueva)
+                    _antes(self.base, self.tabla, vieja, existente)
+                    _generar_columnas(self.tabla, existente)
+                    _despues(self.base, self.tabla, vieja, existente)
+                    insertadas.append(existente)
+                continue
+            nueva.setdefault("id", self.base.nuevo_id())
+            _antes(self.base, self.tabla, None, nueva)
+            filas.append(nueva)
+            _despues(self.base, self.tabla, None, nueva)
+            insertadas.append(nueva)
+        return [dict(f) for f in insertadas]
+
+    def _eliminar(self, filas, seleccion):
+        lapidas = self.base.tablas.setdefault("eliminados", [])
+        for fila in seleccion:
+            filas.remove(fila)
+            _despues(self.base, self.tabla, fila, None)
+            lapidas.append({"id": self.base.nuevo_id(), "tabla": self.tabla, "registro_id": fila["id"], "updated_at": _ahora()})
+
+
+class _LlamadaRpc:
+    def __init__(self, base, nombre, parametros):
+        self.base = base
+        self.nombre = nombre
+        self.parametros = parametros
+
+    def execute(self):
+        with self.base._lock:
+            self.base.consultas += 1
+            return SimpleNamespace(data=self.base.rpcs[self.nombre](self.base, self.parametros), count=None)
+
+
+class ClienteMemoria:
+    """Misma interfaz que el cliente de supabase-py para table() / rpc()."""
+
+    def __init__(self, base):
+        self.base = base
+
+    def table(self, nombre):
+        return ConsultaMemoria(self.base, nombre)
+
+    from_ = table
+
+    def rpc(self, nombre, parametros=None):
+        return _LlamadaRpc(self.base, nombre, parametros or {})
@@ -0,0 +1,127 @@
+"""
+Réplica local de 'prestamos' y 'auditoria' que se actualiza por diferencias (delta).
+
+En lugar de volver a descargar la tabla completa, cada refresco pide a Supabase solo
+las filas con 'updated_at' posterior a la última marca vista, más las lápidas que la
+tabla 'eliminados' guarda por cada borrado definitivo (ver sql/001_sincronizacion_delta.sql).
+Así el costo de refrescar depende de cuántos cambios hubo, no del tamaño de la cartera.
+
+La usan app.py (en memoria, compartida por todas las sesiones) y notifier.py
+(persistida en un archivo JSON entre ejecuciones).
+"""
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+# Margen hacia atrás al releer desde la marca: cubre transacciones que tomaron su
+# 'updated_at' antes que otras ya vistas pero se confirmaron después. Releer filas es
+# inocuo porque se aplican por id.
+SOLAPE_SEGUNDOS = 5
+# Supabase corta cada respuesta en 1000 filas (max-rows de PostgREST)
+TAMANO_LOTE = 1000
+# Errores de PostgREST cuando falta sql/001: la columna updated_at (42703) o la tabla
+# eliminados (42P01, o PGRST205 desde la caché de esquema de PostgREST 12)
+CODIGOS_SIN_MIGRACION = {"42703", "42P01", "PGRST204", "PGRST205"}
+
+
+def falta_migracion(error):
+    """True si el refresco falló porque la base no tiene las columnas o tablas de sql/001."""
+    return str(getattr(error, "code", "")) in CODIGOS_SIN_MIGRACION
+
+
+def _retroceder(marca, segundos):
+    """Resta segundos a una marca ISO devuelta por PostgREST."""
+    # fromisoformat de Python 3.9 solo acepta fracciones de 3 o 6 dígitos
+    normalizada = re.sub(r"\.(\d+)", lambda m: "." + m.group(1)[:6].ljust(6, "0"), marca.replace("Z", "+00:00"))
+    return (datetime.fromisoformat(normalizada) - timedelta(seconds=segundos)).isoformat()
+
+
+def _leer_desde(cliente, tabla, marca, filtro=None, lote=TAMANO_LOTE):
+    """Recorre por keyset (updated_at, id) las filas de `tabla` con updated_at >= marca."""
+    cursor = None
+    while True:
+        consulta = cliente.table(tabla).select("*")
+        if filtro:
+            consulta = consulta.eq(*filtro)
+        if cursor:
+            fecha, ultimo_id = cursor
+            consulta = consulta.or_(f'updated_at.gt."{fecha}",and(updated_at.eq."{fecha}",id.gt.{ultimo_id})')
+        elif marca:
+            consulta = consulta.gte("updated_at", marca)
+        filas = consulta.order("updated_at").order("id").limit(lote).execute().data
+        yield from filas
+        if len(filas) < lote:
+            return
+        cursor = (filas[-1]["updated_at"], filas[-1]["id"])
+
+
+class SnapshotTabla:
+    """Copia local de una tabla de Supabase, indexada por id."""
+
+    def __init__(self, tabla, ruta=None):
+        self.tabla = tabla
+        self.ruta = ruta
+        self.filas = {}
+        self.marca = None             # 'updated_at' más reciente aplicado de la tabla
+        self.marca_eliminados = None  # 'updated_at' más reciente aplicado de 'eliminados'
+        self._lock = threading.Lock()
+        if ruta and os.path.exists(ruta):
+            self._cargar()
+
+    def refrescar(self, cliente):
+        """Aplica los cambios y borrados ocurridos desde la última marca. Devuelve cuántos hubo."""
+        with self._lock:
+            cambios = 0
+
+            desde = _retroceder(self.marca, SOLAPE_SEGUNDOS) if self.marca else None
+            for fila in _leer_desde(cliente, self.tabla, desde):
+                if self.filas.get(fila["id"]) != fila:
+                    self.filas[fila["id"]] = fila
+                    cambios += 1
+                # Llegan ordenadas por updated_at: la última es la nueva marca
+                self.marca = fila["updated_at"]
+
+            desde = _retroceder(self.marca_eliminados, SOLAPE_SEGUNDOS) if self.marca_eliminados else None
+            for lapida in _leer_desde(cliente, "eliminados", desde, filtro=("tabla", self.tabla)):
+                if self.filas.pop(lapida["registro_id"], None) is not None:
+                    cambios += 1
+                self.marca_eliminados = lapida["updated_at"]
+
+            if cambios and self.ruta:
+                self._guardar()
+            return cambios
+
+    def consultar(self, estado=None, columnas=None, orden=None):
+        """Filtra, proyecta y ordena en local con la misma semántica que cargar_datos."""
+        with self._lock:
+            filas = [f for _, f in sorted(self.filas.items()) if not estado or f.get("Estado") == estado]
+        if orden:
+            # Formato "Columna" o "Columna desc"; los vacíos al final (al inicio en desc), como Postgres
+            campo, _, sentido = orden.partition(" ")
+            filas.sort(key=lambda f: (f.get(campo) is None, f.get(campo)), reverse=sentido.strip().lower() == "desc")
+        if columnas:
+            return [{c: f.get(c) for c in columnas} for f in filas]
+        return [dict(f) for f in filas]
+
+    # --- PERSISTENCIA (notifier.py entre ejecuciones) ---
+    def _cargar(self):
+        with open(self.ruta, encoding="utf-8") as archivo:
+            estado = json.load(archivo)
+        self.filas = {f["id"]: f for f in estado["filas"]}
+        self.marca = estado.get("marca")
+        self.marca_eliminados = estado.get("marca_eliminados")
+
+    def _guardar(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({
+                "tabla": self.tabla,
+                "marca": self.marca,
+                "marca_eliminados": self.marca_eliminados,
+                "filas": list(self.filas.values()),
+            }, archivo, ensure_ascii=False)
+        # Reemplazo atómico: una ejecución interrumpida no deja el snapshot a medias
+        os.replace(temporal, self.ruta)
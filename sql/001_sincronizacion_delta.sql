@@ -0,0 +1,61 @@
+-- =====================================================================
+-- 001 | SINCRONIZACIÓN INCREMENTAL (DELTA) DE prestamos Y auditoria
+-- =====================================================================
+-- Habilita la réplica local de sincronizacion.py:
+--   * 'updated_at' en cada tabla, mantenido por trigger, como marca de agua.
+--   * 'eliminados' guarda una lápida por cada DELETE (Administrar Cartera,
+--     Anular Cobro) para que las réplicas también quiten la fila.
+-- Ejecutar una sola vez en el SQL Editor de Supabase.
+
+-- --- 1. MARCA DE ÚLTIMA MODIFICACIÓN ---
+ALTER TABLE prestamos ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE auditoria ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp();
+
+CREATE OR REPLACE FUNCTION marcar_actualizacion() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_prestamos_updated_at ON prestamos;
+CREATE TRIGGER trg_prestamos_updated_at
+    BEFORE INSERT OR UPDATE ON prestamos
+    FOR EACH ROW EXECUTE FUNCTION marcar_actualizacion();
+
+DROP TRIGGER IF EXISTS trg_auditoria_updated_at ON auditoria;
+CREATE TRIGGER trg_auditoria_updated_at
+    BEFORE INSERT OR UPDATE ON auditoria
+    FOR EACH ROW EXECUTE FUNCTION marcar_actualizacion();
+
+-- Índices para leer "lo cambiado desde la marca" sin recorrer la tabla
+CREATE INDEX IF NOT EXISTS idx_prestamos_updated_at ON prestamos (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_auditoria_updated_at ON auditoria (updated_at, id);
+
+-- --- 2. LÁPIDAS DE BORRADOS DEFINITIVOS ---
+CREATE TABLE IF NOT EXISTS eliminados (
+    id bigserial PRIMARY KEY,
+    tabla text NOT NULL,
+    registro_id bigint NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX IF NOT EXISTS idx_eliminados_tabla ON eliminados (tabla, updated_at, id);
+
+CREATE OR REPLACE FUNCTION registrar_eliminacion() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO eliminados (tabla, registro_id) VALUES (TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_prestamos_eliminados ON prestamos;
+CREATE TRIGGER trg_prestamos_eliminados
+    AFTER DELETE ON prestamos
+    FOR EACH ROW EXECUTE FUNCTION registrar_eliminacion();
+
+DROP TRIGGER IF EXISTS trg_auditoria_eliminados ON auditoria;
+CREATE TRIGGER trg_auditoria_eliminados
+    AFTER DELETE ON auditoria
+    FOR EACH ROW EXECUTE FUNCTION registrar_eliminacion();
+
+-- Si las tablas usan RLS, 'eliminados' necesita la misma política de lectura que 'prestamos'.
@@ -0,0 +1,34 @@
+-- =====================================================================
+-- 002 | LIBRO DE PAGOS (pagos)
+-- =====================================================================
+-- Un registro tipado por cada cobro. Reemplaza la lectura de montos desde el
+-- texto "Pago Recibido: Interés S/ X, Capital S/ Y" de la auditoría.
+-- Después de crearla, ejecutar una vez: python backfill_pagos.py
+-- Requiere 001_sincronizacion_delta.sql (funciones de marca y lápidas).
+
+CREATE TABLE IF NOT EXISTS pagos (
+    id bigserial PRIMARY KEY,
+    "Prestamo_Id" bigint REFERENCES prestamos(id) ON DELETE SET NULL,
+    "Cliente" text NOT NULL,
+    "Interes_Pagado" numeric(12, 2) NOT NULL DEFAULT 0 CHECK ("Interes_Pagado" >= 0),
+    "Capital_Pagado" numeric(12, 2) NOT NULL DEFAULT 0 CHECK ("Capital_Pagado" >= 0),
+    "Fecha_Pago" timestamptz NOT NULL DEFAULT now(),
+    "Usuario" text,
+    -- Registro de auditoría del que se reconstruyó el pago (solo backfill)
+    "Auditoria_Id" bigint UNIQUE,
+    updated_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pagos_prestamo ON pagos ("Prestamo_Id");
+CREATE INDEX IF NOT EXISTS idx_pagos_fecha ON pagos ("Fecha_Pago");
+CREATE INDEX IF NOT EXISTS idx_pagos_updated_at ON pagos (updated_at, id);
+
+DROP TRIGGER IF EXISTS trg_pagos_updated_at ON pagos;
+CREATE TRIGGER trg_pagos_updated_at
+    BEFORE INSERT OR UPDATE ON pagos
+    FOR EACH ROW EXECUTE FUNCTION marcar_actualizacion();
+
+DROP TRIGGER IF EXISTS trg_pagos_eliminados ON pagos;
+CREATE TRIGGER trg_pagos_eliminados
+    AFTER DELETE ON pagos
+    FOR EACH ROW EXECUTE FUNCTION registrar_eliminacion();
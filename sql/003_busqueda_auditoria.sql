@@ -0,0 +1,29 @@
+-- =====================================================================
+-- 003 | BÚSQUEDA EN EL SERVIDOR SOBRE auditoria
+-- =====================================================================
+-- Habilita el modo "Todo el historial" del buscador de Auditoría:
+--   * 'texto_busqueda': columna generada con el texto de la fila en minúsculas y
+--     sin tildes, para buscar con un solo ILIKE y con la misma regla que busqueda.py.
+--   * Índice de trigramas (pg_trgm) para que ILIKE '%texto%' no recorra la tabla.
+--   * Índice por fecha para los filtros de rango.
+-- Ejecutar una sola vez en el SQL Editor de Supabase.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() no es IMMUTABLE (depende del diccionario configurado), así que no puede usarse
+-- directamente en una columna generada; fijamos el diccionario en un envoltorio inmutable.
+CREATE OR REPLACE FUNCTION sin_tildes(texto text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, texto)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE auditoria ADD COLUMN IF NOT EXISTS texto_busqueda text
+    GENERATED ALWAYS AS (
+        lower(sin_tildes(concat_ws(' ',
+            "Fecha/Hora", "Usuario", "Perfil", "Operación", "Cliente Afectado", "Detalle del Movimiento"
+        )))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_auditoria_texto_trgm ON auditoria USING gin (texto_busqueda gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_auditoria_fecha ON auditoria ("Fecha/Hora", id);
+CREATE INDEX IF NOT EXISTS idx_auditoria_operacion ON auditoria ("Operación", id);
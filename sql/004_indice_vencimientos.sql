@@ -0,0 +1,10 @@
+-- =====================================================================
+-- 004 | ÍNDICE PARA LA CONSULTA DEL NOTIFICADOR
+-- =====================================================================
+-- notifier.py pide solo los préstamos activos que vencen dentro de la ventana de
+-- aviso (Estado = 'Activo' AND Fecha_Proximo_Pago <= hoy + N). Con este índice el
+-- costo de esa consulta depende de cuántos vencen, no del tamaño de la cartera.
+-- Ejecutar una sola vez en el SQL Editor de Supabase.
+
+CREATE INDEX IF NOT EXISTS idx_prestamos_estado_vencimiento
+    ON prestamos ("Estado", "Fecha_Proximo_Pago", id);
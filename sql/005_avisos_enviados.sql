@@ -0,0 +1,30 @@
+-- =====================================================================
+-- 005 | AVISOS YA ENVIADOS POR EL NOTIFICADOR (avisos_enviados)
+-- =====================================================================
+-- notifier.py registra aquí cada alerta que salió en un correo, para que la
+-- siguiente ejecución (el cron del día siguiente o un workflow_dispatch repetido)
+-- envíe solo las nuevas o las que escalaron de tramo (ver estado_avisos.py).
+-- Un préstamo renovado tiene otro vencimiento y vuelve a avisarse desde cero.
+-- Ejecutar una sola vez en el SQL Editor de Supabase.
+
+CREATE TABLE IF NOT EXISTS avisos_enviados (
+    destinatario text NOT NULL,
+    prestamo_id bigint NOT NULL,
+    vencimiento date NOT NULL,
+    tramo text NOT NULL CHECK (tramo IN ('proximos', 'hoy', 'mora')),
+    -- Último día en que salió (el modo "completo" lo reenvía una vez por día)
+    fecha date NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (destinatario, prestamo_id, vencimiento, tramo)
+);
+
+-- El notificador lee el estado de los préstamos que hoy tienen alerta
+CREATE INDEX IF NOT EXISTS idx_avisos_enviados_prestamo ON avisos_enviados (prestamo_id, vencimiento);
+
+DROP TRIGGER IF EXISTS trg_avisos_enviados_updated_at ON avisos_enviados;
+CREATE TRIGGER trg_avisos_enviados_updated_at
+    BEFORE INSERT OR UPDATE ON avisos_enviados
+    FOR EACH ROW EXECUTE FUNCTION marcar_actualizacion();
+
+-- Limpieza opcional de ciclos ya cerrados (préstamos renovados o pagados hace tiempo):
+-- DELETE FROM avisos_enviados WHERE fecha < current_date - 180;
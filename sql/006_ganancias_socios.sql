@@ -0,0 +1,127 @@
+-- =====================================================================
+-- 006 | GANANCIAS POR SOCIO MATERIALIZADAS (pagos.reparto + ganancias_socios)
+-- =====================================================================
+-- Las tarjetas "GANANCIAS TOTALES ACUMULADAS" ya no recorren todos los pagos:
+--   * pagos.reparto guarda, al cobrar, cuánto del interés le toca a cada socio:
+--     {"Bruno Tapia": 66.67, "Piera Juarez": 33.33} = (% del socio / tasa) * interés,
+--     con la 'Distribucion_Socios' que tenía el préstamo en ese momento (sin ella,
+--     10% y 8% como la pestaña Multi-Socio). Misma regla que cartera.reparto_pago().
+--   * ganancias_socios acumula esos montos por socio y mes (hora Perú); un trigger
+--     la mantiene al registrar, corregir (se escala el reparto) o anular un cobro.
+--   * recalcular_ganancias_socios() la reconstruye desde cero (python recalcular_ganancias.py).
+-- Requiere 002_pagos.sql. Ejecutar una sola vez en el SQL Editor de Supabase.
+
+-- --- 1. REPARTO DE CADA COBRO ---
+ALTER TABLE pagos ADD COLUMN IF NOT EXISTS reparto jsonb;
+
+CREATE OR REPLACE FUNCTION calcular_reparto(p_prestamo_id bigint, p_interes numeric) RETURNS jsonb AS $$
+    SELECT COALESCE(
+        jsonb_object_agg(d.key, round(d.value::numeric / COALESCE(NULLIF(p."Tasa_Interes", 0), 1) * p_interes, 2))
+            FILTER (WHERE d.value::numeric <> 0),
+        '{}'::jsonb
+    )
+    FROM prestamos p
+    CROSS JOIN LATERAL jsonb_each_text(
+        CASE WHEN jsonb_typeof(p."Distribucion_Socios") = 'object' AND p."Distribucion_Socios" <> '{}'::jsonb
+             THEN p."Distribucion_Socios"
+             ELSE '{"Bruno Tapia": 10, "Piera Juarez": 8}'::jsonb
+        END
+    ) AS d
+    WHERE p.id = p_prestamo_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION preparar_reparto() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.reparto IS NOT DISTINCT FROM OLD.reparto
+       AND NEW."Interes_Pagado" IS DISTINCT FROM OLD."Interes_Pagado" THEN
+        -- Corrección del monto: se conserva la proporción que se fijó al cobrar
+        IF OLD."Interes_Pagado" > 0 AND OLD.reparto IS NOT NULL AND OLD.reparto <> '{}'::jsonb THEN
+            SELECT jsonb_object_agg(key, round(value::numeric * NEW."Interes_Pagado" / OLD."Interes_Pagado", 2))
+              INTO NEW.reparto
+              FROM jsonb_each_text(OLD.reparto);
+        ELSE
+            NEW.reparto := NULL;
+        END IF;
+    END IF;
+    IF NEW.reparto IS NULL THEN
+        NEW.reparto := calcular_reparto(NEW."Prestamo_Id", NEW."Interes_Pagado");
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_pagos_reparto ON pagos;
+CREATE TRIGGER trg_pagos_reparto
+    BEFORE INSERT OR UPDATE ON pagos
+    FOR EACH ROW EXECUTE FUNCTION preparar_reparto();
+
+-- --- 2. TOTALES POR SOCIO Y MES ---
+CREATE TABLE IF NOT EXISTS ganancias_socios (
+    socio text NOT NULL,
+    mes date NOT NULL,  -- primer día del mes, en hora Perú
+    monto numeric(14, 2) NOT NULL DEFAULT 0,
+    pagos integer NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (socio, mes)
+);
+
+CREATE OR REPLACE FUNCTION acumular_reparto(p_reparto jsonb, p_fecha timestamptz, p_signo integer) RETURNS void AS $$
+    INSERT INTO ganancias_socios AS g (socio, mes, monto, pagos)
+    SELECT key, date_trunc('month', p_fecha AT TIME ZONE 'America/Lima')::date, p_signo * value::numeric, p_signo
+    FROM jsonb_each_text(COALESCE(p_reparto, '{}'::jsonb))
+    ON CONFLICT (socio, mes) DO UPDATE
+        SET monto = g.monto + EXCLUDED.monto,
+            pagos = g.pagos + EXCLUDED.pagos,
+            updated_at = clock_timestamp();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION actualizar_ganancias_socios() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.reparto IS NOT DISTINCT FROM OLD.reparto
+       AND NEW."Fecha_Pago" IS NOT DISTINCT FROM OLD."Fecha_Pago" THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM acumular_reparto(OLD.reparto, OLD."Fecha_Pago", -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM acumular_reparto(NEW.reparto, NEW."Fecha_Pago", 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_pagos_ganancias ON pagos;
+CREATE TRIGGER trg_pagos_ganancias
+    AFTER INSERT OR UPDATE OR DELETE ON pagos
+    FOR EACH ROW EXECUTE FUNCTION actualizar_ganancias_socios();
+
+-- --- 3. RECÁLCULO COMPLETO (CONCILIACIÓN) ---
+-- p_repartir = true vuelve a repartir todos los cobros con la distribución actual de
+-- cada préstamo; si no, solo completa los que no tienen reparto.
+CREATE OR REPLACE FUNCTION recalcular_ganancias_socios(p_repartir boolean DEFAULT false)
+RETURNS TABLE (socio_total text, monto_total numeric, pagos_total bigint) AS $$
+BEGIN
+    -- Bloquea cobros nuevos mientras se reconstruye (las lecturas siguen)
+    LOCK TABLE pagos IN SHARE ROW EXCLUSIVE MODE;
+    UPDATE pagos SET reparto = calcular_reparto("Prestamo_Id", "Interes_Pagado")
+     WHERE p_repartir OR reparto IS NULL;
+
+    -- WHERE true: pg_safeupdate (activo en las sesiones de PostgREST) rechaza DELETE sin WHERE
+    DELETE FROM ganancias_socios WHERE true;
+    INSERT INTO ganancias_socios (socio, mes, monto, pagos)
+    SELECT r.key, date_trunc('month', p."Fecha_Pago" AT TIME ZONE 'America/Lima')::date, sum(r.value::numeric), count(*)
+      FROM pagos p
+     CROSS JOIN LATERAL jsonb_each_text(COALESCE(p.reparto, '{}'::jsonb)) AS r
+     GROUP BY 1, 2;
+
+    RETURN QUERY
+        SELECT g.socio, sum(g.monto), sum(g.pagos)::bigint
+          FROM ganancias_socios g
+         GROUP BY g.socio
+         ORDER BY g.socio;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial con los cobros existentes
+SELECT * FROM recalcular_ganancias_socios();
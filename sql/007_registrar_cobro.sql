@@ -0,0 +1,92 @@
+-- =====================================================================
+-- 007 | COBRO EN UNA SOLA OPERACIÓN (registrar_cobro)
+-- =====================================================================
+-- "Registrar Pago" hacía tres llamadas: update de 'prestamos', insert en 'pagos' y el
+-- evento de auditoría. Si una fallaba, el préstamo cambiaba sin rastro del cobro y las
+-- ganancias de los socios quedaban mal. Esta función hace todo en una transacción:
+--   1. bloquea el préstamo (FOR UPDATE) y lee su saldo actual
+--   2. aplica el cobro con la regla de la pantalla: el interés que falta se suma al
+--      capital, la cuota se recalcula con la tasa y, con capital <= 0, se cancela
+--   3. si se pide, renueva el vencimiento un mes (mismo día o el último del mes, como sumar_un_mes)
+--   4. asienta el cobro en 'pagos' (los triggers de sql/006 hacen el reparto) y en 'auditoria'
+-- p_vencimiento y p_capital_anterior son el vencimiento y el capital que vio el usuario: si
+-- alguno ya no coincide (otro cobro entró antes, también uno sin renovación que solo movió el
+-- capital) no se aplica nada. simuladores/supabase_memoria.py implementa el mismo contrato
+-- (tests/test_cobros_memoria.py).
+-- Requiere 002_pagos.sql y 006_ganancias_socios.sql. Ejecutar una sola vez en el SQL Editor de Supabase.
+
+CREATE OR REPLACE FUNCTION registrar_cobro(
+    p_prestamo_id bigint,
+    p_interes numeric,
+    p_capital numeric DEFAULT 0,
+    p_renovar boolean DEFAULT true,
+    p_nota text DEFAULT NULL,
+    p_usuario text DEFAULT 'SISTEMA',
+    p_perfil text DEFAULT '-',
+    p_vencimiento date DEFAULT NULL,
+    p_capital_anterior numeric DEFAULT NULL
+) RETURNS jsonb AS $$
+DECLARE
+    v_prestamo prestamos%ROWTYPE;
+    v_capital numeric;
+    v_vencimiento date;
+    v_pago_id bigint;
+    v_ahora timestamptz := clock_timestamp();
+BEGIN
+    IF p_interes < 0 OR p_capital < 0 THEN
+        RAISE EXCEPTION 'Los montos no pueden ser negativos' USING ERRCODE = '22023';
+    END IF;
+
+    SELECT * INTO v_prestamo FROM prestamos WHERE id = p_prestamo_id FOR UPDATE;
+    IF NOT FOUND OR v_prestamo."Estado" IS DISTINCT FROM 'Activo' THEN
+        RAISE EXCEPTION 'El préstamo % no está activo', p_prestamo_id USING ERRCODE = 'P0002';
+    END IF;
+    v_vencimiento := v_prestamo."Fecha_Proximo_Pago"::date;
+    IF p_vencimiento IS NOT NULL AND v_vencimiento IS DISTINCT FROM p_vencimiento THEN
+        RAISE EXCEPTION 'El préstamo cambió (vence el %): vuelva a cargar la página', v_vencimiento USING ERRCODE = '40001';
+    END IF;
+    -- Medio céntimo de tolerancia: el capital llega como float desde la app
+    IF p_capital_anterior IS NOT NULL AND abs(v_prestamo."Monto_Capital" - p_capital_anterior) > 0.005 THEN
+        RAISE EXCEPTION 'El préstamo cambió (capital S/ %): vuelva a cargar la página', v_prestamo."Monto_Capital" USING ERRCODE = '40001';
+    END IF;
+
+    v_capital := v_prestamo."Monto_Capital" - p_capital + (v_prestamo."Pago_Mensual_Interes" - p_interes);
+    IF v_capital <= 0 THEN
+        UPDATE prestamos
+           SET "Estado" = 'Pagado',
+               "Fecha_Finalizacion" = (v_ahora AT TIME ZONE 'America/Lima')::date,
+               "Observaciones" = COALESCE(NULLIF(p_nota, ''), "Observaciones")
+         WHERE id = p_prestamo_id
+        RETURNING * INTO v_prestamo;
+    ELSE
+        IF p_renovar THEN
+            -- date + interval '1 month' ya recorta al último día del mes (31/01 -> 28/02)
+            v_vencimiento := (v_vencimiento + interval '1 month')::date;
+        END IF;
+        UPDATE prestamos
+           SET "Monto_Capital" = v_capital,
+               "Pago_Mensual_Interes" = v_capital * "Tasa_Interes" / 100,
+               "Fecha_Proximo_Pago" = v_vencimiento
+         WHERE id = p_prestamo_id
+        RETURNING * INTO v_prestamo;
+    END IF;
+
+    INSERT INTO pagos ("Prestamo_Id", "Cliente", "Interes_Pagado", "Capital_Pagado", "Fecha_Pago", "Usuario")
+    VALUES (p_prestamo_id, v_prestamo."Cliente", p_interes, p_capital, v_ahora, p_usuario)
+    RETURNING id INTO v_pago_id;
+
+    -- Mismo texto que escribía la app (backfill_pagos.py lo sabe leer)
+    INSERT INTO auditoria ("Fecha/Hora", "Usuario", "Perfil", "Operación", "Cliente Afectado", "Detalle del Movimiento")
+    VALUES (to_char(v_ahora AT TIME ZONE 'America/Lima', 'YYYY-MM-DD HH24:MI:SS'), p_usuario, p_perfil, 'COBRO',
+            v_prestamo."Cliente", format('Pago Recibido: Interés S/ %s, Capital S/ %s', p_interes, p_capital));
+
+    RETURN jsonb_build_object(
+        'Pago_Id', v_pago_id,
+        'Prestamo_Id', p_prestamo_id,
+        'Estado', v_prestamo."Estado",
+        'Monto_Capital', v_prestamo."Monto_Capital",
+        'Pago_Mensual_Interes', v_prestamo."Pago_Mensual_Interes",
+        'Fecha_Proximo_Pago', v_prestamo."Fecha_Proximo_Pago"::date
+    );
+END;
+$$ LANGUAGE plpgsql;
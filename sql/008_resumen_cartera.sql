@@ -0,0 +1,18 @@
+-- =====================================================================
+-- 008 | RESUMEN DE LA CARTERA POR ESTADO (vista resumen_cartera)
+-- =====================================================================
+-- Los KPI del Dashboard (CAPITAL ACTIVO, FLUJO MENSUAL, CLIENTES ACTIVOS) y del Historial
+-- (CRÉDITOS CERRADOS, CAPITAL RECUPERADO, TOTAL INTERESES GANADOS) se sumaban en pandas
+-- después de descargar todos los préstamos. Esta vista devuelve una fila por Estado
+-- ("Activo", "Pagado"...), así la cabecera llega en una respuesta de pocos bytes antes
+-- que la tabla completa: GET /rest/v1/resumen_cartera
+-- security_invoker: la vista respeta las políticas RLS de 'prestamos' de quien consulta.
+-- Ejecutar una sola vez en el SQL Editor de Supabase (requiere PostgreSQL 15 o superior).
+
+CREATE OR REPLACE VIEW resumen_cartera WITH (security_invoker = true) AS
+SELECT "Estado",
+       COALESCE(sum("Monto_Capital"), 0) AS capital,
+       COALESCE(sum("Pago_Mensual_Interes"), 0) AS interes,
+       count(*) AS prestamos
+  FROM prestamos
+ GROUP BY "Estado";
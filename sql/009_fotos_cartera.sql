@@ -0,0 +1,62 @@
+-- =====================================================================
+-- 009 | FOTO DIARIA DE LA CARTERA (fotos_cartera)
+-- =====================================================================
+-- Una fila por día con el tamaño de la cartera activa, para ver su evolución en el
+-- Dashboard (pestaña "EVOLUCIÓN") sin reconstruir estados pasados desde la auditoría:
+--   capital_activo / flujo_mensual / prestamos_activos -> suma de la cartera activa
+--   mora_*            -> préstamos activos con el vencimiento ya pasado
+--   exposicion_socios -> capital activo que le corresponde a cada socio,
+--                        {"Bruno Tapia": 12500.00, ...}, con la regla de calcular_reparto() (sql/006)
+-- notifier.py llama a guardar_foto_cartera() en cada ejecución diaria; si corre dos veces
+-- el mismo día, la segunda reemplaza a la primera. Misma cuenta que cartera.foto_cartera().
+-- Requiere 006_ganancias_socios.sql. Ejecutar una sola vez en el SQL Editor de Supabase.
+
+CREATE TABLE IF NOT EXISTS fotos_cartera (
+    fecha date PRIMARY KEY,  -- día de la foto, en hora Perú
+    capital_activo numeric(14, 2) NOT NULL DEFAULT 0,
+    flujo_mensual numeric(14, 2) NOT NULL DEFAULT 0,
+    prestamos_activos integer NOT NULL DEFAULT 0,
+    mora_prestamos integer NOT NULL DEFAULT 0,
+    mora_capital numeric(14, 2) NOT NULL DEFAULT 0,
+    mora_interes numeric(14, 2) NOT NULL DEFAULT 0,
+    exposicion_socios jsonb NOT NULL DEFAULT '{}'::jsonb,
+    updated_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE OR REPLACE FUNCTION guardar_foto_cartera(p_fecha date DEFAULT NULL) RETURNS fotos_cartera AS $$
+    WITH activos AS (
+        SELECT id, "Monto_Capital" AS capital, "Pago_Mensual_Interes" AS interes,
+               "Fecha_Proximo_Pago"::date < COALESCE(p_fecha, (now() AT TIME ZONE 'America/Lima')::date) AS en_mora
+          FROM prestamos
+         WHERE "Estado" = 'Activo'
+    ), exposicion AS (
+        SELECT r.key AS socio, round(sum(r.value::numeric), 2) AS monto
+          FROM activos a
+         CROSS JOIN LATERAL jsonb_each_text(calcular_reparto(a.id, a.capital)) AS r
+         GROUP BY r.key
+    )
+    INSERT INTO fotos_cartera AS f (fecha, capital_activo, flujo_mensual, prestamos_activos,
+                                    mora_prestamos, mora_capital, mora_interes, exposicion_socios)
+    SELECT COALESCE(p_fecha, (now() AT TIME ZONE 'America/Lima')::date),
+           COALESCE(sum(capital), 0),
+           COALESCE(sum(interes), 0),
+           count(*),
+           count(*) FILTER (WHERE en_mora),
+           COALESCE(sum(capital) FILTER (WHERE en_mora), 0),
+           COALESCE(sum(interes) FILTER (WHERE en_mora), 0),
+           (SELECT COALESCE(jsonb_object_agg(socio, monto), '{}'::jsonb) FROM exposicion)
+      FROM activos
+    ON CONFLICT (fecha) DO UPDATE
+        SET capital_activo = EXCLUDED.capital_activo,
+            flujo_mensual = EXCLUDED.flujo_mensual,
+            prestamos_activos = EXCLUDED.prestamos_activos,
+            mora_prestamos = EXCLUDED.mora_prestamos,
+            mora_capital = EXCLUDED.mora_capital,
+            mora_interes = EXCLUDED.mora_interes,
+            exposicion_socios = EXCLUDED.exposicion_socios,
+            updated_at = clock_timestamp()
+    RETURNING f.*;
+$$ LANGUAGE sql;
+
+-- Primera foto con la cartera de hoy
+SELECT * FROM guardar_foto_cartera();
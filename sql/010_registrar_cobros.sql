@@ -0,0 +1,109 @@
+-- =====================================================================
+-- 010 | VARIOS COBROS EN UNA SOLA OPERACIÓN (registrar_cobros)
+-- =====================================================================
+-- La "Carga Masiva" de Registrar Pago hacía un upsert de filas completas de 'prestamos',
+-- una inserción en 'pagos' y los eventos de auditoría por separado: si la segunda fallaba,
+-- los saldos cambiaban sin cobro en el libro, y el upsert pisaba columnas que otra sesión
+-- hubiera editado. Esta función es la versión por lotes de registrar_cobro (sql/007), en
+-- una transacción y con la misma regla:
+--   1. bloquea los préstamos del lote (en orden de id, para no cruzarse con otro lote)
+--   2. aplica cada cobro solo si el préstamo sigue activo, con el vencimiento y el capital
+--      que vio el usuario; los demás se devuelven en 'omitidos' sin tocarlos
+--   3. actualiza únicamente las columnas del cobro y asienta 'pagos' (los triggers de
+--      sql/006 hacen el reparto) y 'auditoria' ("Pago Recibido (carga masiva): ...")
+-- p_cobros: [{"prestamo_id": 1, "interes": 150, "capital": 0, "renovar": true, "nota": null,
+--             "vencimiento": "2025-03-31", "capital_anterior": 1500}, ...]
+-- Devuelve {"aplicados": [{Pago_Id, Prestamo_Id, Estado, ...}], "omitidos": [ids]}.
+-- simuladores/supabase_memoria.py implementa el mismo contrato (tests/test_cobros_memoria.py).
+-- Requiere 002_pagos.sql y 006_ganancias_socios.sql. Ejecutar una sola vez en el SQL Editor de Supabase.
+
+CREATE OR REPLACE FUNCTION registrar_cobros(
+    p_cobros jsonb,
+    p_usuario text DEFAULT 'SISTEMA',
+    p_perfil text DEFAULT '-'
+) RETURNS jsonb AS $$
+DECLARE
+    v_ahora timestamptz := clock_timestamp();
+    v_omitidos jsonb;
+    v_aplicados jsonb;
+BEGIN
+    CREATE TEMP TABLE _cobros ON COMMIT DROP AS
+    SELECT c.prestamo_id, c.interes, COALESCE(c.capital, 0) AS capital, COALESCE(c.renovar, true) AS renovar,
+           c.nota, c.vencimiento, c.capital_anterior, c.orden
+      FROM ROWS FROM (
+               jsonb_to_recordset(p_cobros) AS (prestamo_id bigint, interes numeric, capital numeric, renovar boolean,
+                                                nota text, vencimiento date, capital_anterior numeric)
+           ) WITH ORDINALITY AS c(prestamo_id, interes, capital, renovar, nota, vencimiento, capital_anterior, orden);
+
+    IF EXISTS (SELECT 1 FROM _cobros WHERE interes IS NULL OR interes < 0 OR capital < 0) THEN
+        RAISE EXCEPTION 'Los montos no pueden ser negativos' USING ERRCODE = '22023';
+    END IF;
+    IF (SELECT count(*) <> count(DISTINCT prestamo_id) FROM _cobros) THEN
+        RAISE EXCEPTION 'Un préstamo aparece más de una vez en el lote' USING ERRCODE = '22023';
+    END IF;
+
+    PERFORM 1 FROM prestamos WHERE id IN (SELECT prestamo_id FROM _cobros) ORDER BY id FOR UPDATE;
+
+    -- Con los préstamos bloqueados, se descartan los que ya no están como los vio el usuario
+    WITH descartados AS (
+        DELETE FROM _cobros c
+         WHERE NOT EXISTS (
+                   SELECT 1 FROM prestamos p
+                    WHERE p.id = c.prestamo_id
+                      AND p."Estado" = 'Activo'
+                      AND (c.vencimiento IS NULL OR p."Fecha_Proximo_Pago"::date = c.vencimiento)
+                      AND (c.capital_anterior IS NULL OR abs(p."Monto_Capital" - c.capital_anterior) <= 0.005))
+        RETURNING c.prestamo_id, c.orden
+    )
+    SELECT COALESCE(jsonb_agg(prestamo_id ORDER BY orden), '[]'::jsonb) INTO v_omitidos FROM descartados;
+
+    -- nuevo capital = capital - amortización + (cuota - interés pagado), como en registrar_cobro
+    WITH cancelados AS (
+        UPDATE prestamos p
+           SET "Estado" = 'Pagado',
+               "Fecha_Finalizacion" = (v_ahora AT TIME ZONE 'America/Lima')::date,
+               "Observaciones" = COALESCE(NULLIF(c.nota, ''), p."Observaciones")
+          FROM _cobros c
+         WHERE p.id = c.prestamo_id
+           AND p."Monto_Capital" - c.capital + (p."Pago_Mensual_Interes" - c.interes) <= 0
+        RETURNING p.*, c.interes AS cobro_interes, c.capital AS cobro_capital, c.orden
+    ), vigentes AS (
+        UPDATE prestamos p
+           SET "Monto_Capital" = p."Monto_Capital" - c.capital + (p."Pago_Mensual_Interes" - c.interes),
+               "Pago_Mensual_Interes" = (p."Monto_Capital" - c.capital + (p."Pago_Mensual_Interes" - c.interes))
+                                        * p."Tasa_Interes" / 100,
+               -- date + interval '1 month' ya recorta al último día del mes (31/01 -> 28/02)
+               "Fecha_Proximo_Pago" = CASE WHEN c.renovar THEN (p."Fecha_Proximo_Pago"::date + interval '1 month')::date
+                                           ELSE p."Fecha_Proximo_Pago"::date END
+          FROM _cobros c
+         WHERE p.id = c.prestamo_id
+           AND p."Monto_Capital" - c.capital + (p."Pago_Mensual_Interes" - c.interes) > 0
+        RETURNING p.*, c.interes AS cobro_interes, c.capital AS cobro_capital, c.orden
+    ), aplicados AS (
+        SELECT * FROM cancelados UNION ALL SELECT * FROM vigentes
+    ), pagos_nuevos AS (
+        INSERT INTO pagos ("Prestamo_Id", "Cliente", "Interes_Pagado", "Capital_Pagado", "Fecha_Pago", "Usuario")
+        SELECT id, "Cliente", cobro_interes, cobro_capital, v_ahora, p_usuario FROM aplicados ORDER BY orden
+        RETURNING id, "Prestamo_Id"
+    ), auditados AS (
+        -- Mismo texto que escribía la app (backfill_pagos.py lo sabe leer)
+        INSERT INTO auditoria ("Fecha/Hora", "Usuario", "Perfil", "Operación", "Cliente Afectado", "Detalle del Movimiento")
+        SELECT to_char(v_ahora AT TIME ZONE 'America/Lima', 'YYYY-MM-DD HH24:MI:SS'), p_usuario, p_perfil, 'COBRO', "Cliente",
+               format('Pago Recibido (carga masiva): Interés S/ %s, Capital S/ %s', cobro_interes, cobro_capital)
+          FROM aplicados ORDER BY orden
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'Pago_Id', g.id,
+               'Prestamo_Id', a.id,
+               'Estado', a."Estado",
+               'Monto_Capital', a."Monto_Capital",
+               'Pago_Mensual_Interes', a."Pago_Mensual_Interes",
+               'Fecha_Proximo_Pago', a."Fecha_Proximo_Pago"::date
+           ) ORDER BY a.orden), '[]'::jsonb)
+      INTO v_aplicados
+      FROM aplicados a JOIN pagos_nuevos g ON g."Prestamo_Id" = a.id;
+
+    DROP TABLE _cobros;
+    RETURN jsonb_build_object('aplicados', v_aplicados, 'omitidos', v_omitidos);
+END;
+$$ LANGUAGE plpgsql;
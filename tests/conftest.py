@@ -0,0 +1,9 @@
+"""
+Pruebas de los módulos sin Streamlit, contra el Supabase en memoria (simuladores/).
+Uso, desde la raíz del repositorio:
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,48 @@
+"""Cobros en lote de cartera.py: lectura de montos del CSV y su aplicación a los préstamos."""
+import pandas as pd
+import pytest
+
+from cartera import aplicar_pagos, normalizar_pagos_lote
+
+PRESTAMO = {"id": 1, "Cliente": "ROSA QUISPE", "Fecha_Proximo_Pago": "2025-01-31", "Monto_Capital": 10000.0,
+            "Tasa_Interes": 15.0, "Pago_Mensual_Interes": 1500.0, "Observaciones": None}
+
+
+@pytest.mark.parametrize("escrito, monto", [
+    ("1,500", 1500.0),
+    ("S/ 1,500", 1500.0),
+    ("1.500", 1500.0),
+    ("1,500,000", 1500000.0),
+    ("1.500.000", 1500000.0),
+    ("S/ 1,500.50", 1500.5),
+    ("1.500,50", 1500.5),
+    ("1.500.000,25", 1500000.25),
+    ("1500", 1500.0),
+    ("12,50", 12.5),
+    ("1,5", 1.5),
+    ("0,500", 0.5),
+])
+def test_montos_escritos(escrito, monto):
+    lote = normalizar_pagos_lote([{"Prestamo_Id": "1", "Interes": escrito}])
+    assert lote.loc[0, "Interes"] == pytest.approx(monto)
+
+
+def test_monto_vacio_y_capital_por_defecto():
+    lote = normalizar_pagos_lote([{"Prestamo_Id": "1", "Interes": "", "Capital": None}])
+    assert pd.isna(lote.loc[0, "Interes"])
+    assert lote.loc[0, "Capital"] == 0.0
+
+
+def test_monto_ilegible_indica_la_fila():
+    with pytest.raises(ValueError, match=r"fila 2: 'cien'"):
+        normalizar_pagos_lote([{"Prestamo_Id": "1", "Interes": "150"}, {"Prestamo_Id": "1", "Interes": "cien"}])
+
+
+def test_miles_con_coma_cubren_la_cuota():
+    # '1,500' es la cuota completa: renueva y no suma interés pendiente al capital
+    cobro = aplicar_pagos([PRESTAMO], [{"Prestamo_Id": "1", "Interes": "S/ 1,500"}], "2025-01-31").iloc[0]
+    assert cobro["Error"] == ""
+    assert cobro["Interes_Pendiente"] == 0.0
+    assert cobro["Nuevo_Capital"] == 10000.0
+    assert bool(cobro["Renovar"])
+    assert cobro["Nuevo_Vencimiento"] == "2025-02-28"
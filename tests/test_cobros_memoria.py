@@ -0,0 +1,195 @@
+"""
+Contrato de las RPC de cobro (sql/007 registrar_cobro y sql/010 registrar_cobros) y de los
+triggers de reparto de sql/006, contra el Supabase en memoria de simuladores/supabase_memoria.py,
+que es el que usan la app sin red y los benchmarks. Si cambia una de esas funciones SQL, estas
+pruebas dicen qué tiene que seguir haciendo la copia en memoria.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cartera import PORCENTAJES_POR_DEFECTO
+from simuladores.supabase_memoria import BaseMemoria, ClienteMemoria, ErrorCobro
+
+PRESTAMOS = [
+    {"id": 1, "Cliente": "ROSA QUISPE", "Estado": "Activo", "Fecha_Proximo_Pago": "2025-01-31", "Monto_Capital": 10000.0,
+     "Tasa_Interes": 15.0, "Pago_Mensual_Interes": 1500.0, "Observaciones": None,
+     "Distribucion_Socios": {"Socio A": 10.0, "Socio B": 5.0}},
+    {"id": 2, "Cliente": "LUCIA CHAVEZ", "Estado": "Activo", "Fecha_Proximo_Pago": "2024-01-31", "Monto_Capital": 1000.0,
+     "Tasa_Interes": 18.0, "Pago_Mensual_Interes": 180.0, "Observaciones": "aval", "Distribucion_Socios": None},
+    {"id": 3, "Cliente": "JUAN PEREZ", "Estado": "Pagado", "Fecha_Proximo_Pago": "2024-06-15", "Monto_Capital": 0.0,
+     "Tasa_Interes": 10.0, "Pago_Mensual_Interes": 0.0, "Observaciones": None, "Distribucion_Socios": None},
+]
+
+
+@pytest.fixture
+def base():
+    return BaseMemoria({"prestamos": PRESTAMOS, "pagos": [], "auditoria": [], "ganancias_socios": []})
+
+
+@pytest.fixture
+def cliente(base):
+    return ClienteMemoria(base)
+
+
+def _prestamo(base, prestamo_id):
+    return next(p for p in base.tablas["prestamos"] if p["id"] == prestamo_id)
+
+
+def _cobro(prestamo_id, interes, capital=0, **extra):
+    return {"prestamo_id": prestamo_id, "interes": interes, "capital": capital, **extra}
+
+
+def _mes_actual():
+    return datetime.now(timezone(timedelta(hours=-5))).strftime("%Y-%m-01")
+
+
+# --- registrar_cobro (sql/007) ---
+def test_cobro_renueva_al_ultimo_dia_del_mes(cliente, base):
+    fila = cliente.rpc("registrar_cobro", {"p_prestamo_id": 1, "p_interes": 1500, "p_vencimiento": "2025-01-31",
+                                           "p_capital_anterior": 10000}).execute().data
+    assert fila["Fecha_Proximo_Pago"] == "2025-02-28"
+    assert (fila["Estado"], fila["Monto_Capital"], fila["Pago_Mensual_Interes"]) == ("Activo", 10000.0, 1500.0)
+    # Año bisiesto
+    fila = cliente.rpc("registrar_cobro", {"p_prestamo_id": 2, "p_interes": 180}).execute().data
+    assert fila["Fecha_Proximo_Pago"] == "2024-02-29"
+    assert len(base.tablas["pagos"]) == 2
+    assert base.tablas["auditoria"][-1]["Detalle del Movimiento"] == "Pago Recibido: Interés S/ 180, Capital S/ 0"
+
+
+def test_cobro_parcial_suma_el_interes_pendiente_al_capital(cliente):
+    fila = cliente.rpc("registrar_cobro", {"p_prestamo_id": 1, "p_interes": 1000, "p_capital": 2000,
+                                           "p_renovar": False}).execute().data
+    assert fila["Monto_Capital"] == 8500.0
+    assert fila["Pago_Mensual_Interes"] == pytest.approx(1275.0)
+    assert fila["Fecha_Proximo_Pago"] == "2025-01-31"
+
+
+@pytest.mark.parametrize("cambio", [{"p_vencimiento": "2025-02-28"}, {"p_capital_anterior": 9000}])
+def test_cobro_rechaza_un_prestamo_que_cambio(cliente, base, cambio):
+    parametros = {"p_prestamo_id": 1, "p_interes": 1500, "p_vencimiento": "2025-01-31", "p_capital_anterior": 10000}
+    with pytest.raises(ErrorCobro) as error:
+        cliente.rpc("registrar_cobro", {**parametros, **cambio}).execute()
+    assert error.value.code == "40001"
+    assert _prestamo(base, 1)["Fecha_Proximo_Pago"] == "2025-01-31"
+    assert base.tablas["pagos"] == [] and base.tablas["auditoria"] == []
+
+
+def test_cobro_repetido_no_se_aplica_dos_veces(cliente, base):
+    parametros = {"p_prestamo_id": 1, "p_interes": 1500, "p_renovar": False, "p_vencimiento": "2025-01-31",
+                  "p_capital_anterior": 10000}
+    cliente.rpc("registrar_cobro", {**parametros, "p_interes": 500}).execute()
+    with pytest.raises(ErrorCobro) as error:
+        cliente.rpc("registrar_cobro", {**parametros, "p_interes": 500}).execute()
+    assert error.value.code == "40001"
+    assert len(base.tablas["pagos"]) == 1
+
+
+def test_cobro_que_cubre_la_deuda_cancela_el_prestamo(cliente, base):
+    fila = cliente.rpc("registrar_cobro", {"p_prestamo_id": 1, "p_interes": 1500, "p_capital": 10000,
+                                           "p_nota": "liquidado"}).execute().data
+    assert fila["Estado"] == "Pagado"
+    prestamo = _prestamo(base, 1)
+    assert prestamo["Fecha_Finalizacion"] == datetime.now(timezone(timedelta(hours=-5))).date().isoformat()
+    assert prestamo["Observaciones"] == "liquidado"
+    # Sin nota se conserva la observación que tenía
+    cliente.rpc("registrar_cobro", {"p_prestamo_id": 2, "p_interes": 180, "p_capital": 1000}).execute()
+    assert (_prestamo(base, 2)["Estado"], _prestamo(base, 2)["Observaciones"]) == ("Pagado", "aval")
+
+
+@pytest.mark.parametrize("parametros, codigo", [
+    ({"p_prestamo_id": 1, "p_interes": -1}, "22023"),
+    ({"p_prestamo_id": 1, "p_interes": 100, "p_capital": -5}, "22023"),
+    ({"p_prestamo_id": 3, "p_interes": 100}, "P0002"),
+    ({"p_prestamo_id": 99, "p_interes": 100}, "P0002"),
+])
+def test_cobro_rechaza_montos_negativos_y_prestamos_inactivos(cliente, base, parametros, codigo):
+    with pytest.raises(ErrorCobro) as error:
+        cliente.rpc("registrar_cobro", parametros).execute()
+    assert error.value.code == codigo
+    assert base.tablas["pagos"] == []
+
+
+# --- registrar_cobros (sql/010) ---
+def test_lote_omite_los_prestamos_que_cambiaron(cliente, base):
+    datos = cliente.rpc("registrar_cobros", {"p_cobros": [
+        _cobro(1, 1500, vencimiento="2025-02-28", capital_anterior=10000),  # otro vencimiento
+        _cobro(2, 180, vencimiento="2024-01-31", capital_anterior=900),     # otro capital
+        _cobro(3, 100),                                                     # ya no está activo
+    ], "p_usuario": "ADMIN", "p_perfil": "Admin"}).execute().data
+    assert datos == {"aplicados": [], "omitidos": [1, 2, 3]}
+    assert base.tablas["pagos"] == [] and base.tablas["auditoria"] == []
+
+
+def test_lote_aplica_los_vigentes(cliente, base):
+    datos = cliente.rpc("registrar_cobros", {"p_cobros": [
+        _cobro(2, 180, vencimiento="2024-01-31", capital_anterior=1000),
+        _cobro(1, 1500, 10000, nota="liquidado", vencimiento="2024-12-31", capital_anterior=10000),
+        _cobro(100, 50),
+    ], "p_usuario": "ADMIN", "p_perfil": "Admin"}).execute().data
+    assert datos["omitidos"] == [1, 100]
+    assert [(f["Prestamo_Id"], f["Estado"], f["Fecha_Proximo_Pago"]) for f in datos["aplicados"]] == [(2, "Activo", "2024-02-29")]
+    assert [p["Usuario"] for p in base.tablas["pagos"]] == ["ADMIN"]
+    assert base.tablas["auditoria"][0]["Detalle del Movimiento"] == "Pago Recibido (carga masiva): Interés S/ 180, Capital S/ 0"
+
+
+def test_lote_cancela_y_no_renueva(cliente, base):
+    datos = cliente.rpc("registrar_cobros", {"p_cobros": [
+        _cobro(1, 1500, 10000, nota="liquidado"),
+        _cobro(2, 180, renovar=False),
+    ]}).execute().data
+    assert [(f["Estado"], f["Fecha_Proximo_Pago"]) for f in datos["aplicados"]] == [("Pagado", "2025-01-31"), ("Activo", "2024-01-31")]
+    assert _prestamo(base, 1)["Observaciones"] == "liquidado"
+
+
+@pytest.mark.parametrize("cobros", [
+    [_cobro(1, 1500), _cobro(2, -1)],
+    [_cobro(1, 1500), _cobro(2, 180, -10)],
+    [_cobro(1, None)],
+    [_cobro(1, 1500), _cobro(2, 180), _cobro(1, 10)],
+])
+def test_lote_rechaza_montos_negativos_e_ids_repetidos_sin_aplicar_nada(cliente, base, cobros):
+    with pytest.raises(ErrorCobro) as error:
+        cliente.rpc("registrar_cobros", {"p_cobros": cobros}).execute()
+    assert error.value.code == "22023"
+    assert base.tablas["pagos"] == []
+    assert _prestamo(base, 1)["Fecha_Proximo_Pago"] == "2025-01-31"
+
+
+# --- reparto y ganancias_socios (sql/006) ---
+def test_reparto_por_socio_y_totales_del_mes(cliente, base):
+    cliente.rpc("registrar_cobros", {"p_cobros": [_cobro(1, 1500), _cobro(2, 180)]}).execute()
+    cliente.rpc("registrar_cobro", {"p_prestamo_id": 1, "p_interes": 750, "p_renovar": False}).execute()
+    # (porcentaje del socio / tasa) * interés; sin Distribucion_Socios, PORCENTAJES_POR_DEFECTO
+    assert [p["reparto"] for p in base.tablas["pagos"]] == [
+        {"Socio A": 1000.0, "Socio B": 500.0},
+        {socio: round(pct / 18 * 180, 2) for socio, pct in PORCENTAJES_POR_DEFECTO.items()},
+        {"Socio A": 500.0, "Socio B": 250.0},
+    ]
+    mes = _mes_actual()
+    totales = {g["socio"]: (g["mes"], g["monto"], g["pagos"]) for g in base.tablas["ganancias_socios"]}
+    assert totales == {
+        "Socio A": (mes, 1500.0, 2),
+        "Socio B": (mes, 750.0, 2),
+        **{socio: (mes, round(pct / 18 * 180, 2), 1) for socio, pct in PORCENTAJES_POR_DEFECTO.items()},
+    }
+
+
+def test_corregir_un_cobro_escala_su_reparto(cliente, base):
+    pago_id = cliente.rpc("registrar_cobro", {"p_prestamo_id": 1, "p_interes": 1500}).execute().data["Pago_Id"]
+    cliente.table("pagos").update({"Interes_Pagado": 300}).eq("id", pago_id).execute()
+    assert base.tablas["pagos"][0]["reparto"] == {"Socio A": 200.0, "Socio B": 100.0}
+    assert {g["socio"]: (g["monto"], g["pagos"]) for g in base.tablas["ganancias_socios"]} == {
+        "Socio A": (200.0, 1), "Socio B": (100.0, 1)}
+    cliente.table("pagos").delete().eq("id", pago_id).execute()
+    assert {g["socio"]: (g["monto"], g["pagos"]) for g in base.tablas["ganancias_socios"]} == {
+        "Socio A": (0.0, 0), "Socio B": (0.0, 0)}
+
+
+def test_recalcular_ganancias_reconstruye_los_totales(cliente, base):
+    cliente.rpc("registrar_cobros", {"p_cobros": [_cobro(1, 1500), _cobro(2, 180)]}).execute()
+    por_mes = sorted((g["socio"], g["mes"], g["monto"], g["pagos"]) for g in base.tablas["ganancias_socios"])
+    base.tablas["ganancias_socios"] = []
+    totales = cliente.rpc("recalcular_ganancias_socios", {}).execute().data
+    assert sorted((g["socio"], g["mes"], g["monto"], g["pagos"]) for g in base.tablas["ganancias_socios"]) == por_mes
+    assert {t["socio_total"]: (t["monto_total"], t["pagos_total"]) for t in totales}["Socio A"] == (1000.0, 1)